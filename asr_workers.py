@@ -0,0 +1,300 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import numpy as np # type: ignore
+
+# ================= Whisper Worker Processes =================
+# In-process Whisper shares the interpreter with capture, translation and
+# the GUI, and their Python work (VAD loop, token parsing, rendering)
+# contends for the GIL and adds jitter on both sides. WhisperProcessPool runs
+# the model in worker processes instead, and stands in for WhisperModel
+# (transcribe / detect_language, plus batched()) so the transcriber doesn't
+# change.
+#
+# Audio isn't pickled: each worker owns a shared-memory buffer the parent
+# writes the segment into, and only (op, buffer name, length, kwargs) goes
+# over the worker's pipe. Results come back as plain tuples (text, times,
+# confidences, words) and are rebuilt into segment-like objects.
+#
+# A worker that dies or hangs (asr_process_timeout_s) is killed and restarted
+# in the background. The call is retried once on another idle worker if one
+# is free; otherwise it raises ASRWorkerError and the caller drops that
+# segment instead of the app going down.
+
+START_METHOD = "spawn"  # Fork is unsafe with Qt and the pipeline's threads in the parent
+MIN_BUFFER_BYTES = 2 * 1024 * 1024
+MAX_RESTART_ATTEMPTS = 3
+
+
+class ASRWorkerError(RuntimeError):
+    """A segment couldn't be decoded (worker crashed, hung, failed to load or raised)."""
+
+
+class _WorkerLost(Exception):
+    pass
+
+
+def _pack_segment(seg) -> tuple:
+    words = None if not seg.words else [(w.start, w.end, w.word, w.probability) for w in seg.words]
+    return (seg.start, seg.end, seg.text, seg.no_speech_prob, seg.avg_logprob, seg.compression_ratio, words)
+
+
+def _unpack_segment(packed: tuple) -> SimpleNamespace:
+    start, end, text, no_speech_prob, avg_logprob, compression_ratio, words = packed
+    if words is not None:
+        words = [SimpleNamespace(start=s, end=e, word=w, probability=p) for s, e, w, p in words]
+    return SimpleNamespace(start=start, end=end, text=text, no_speech_prob=no_speech_prob,
+                           avg_logprob=avg_logprob, compression_ratio=compression_ratio, words=words)
+
+
+def _worker_main(conn, model_name: str, cpu_threads: int, warm_up: bool):
+    """Worker process: load the model, then serve requests from `conn` until it closes."""
+    try:
+        from faster_whisper import WhisperModel, BatchedInferencePipeline # type: ignore
+        model = WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+        if warm_up:
+            segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1,
+                                           without_timestamps=True)
+            list(segments)
+    except Exception as e:
+        conn.send(("failed", repr(e)))
+        return
+    conn.send(("ready", os.getpid()))
+    batched = None
+    shm: shared_memory.SharedMemory | None = None
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        op, shm_name, n_samples, kwargs = request
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=shm_name)
+        audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+        try:
+            if op == "detect_language":
+                reply = ("ok", model.detect_language(audio=audio))
+            else:
+                if op == "batched":
+                    batched = batched or BatchedInferencePipeline(model=model)
+                    segments, info = batched.transcribe(audio, **kwargs)
+                else:
+                    segments, info = model.transcribe(audio, **kwargs)
+                packed = [_pack_segment(seg) for seg in segments]
+                reply = ("ok", (packed, info.language, getattr(info, "language_probability", None),
+                                getattr(info, "all_language_probs", None)))
+        except Exception as e:
+            reply = ("error", repr(e))
+        del audio  # Release the buffer view before the next request may swap buffers
+        conn.send(reply)
+    if shm is not None:
+        shm.close()
+
+
+class _Worker:
+    """One worker process, its pipe and its shared-memory audio buffer."""
+
+    def __init__(self, ctx, index: int, model_name: str, cpu_threads: int, warm_up: bool):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, model_name, cpu_threads, warm_up),
+                                   name=f"whisper-worker-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.shm: shared_memory.SharedMemory | None = None
+
+    def wait_ready(self):
+        while not self.conn.poll(0.1):
+            if not self.process.is_alive():
+                raise ASRWorkerError(f"worker {self.index} exited while loading (code {self.process.exitcode})")
+        try:
+            status, payload = self.conn.recv()
+        except EOFError:
+            raise ASRWorkerError(f"worker {self.index} exited while loading") from None
+        if status != "ready":
+            raise ASRWorkerError(f"worker {self.index} failed to load: {payload}")
+
+    def call(self, op: str, audio: np.ndarray, kwargs: dict, timeout_s: float):
+        nbytes = audio.nbytes
+        if self.shm is None or self.shm.size < nbytes:
+            # Grow (the worker attaches the new buffer by name on its next request)
+            old = self.shm
+            self.shm = shared_memory.SharedMemory(create=True, size=max(MIN_BUFFER_BYTES, nbytes * 3 // 2))
+            if old is not None:
+                old.close()
+                old.unlink()
+        view = np.ndarray((len(audio),), dtype=np.float32, buffer=self.shm.buf)
+        view[:] = audio
+        del view
+        try:
+            self.conn.send((op, self.shm.name, len(audio), kwargs))
+            deadline = time.perf_counter() + timeout_s
+            while not self.conn.poll(0.05):
+                if not self.process.is_alive():
+                    raise _WorkerLost(f"worker {self.index} died (exit code {self.process.exitcode})")
+                if time.perf_counter() > deadline:
+                    self.process.kill()
+                    raise _WorkerLost(f"worker {self.index} timed out after {timeout_s:.0f}s")
+            status, payload = self.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            self.process.join(1.0)
+            raise _WorkerLost(f"worker {self.index} died (exit code {self.process.exitcode})") from None
+        if status != "ok":
+            raise ASRWorkerError(f"decode failed in worker {self.index}: {payload}")
+        return payload
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(2.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        self.conn.close()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class _RemoteBatched:
+    """BatchedInferencePipeline stand-in for a WhisperProcessPool."""
+
+    def __init__(self, pool: "WhisperProcessPool"):
+        self.pool = pool
+
+    def transcribe(self, audio: np.ndarray, **kwargs):
+        return self.pool.decode("batched", audio, kwargs)
+
+
+class WhisperProcessPool:
+    """WhisperModel stand-in that decodes in `processes` worker processes."""
+
+    def __init__(self, model_name: str, processes: int = 1, cpu_threads: int = 0, warm_up: bool = True,
+                 timeout_s: float = 30.0):
+        self.model_name = model_name
+        self.cpu_threads = cpu_threads
+        self.warm_up = warm_up
+        self.timeout_s = timeout_s
+        self._ctx = multiprocessing.get_context(START_METHOD)
+        self._lock = threading.Lock()
+        self._idle: queue.Queue = queue.Queue()
+        self._closed = False
+        self.workers: list[_Worker] = []
+        self.live = processes  # Workers running or being restarted (not given up on)
+        self.stats = {"calls": 0, "audio_mb": 0.0, "crashes": 0, "restarts": 0, "retried": 0, "failed": 0}
+        try:
+            self.workers = [_Worker(self._ctx, i, model_name, cpu_threads, warm_up) for i in range(processes)]
+            for worker in self.workers:
+                worker.wait_ready()
+        except Exception:
+            self.close()
+            raise
+        for worker in self.workers:
+            self._idle.put(worker)
+        print(f"[ASR Pool] {processes} Whisper process(es) ready for '{model_name}'")
+
+    # ---- WhisperModel interface ----
+    def transcribe(self, audio: np.ndarray, **kwargs):
+        return self.decode("transcribe", audio, kwargs)
+
+    def detect_language(self, audio: np.ndarray):
+        return self.call("detect_language", audio, {})
+
+    def batched(self) -> _RemoteBatched:
+        return _RemoteBatched(self)
+
+    def decode(self, op: str, audio: np.ndarray, kwargs: dict):
+        packed, language, language_probability, all_language_probs = self.call(op, audio, kwargs)
+        info = SimpleNamespace(language=language, language_probability=language_probability,
+                               all_language_probs=all_language_probs)
+        return iter([_unpack_segment(seg) for seg in packed]), info
+
+    # ---- dispatch ----
+    def _acquire(self) -> _Worker:
+        while True:
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                with self._lock:
+                    if self._closed or self.live == 0:
+                        raise ASRWorkerError("no Whisper worker process available")
+
+    def call(self, op: str, audio: np.ndarray, kwargs: dict):
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        worker = self._acquire()
+        for attempt in range(2):
+            self.stats["calls"] += 1
+            self.stats["audio_mb"] += audio.nbytes / 1e6
+            try:
+                result = worker.call(op, audio, kwargs, self.timeout_s)
+            except _WorkerLost as e:
+                self.stats["crashes"] += 1
+                print(f"[ASR Pool] {e}; restarting it")
+                threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+                if attempt > 0:
+                    break
+                try:
+                    worker = self._idle.get_nowait()  # Retry once, but only if another worker is free now
+                except queue.Empty:
+                    break
+                self.stats["retried"] += 1
+                continue
+            except ASRWorkerError:
+                self._idle.put(worker)
+                self.stats["failed"] += 1
+                raise
+            self._idle.put(worker)
+            return result
+        self.stats["failed"] += 1
+        raise ASRWorkerError(f"{op} failed: Whisper worker lost")
+
+    def _restart(self, dead: _Worker):
+        dead.close()
+        for attempt in range(MAX_RESTART_ATTEMPTS):
+            with self._lock:
+                if self._closed:
+                    return
+            try:
+                worker = _Worker(self._ctx, dead.index, self.model_name, self.cpu_threads, self.warm_up)
+                worker.wait_ready()
+            except ASRWorkerError as e:
+                print(f"[ASR Pool] Restart of worker {dead.index} failed: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self.workers[self.workers.index(dead)] = worker
+                    self.stats["restarts"] += 1
+            if closed:
+                worker.close()
+                return
+            print(f"[ASR Pool] Worker {dead.index} restarted")
+            self._idle.put(worker)
+            return
+        with self._lock:
+            self.live -= 1
+        print(f"[ASR Pool] Giving up on worker {dead.index} ({self.live} left)")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers = list(self.workers)
+        for worker in workers:
+            worker.close()
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"{len(self.workers)} process(es), {s['calls']} calls, {s['audio_mb']:.1f} MB via shared memory, "
+                f"{s['crashes']} crashes, {s['restarts']} restarts, {s['retried']} retried, {s['failed']} failed")
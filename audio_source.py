@@ -0,0 +1,221 @@
+import sys
+import time
+import wave
+import subprocess
+import numpy as np # type: ignore
+
+# ================= Audio Sources =================
+# Every source yields mono int16 PCM at the pipeline sample rate, read in
+# fixed-size frames, so AudioCaptureThread's VAD/segmentation logic does not
+# care whether the audio comes from a sound card or a recording.
+
+class AudioSource:
+    """Base interface for anything AudioCaptureThread can read frames from."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        # Non-fatal message for the user (e.g. fallback device), set by open()
+        self.warning: str | None = None
+
+    def open(self):
+        pass
+
+    def read(self, frames: int) -> bytes | None:
+        """Return `frames` samples of int16 PCM, or None at end of stream."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+
+class PyAudioSource(AudioSource):
+    """Live capture from BlackHole (or the default input as a fallback)."""
+
+    def __init__(self, sample_rate: int, frames_per_buffer: int):
+        super().__init__(sample_rate)
+        self.frames_per_buffer = frames_per_buffer
+        self.device_index: int | None = None
+        self.p = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio # type: ignore
+        self.p = pyaudio.PyAudio()
+        device_index = self.p.get_default_input_device_info()['index']
+        blackhole_found = False
+        for i in range(self.p.get_device_count()):
+            info = self.p.get_device_info_by_index(i)
+            if "BlackHole" in info.get('name') and info.get('maxInputChannels') > 0:
+                device_index = i
+                blackhole_found = True
+                break
+
+        if not blackhole_found:
+            self.warning = "BlackHole not found! Capturing from default mic instead. Please set aggregate device."
+
+        self.device_index = device_index
+        self.stream = self.p.open(format=pyaudio.paInt16, channels=1,
+                                  rate=self.sample_rate, input=True,
+                                  input_device_index=device_index,
+                                  frames_per_buffer=self.frames_per_buffer)
+
+    def read(self, frames: int) -> bytes | None:
+        if self.stream is None:
+            return None
+        return self.stream.read(frames, exception_on_overflow=False) # type: ignore
+
+    def close(self):
+        if self.stream:
+            try:
+                self.stream.stop_stream()  # type: ignore
+                self.stream.close()  # type: ignore
+            except Exception:
+                pass
+            self.stream = None
+        if self.p:
+            try:
+                self.p.terminate()
+            except Exception:
+                pass
+            self.p = None
+
+    def describe(self) -> str:
+        return f"device {self.device_index}"
+
+
+class FileAudioSource(AudioSource):
+    """Replay a WAV file, raw PCM file or stdin ("-") through the pipeline.
+
+    speed=1.0 paces reads in real time, speed=N runs N× faster and speed=0
+    reads as fast as possible. WAV files in other formats are downmixed to
+    mono and resampled on open; raw PCM must already be mono int16 at
+    `sample_rate`.
+    """
+
+    RAW_EXTENSIONS = (".raw", ".pcm", ".s16", ".s16le")
+
+    def __init__(self, path: str, sample_rate: int, speed: float = 1.0):
+        super().__init__(sample_rate)
+        self.path = path
+        self.speed = max(0.0, float(speed))
+        self._fh = None
+        self._pcm: np.ndarray | None = None  # Set when the file needed conversion
+        self._pos: int = 0
+        self._frames_read: int = 0
+        self._start_t: float = 0.0
+
+    def open(self):
+        if self.path == "-":
+            self._fh = sys.stdin.buffer
+        elif self.path.lower().endswith(self.RAW_EXTENSIONS):
+            self._fh = open(self.path, "rb")
+        else:
+            wav = wave.open(self.path, "rb")
+            if (wav.getnchannels() == 1 and wav.getsampwidth() == 2
+                    and wav.getframerate() == self.sample_rate):
+                self._fh = wav
+            else:
+                self._pcm = _load_wav_as_int16(wav, self.sample_rate)
+                wav.close()
+        self._pos = 0
+        self._frames_read = 0
+        self._start_t = time.perf_counter()
+
+    def read(self, frames: int) -> bytes | None:
+        if self._pcm is not None:
+            data = self._pcm[self._pos:self._pos + frames].tobytes()
+            self._pos += frames
+        elif isinstance(self._fh, wave.Wave_read):
+            data = self._fh.readframes(frames)
+        elif self._fh is not None:
+            data = self._fh.read(frames * 2)
+        else:
+            return None
+        if not data:
+            return None
+
+        # Pad the final partial frame so VAD still sees a valid frame size
+        if len(data) < frames * 2:
+            data = data + b"\x00" * (frames * 2 - len(data))
+
+        self._frames_read += frames
+        if self.speed > 0:
+            due = self._start_t + self._frames_read / self.sample_rate / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    @property
+    def position_s(self) -> float:
+        """Seconds of audio read so far."""
+        return self._frames_read / self.sample_rate
+
+    def close(self):
+        if self._fh is not None and self._fh is not sys.stdin.buffer:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._fh = None
+        self._pcm = None
+
+    def describe(self) -> str:
+        pace = f"{self.speed:g}x" if self.speed > 0 else "max speed"
+        return f"replay '{self.path}' ({pace})"
+
+
+def _load_wav_as_int16(wav: wave.Wave_read, sample_rate: int) -> np.ndarray:
+    """Decode a WAV file to mono int16 at `sample_rate` (linear resampling)."""
+    width = wav.getsampwidth()
+    channels = wav.getnchannels()
+    raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bit")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+
+    src_rate = wav.getframerate()
+    if src_rate != sample_rate and len(audio) > 0:
+        n_out = int(len(audio) * sample_rate / src_rate)
+        src_t = np.arange(len(audio), dtype=np.float64) / src_rate
+        dst_t = np.arange(n_out, dtype=np.float64) / sample_rate
+        audio = np.interp(dst_t, src_t, audio).astype(np.float32)
+
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def load_audio(path: str, sample_rate: int) -> np.ndarray:
+    """Whole file as mono int16 at `sample_rate`: WAV / raw PCM directly, anything else through ffmpeg."""
+    lower = path.lower()
+    if lower.endswith(FileAudioSource.RAW_EXTENSIONS):
+        return np.fromfile(path, dtype=np.int16)
+    if lower.endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            return _load_wav_as_int16(wav, sample_rate)
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"ffmpeg is needed to decode '{path}'") from None
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed on '{path}': {e.stderr.decode(errors='replace').strip()}") from None
+    return np.frombuffer(proc.stdout, dtype=np.int16)
+
+
+def open_audio_source(replay_path: str | None, sample_rate: int, frames_per_buffer: int,
+                      speed: float = 1.0) -> AudioSource:
+    """Pick a replay source if a path is given, otherwise live capture."""
+    if replay_path:
+        return FileAudioSource(replay_path, sample_rate, speed=speed)
+    return PyAudioSource(sample_rate, frames_per_buffer)
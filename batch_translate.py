@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+import concurrent.futures
+import numpy as np # type: ignore
+
+import realtime_core as core
+from realtime_core import CONFIG
+from audio_source import load_audio
+from asr_workers import START_METHOD
+from translation_backends import BACKENDS, create_backend
+from translation_cache import TranslationCache
+from subtitle_formats import write_subtitles
+
+# ================= Offline Batch Translation =================
+# Recorded audio/video has no real-time budget. Files are decoded whole
+# (ffmpeg for anything that isn't WAV / raw PCM) and cut at pauses by the
+# same WebRTC VAD. The segments are then spread over a pool of Whisper
+# processes sized to the cores, each with its own model and
+# batch_asr_threads CPU threads. Every transcribed segment goes straight to
+# the translation workers (translation_workers at once, batched for
+# CTranslate2), so translation overlaps the remaining ASR. Each input gets a
+# timestamped .srt / .vtt, and the run reports throughput in audio seconds
+# per wall second.
+#
+#   python batch_translate.py talk.mp4 lecture.wav --format srt vtt --out-dir subs/
+
+MEDIA_EXTENSIONS = (".wav", ".raw", ".pcm", ".s16", ".s16le", ".mp3", ".m4a", ".aac", ".flac", ".ogg",
+                    ".opus", ".mp4", ".mkv", ".mov", ".webm", ".avi")
+
+
+class Cue:
+    __slots__ = ("start_s", "end_s", "lang", "source", "text", "asr_s")
+
+    def __init__(self, start_s: float, end_s: float):
+        self.start_s = start_s
+        self.end_s = end_s
+        self.lang: str = ""
+        self.source: str = ""
+        self.text: str = ""  # Translation ("" = failed; the cue keeps the source line)
+        self.asr_s: float = 0.0
+
+
+# ---- ASR worker processes ----
+# Each process keeps one model in this global for its whole life.
+_worker_model = None
+
+def init_asr_worker(model_name: str, cpu_threads: int):
+    global _worker_model
+    core.import_whisper()
+    _worker_model = core.WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=cpu_threads) # type: ignore
+
+def detect_language(audio: np.ndarray) -> str:
+    lang, _, _ = _worker_model.detect_language(audio=audio) # type: ignore
+    return lang
+
+def transcribe_segment(audio: np.ndarray, language: str | None, beam_size: int) -> tuple[str, str, float]:
+    """(text, language, decode seconds); text is "" for silence / hallucinations."""
+    start = time.perf_counter()
+    segments, info = _worker_model.transcribe( # type: ignore
+        audio,
+        beam_size=beam_size,
+        language=language,
+        vad_filter=False,
+        condition_on_previous_text=False,
+        without_timestamps=True,
+    )
+    kept = core.HALLUCINATION_FILTER.filter_segments(list(segments))
+    lang = language or info.language
+    text = "".join(s.text for s in kept).strip()
+    if text and core.HALLUCINATION_FILTER.is_hallucination(text):
+        text = ""
+    return text, lang, time.perf_counter() - start
+
+
+# ---- segmentation ----
+def segment_speech(pcm: np.ndarray, sample_rate: int) -> list[tuple[int, int]]:
+    """(start, end) sample spans of speech, cut like the live capture but with the batch_* limits."""
+    import webrtcvad # type: ignore
+    vad = webrtcvad.Vad(CONFIG["vad_mode"])
+    frame = int(sample_rate * float(CONFIG["chunk_duration_ms"]) / 1000)
+    silence_frames = int(float(CONFIG["batch_silence_ms"]) / float(CONFIG["chunk_duration_ms"]))
+    max_frames = int(float(CONFIG["batch_max_segment_s"]) * 1000 / float(CONFIG["chunk_duration_ms"]))
+    spans = []
+    start: int | None = None
+    frames = silence = 0
+    for pos in range(0, len(pcm) - frame + 1, frame):
+        if vad.is_speech(pcm[pos:pos + frame].tobytes(), sample_rate):
+            silence = 0
+            if start is None:
+                start = pos
+        else:
+            silence += 1
+        if start is None:
+            continue
+        frames += 1
+        if frames >= max_frames or (silence >= silence_frames and frames > 10):
+            spans.append((start, pos + frame))
+            start, frames, silence = None, 0, 0
+    if start is not None and frames > 10:
+        spans.append((start, len(pcm)))
+    return spans
+
+
+# ---- translation ----
+async def translate_worker(queue: asyncio.Queue, backend, cache: TranslationCache | None, stats: dict):
+    """Translate cues as ASR delivers them (several at a time for batching backends)."""
+    while True:
+        cue = await queue.get()
+        if cue is None:
+            return
+        batch = [cue]
+        while backend.batching and len(batch) < int(CONFIG["mt_batch_size"]) and not queue.empty():
+            extra = queue.get_nowait()
+            if extra is None:
+                queue.put_nowait(None)  # Leave the exit signal for this worker's next round
+                break
+            batch.append(extra)
+        pending = []
+        for item in batch:
+            if item.lang == "zh":
+                item.text = item.source
+                continue
+            cached = cache.get(item.source, item.lang, *backend.cache_key()) if cache else None
+            if cached is not None:
+                item.text = cached
+                stats["cached"] += 1
+            else:
+                pending.append(item)
+        if not pending:
+            continue
+        start = time.perf_counter()
+        try:
+            if len(pending) > 1:
+                results = await asyncio.wait_for(backend.translate_batch([(c.source, c.lang) for c in pending]),
+                                                 timeout=float(CONFIG["translation_timeout_s"]) * len(pending))
+            else:
+                results = [await asyncio.wait_for(backend.translate(pending[0].source, pending[0].lang),
+                                                  timeout=float(CONFIG["translation_timeout_s"]))]
+        except Exception as e:
+            print(f"[Batch] Translation of {len(pending)} line(s) failed: {e!r}")
+            stats["failed"] += len(pending)
+            continue
+        finally:
+            stats["seconds"] += time.perf_counter() - start
+        for item, zh_text in zip(pending, results):
+            zh_text = zh_text.strip()
+            if core.is_usable_translation(zh_text):
+                item.text = zh_text
+                stats["translated"] += 1
+                if cache:
+                    cache.put(item.source, item.lang, *backend.cache_key(), zh_text)
+            else:
+                stats["failed"] += 1
+
+
+# ---- driver ----
+def pool_size() -> tuple[int, int]:
+    """(ASR processes, CPU threads per process)."""
+    threads = max(1, int(CONFIG["batch_asr_threads"]))
+    workers = int(CONFIG["batch_asr_workers"]) or max(1, (os.cpu_count() or 1) // threads)
+    return workers, threads
+
+
+async def run_batch(paths: list[str], language: str | None = None) -> tuple[dict, dict[str, list[Cue]]]:
+    """Transcribe and translate `paths`; returns (throughput report, cues per file)."""
+    loop = asyncio.get_running_loop()
+    sr = int(CONFIG["sample_rate"])
+    workers, threads = pool_size()
+    beam_size = int(CONFIG["batch_beam_size"])
+    print(f"[Batch] {len(paths)} file(s), {workers} Whisper process(es) × {threads} threads, "
+          f"'{CONFIG['whisper_model']}', {CONFIG['translation_workers']} translation worker(s)")
+
+    backend = create_backend(str(CONFIG["translation_backend"]), CONFIG)
+    cache = None
+    if CONFIG["translation_cache"]:
+        cache = TranslationCache(str(CONFIG["translation_cache_path"]), int(CONFIG["translation_cache_size"])) # type: ignore
+    stats = {"translated": 0, "cached": 0, "failed": 0, "seconds": 0.0}
+    queue: asyncio.Queue = asyncio.Queue()
+    n_translators = max(1, int(CONFIG["translation_workers"]))
+    translators = [asyncio.create_task(translate_worker(queue, backend, cache, stats)) for _ in range(n_translators)]
+
+    files: dict[str, dict] = {}
+    asr_jobs = []
+    wall_start = time.perf_counter()
+    # Not fork: the translation threads (and the event loop's executor) already exist here
+    pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                                  initializer=init_asr_worker,
+                                                  initargs=(str(CONFIG["whisper_model"]), threads))
+
+    async def transcribe(cue: Cue, clip: np.ndarray, lang: str | None):
+        cue.source, cue.lang, cue.asr_s = await loop.run_in_executor(pool, transcribe_segment, clip, lang, beam_size)
+        if cue.source:
+            await queue.put(cue)
+
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            try:
+                pcm = await loop.run_in_executor(None, load_audio, path, sr)
+            except Exception as e:
+                print(f"[Batch] Skipping {path}: {e}")
+                continue
+            spans = await loop.run_in_executor(None, segment_speech, pcm, sr)
+            audio = pcm.astype(np.float32) / 32768.0
+            cues = [Cue(s / sr, e / sr) for s, e in spans]
+            clips = [audio[s:e] for s, e in spans]
+            gated: set[int] = set()
+            if core.SPEECH_GATE.enabled:
+                gated = {i for i, clip in enumerate(clips) if core.SPEECH_GATE.check(clip)[0] == "drop"}
+                cues = [c for i, c in enumerate(cues) if i not in gated]
+                clips = [c for i, c in enumerate(clips) if i not in gated]
+            files[path] = {"audio_s": len(pcm) / sr, "cues": cues, "gated": len(gated),
+                           "prepare_s": time.perf_counter() - start}
+            print(f"[Batch] {os.path.basename(path)}: {len(pcm) / sr:.1f}s audio, {len(cues)} segments")
+            # One language per file, from up to lid_prefix_s × 10 of its speech (one detection in the pool)
+            lang = language
+            if lang is None and clips:
+                sample = np.concatenate(clips)[:int(float(CONFIG["lid_prefix_s"]) * 10 * sr)]
+                lang = await loop.run_in_executor(pool, detect_language, sample)
+                print(f"[Batch] {os.path.basename(path)}: language '{lang}'")
+            asr_jobs += [asyncio.create_task(transcribe(cue, clip, lang)) for cue, clip in zip(cues, clips)]
+        await asyncio.gather(*asr_jobs)
+        asr_done_s = time.perf_counter() - wall_start
+    finally:
+        for _ in translators:
+            queue.put_nowait(None)
+        await asyncio.gather(*translators, return_exceptions=True)
+        pool.shutdown(cancel_futures=True)
+        await backend.close()
+        if cache:
+            cache.close()
+    wall_s = time.perf_counter() - wall_start
+
+    audio_s = sum(f["audio_s"] for f in files.values())
+    asr_s = sum(c.asr_s for f in files.values() for c in f["cues"])
+    report = {
+        "config": {
+            "whisper_model": CONFIG["whisper_model"],
+            "asr_workers": workers,
+            "asr_threads": threads,
+            "beam_size": beam_size,
+            "translation_backend": CONFIG["translation_backend"],
+            "translation_workers": n_translators,
+        },
+        "files": {path: {"audio_s": round(f["audio_s"], 2), "segments": len(f["cues"]), "gated": f["gated"],
+                         "subtitles": sum(1 for c in f["cues"] if c.source),
+                         "prepare_s": round(f["prepare_s"], 2)} for path, f in files.items()},
+        "totals": {
+            "audio_s": round(audio_s, 2),
+            "wall_s": round(wall_s, 2),
+            "asr_done_s": round(asr_done_s, 2),
+            "realtime_factor": round(audio_s / wall_s, 2) if wall_s else None,
+            "asr_process_s": round(asr_s, 2),
+            "translation_s": round(stats["seconds"], 2),
+            "translated": stats["translated"],
+            "cached": stats["cached"],
+            "failed": stats["failed"],
+        },
+    }
+    return report, {path: f["cues"] for path, f in files.items()}
+
+
+def output_path(path: str, out_dir: str | None, fmt: str) -> str:
+    base = os.path.splitext(os.path.basename(path))[0] + "." + fmt
+    return os.path.join(out_dir if out_dir else os.path.dirname(os.path.abspath(path)), base)
+
+
+def print_report(result: dict):
+    totals = result["totals"]
+    for path, f in result["files"].items():
+        print(f"[Batch] {os.path.basename(path)}: {f['audio_s']:.1f}s audio, {f['subtitles']} subtitles "
+              f"({f['segments']} segments, {f['gated']} gated as non-speech)")
+    print(f"[Batch] {totals['audio_s']:.1f}s audio in {totals['wall_s']:.1f}s = "
+          f"{totals['realtime_factor']}× real time (ASR finished at {totals['asr_done_s']:.1f}s)")
+    print(f"[Batch] Whisper busy {totals['asr_process_s']:.1f}s across {result['config']['asr_workers']} process(es); "
+          f"translation: {totals['translated']} translated, {totals['cached']} cached, {totals['failed']} failed "
+          f"({totals['translation_s']:.1f}s in calls)")
+
+
+def find_inputs(paths: list[str]) -> list[str]:
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(MEDIA_EXTENSIONS))
+        else:
+            found.append(path)
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Translate recorded audio/video files to SRT/VTT subtitles")
+    parser.add_argument("inputs", nargs="+", help="Audio/video files or directories (non-WAV input needs ffmpeg)")
+    parser.add_argument("--format", nargs="+", choices=["srt", "vtt"], default=["srt"], help="Subtitle formats to write")
+    parser.add_argument("--out-dir", metavar="DIR", help="Where to write subtitles (default: next to each input)")
+    parser.add_argument("--whisper-model", default=str(CONFIG["whisper_model"]))
+    parser.add_argument("--language", help="Source language code (default: detected per file)")
+    parser.add_argument("--asr-workers", type=int, default=int(CONFIG["batch_asr_workers"]),
+                        help="Whisper processes (0 = one per --asr-threads cores)")
+    parser.add_argument("--asr-threads", type=int, default=int(CONFIG["batch_asr_threads"]),
+                        help="CPU threads per Whisper process")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=str(CONFIG["translation_backend"]),
+                        help="Translation backend")
+    parser.add_argument("--mt-model", metavar="DIR", help="CTranslate2 MT model directory for --backend ctranslate2")
+    parser.add_argument("--workers", type=int, default=int(CONFIG["translation_workers"]),
+                        help="Translations in flight at once")
+    parser.add_argument("--json", metavar="PATH", help="Write the throughput report here ('-' for stdout)")
+    args = parser.parse_args()
+
+    CONFIG["whisper_model"] = args.whisper_model
+    CONFIG["batch_asr_workers"] = args.asr_workers
+    CONFIG["batch_asr_threads"] = args.asr_threads
+    CONFIG["translation_backend"] = args.backend
+    CONFIG["translation_workers"] = args.workers
+    if args.mt_model:
+        CONFIG["mt_model_path"] = args.mt_model
+    inputs = find_inputs(args.inputs)
+    missing = [p for p in inputs if not os.path.exists(p)]
+    if missing or not inputs:
+        parser.error(f"input not found: {', '.join(missing) or args.inputs[0]}")
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    result, cues_by_path = asyncio.run(run_batch(inputs, args.language))
+    for path, cues in cues_by_path.items():
+        lines = [(c.start_s, c.end_s, c.text, c.source) for c in cues if c.source]
+        for fmt in args.format:
+            out = output_path(path, args.out_dir, fmt)
+            write_subtitles(out, lines, fmt)
+            print(f"[Batch] Wrote {out}")
+    print_report(result)
+
+    if args.json == "-":
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
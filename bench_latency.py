@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import collections
+
+import realtime_core as core
+from asr_workers import WhisperProcessPool
+from audio_source import FileAudioSource
+from fake_ollama import FakeOllamaServer
+from latency_trace import RollingHistogram, SegmentTrace
+from subtitle_coalescer import SubtitleCoalescer
+from translation_backends import BACKENDS
+
+# ================= End-to-End Latency Benchmark =================
+# Replays a directory of clips through the real AudioCaptureThread →
+# TranscriberThread → TranslatorThread pipeline against a local fake Ollama
+# server and reports latency percentiles per stage, taken from the
+# per-segment traces the pipeline records (see latency_trace.py).
+
+AUDIO_EXTENSIONS = (".wav", ".raw", ".pcm", ".s16", ".s16le")
+
+# Reported metric -> latency_trace interval
+METRICS = {
+    "segment_cut_delay": "vad_cut_delay",
+    "queue_wait": "queue_wait",
+    "asr_time": "asr",
+    "time_to_first_token": "first_token",
+    "time_to_final_subtitle": "end_to_end",
+}
+
+
+class TraceCollector:
+    """Keeps every finished trace of a run, tagged with its clip."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clip: str = ""
+        self.rows: list[dict] = []
+        self.histograms = {name: RollingHistogram(window=None) for name in METRICS}
+
+    def on_trace(self, trace: SegmentTrace):
+        row = trace.to_dict()
+        row["clip"] = self.clip
+        with self.lock:
+            self.rows.append(row)
+            for name, interval in METRICS.items():
+                value = trace.interval(interval)
+                if value is not None and (trace.dropped is None or interval != "end_to_end"):
+                    self.histograms[name].add(value)
+
+    def summary(self) -> dict:
+        return {name: hist.summary() for name, hist in self.histograms.items()}
+
+
+def find_clips(path: str) -> list[str]:
+    if os.path.isfile(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.lower().endswith(AUDIO_EXTENSIONS)
+    )
+
+
+def run_benchmark(clips: list[str], speed: float, first_token_delay: float, token_delay: float,
+                  whisper_model: str, ollama_url: str | None = None, load_timeout: float = 300.0) -> dict:
+    collector = TraceCollector()
+    core.TRACER.add_listener(collector.on_trace)
+
+    server = None
+    if ollama_url:
+        core.CONFIG["ollama_api_url"] = ollama_url
+    else:
+        server = FakeOllamaServer(first_token_delay=first_token_delay, token_delay=token_delay).start_background()
+        core.CONFIG["ollama_api_url"] = f"{server.base_url}/api/generate"
+    core.CONFIG["whisper_model"] = whisper_model
+
+    pipeline = core.Pipeline()
+    translator = pipeline.translator
+    # Subtitle updates are counted the way the tray app receives them (nothing renders here)
+    subtitles = SubtitleCoalescer()
+    pipeline.transcriber.on_partial = lambda *args: subtitles.post("partial", *args)
+    translator.on_subtitle = lambda trace, zh_text, source_text, lang, final: subtitles.post(
+        "translation", zh_text, source_text, lang)
+    pipeline.start()
+
+    # Don't let model loading show up as queue wait on the first segment
+    load_start = time.perf_counter()
+    if not pipeline.wait_ready(load_timeout):
+        raise RuntimeError(f"Whisper model '{whisper_model}' failed to load")
+    print(f"[Bench] Whisper ready ({time.perf_counter() - load_start:.2f}s)")
+
+    audio_seconds = 0.0
+    wall_start = time.perf_counter()
+    for path in clips:
+        collector.clip = os.path.basename(path)
+        source = FileAudioSource(path, core.CONFIG["sample_rate"], speed=speed)
+        capture = core.AudioCaptureThread(source)
+        capture.start()
+        capture.join()
+        audio_seconds += source.position_s
+
+    # Drain: every queued segment finishes
+    pipeline.close(drain=True)
+    wall_s = time.perf_counter() - wall_start
+    core.TRACER.remove_listener(collector.on_trace)
+    model = pipeline.transcriber.model
+    asr_pool = model if isinstance(model, WhisperProcessPool) else None
+    if server:
+        server.stop()
+
+    rows = sorted(collector.rows, key=lambda r: r["id"])
+    ollama = translator.backends.get("ollama")
+    mt = translator.backends.get("ctranslate2")
+    return {
+        "config": {
+            "clips": [os.path.basename(p) for p in clips],
+            "speed": speed,
+            "whisper_model": whisper_model,
+            "streaming_asr": core.CONFIG["streaming_asr"],
+            "batched_asr": core.CONFIG["batched_asr"],
+            "asr_processes": core.CONFIG["asr_processes"],
+            "speculative_translation": core.CONFIG["speculative_translation"],
+            "translation_backend": core.CONFIG["translation_backend"],
+            "translation_workers": core.CONFIG["translation_workers"],
+            "ollama_chat": core.CONFIG["ollama_chat"],
+            "latency_controller": core.CONFIG["latency_controller"],
+            "target_lag_s": core.CONFIG["target_lag_s"],
+            "ollama": ollama_url or "fake",
+            "first_token_delay_s": first_token_delay,
+            "token_delay_s": token_delay,
+            "silence_trigger_ms": core.CONFIG["silence_trigger_ms"],
+            "max_chunk_duration_s": core.CONFIG["max_chunk_duration_s"],
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "totals": {
+            "segments": len(rows),
+            "translated": sum(1 for r in rows if not r["dropped"]),
+            "dropped": dict(collections.Counter(r["dropped"] for r in rows if r["dropped"])),
+            "audio_s": round(audio_seconds, 2),
+            "wall_s": round(wall_s, 2),
+        },
+        "summary": collector.summary(),
+        "scheduler": dict(core.audio_queue.stats),
+        "asr_workers": dict(asr_pool.stats) if asr_pool else None,
+        "translation_cache": dict(translator.cache.stats) if translator.cache else None,
+        "ollama_client": dict(ollama.client.stats) if ollama and ollama.client else None, # type: ignore
+        "prompt_eval": {
+            "requests": ollama.prompt_stats.requests, # type: ignore
+            "tokens": ollama.prompt_stats.tokens, # type: ignore
+            "seconds": round(ollama.prompt_stats.seconds, 3), # type: ignore
+            "history_rebases": ollama.history.rebases, # type: ignore
+        } if ollama else None,
+        "mt": dict(mt.stats) if mt else None, # type: ignore
+        "subtitle_updates": dict(subtitles.stats),
+        "reorder": dict(translator.order.stats, wait_s=round(translator.order.stats["wait_s"], 3)),
+        "speculation": dict(translator.spec_stats.counts, saved_s=round(translator.spec_stats.saved_s, 3)),
+        "speech_gate": dict(core.SPEECH_GATE.stats, reasons=dict(core.SPEECH_GATE.reasons)),
+        "controller_events": list(core.CONTROLLER.events),
+        "segments": rows,
+    }
+
+
+def print_summary(result: dict):
+    totals = result["totals"]
+    drops = ", ".join(f"{k} {v}" for k, v in totals["dropped"].items()) or "none dropped"
+    print(f"\n[Bench] {totals['segments']} segments ({totals['translated']} translated, {drops}), "
+          f"{totals['audio_s']:.1f}s audio in {totals['wall_s']:.1f}s")
+    print(f"{'metric':<24}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, stats in result["summary"].items():
+        if not stats["count"]:
+            print(f"{name:<24}{0:>5}")
+            continue
+        print(f"{name:<24}{stats['count']:>5}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    gate = result["speech_gate"]
+    print(f"[Bench] Speech gate: {gate['dropped']} dropped, {gate['flagged']} flagged, "
+          f"~{gate['asr_s_saved']:.1f}s ASR saved, {gate['gate_ms']:.0f}ms in gate")
+    sched = result["scheduler"]
+    print(f"[Bench] Scheduler: {sched['scheduled']} ASR calls, {sched['coalesced_segments']} coalesced, "
+          f"{sched['downgraded']} downgraded, {sched['shed']} shed")
+    pool = result["asr_workers"]
+    if pool:
+        print(f"[Bench] ASR processes: {pool['calls']} calls, {pool['audio_mb']:.1f} MB via shared memory, "
+              f"{pool['crashes']} crashes, {pool['restarts']} restarts, {pool['failed']} failed")
+    prompt = result["prompt_eval"]
+    if prompt and prompt["requests"]:
+        print(f"[Bench] Prompt eval: {prompt['tokens'] / prompt['requests']:.0f} tokens/request on average, "
+              f"{prompt['history_rebases']} history rebases")
+    order = result["reorder"]
+    print(f"[Bench] Translation order: {order['released']} released, {order['waited']} held for order "
+          f"({order['wait_s']:.2f}s total), max {order['max_depth']} in flight")
+    mt = result["mt"]
+    if mt and mt["lines"]:
+        print(f"[Bench] MT: {mt['lines']} lines in {mt['calls']} calls, "
+              f"{mt['seconds'] / mt['lines'] * 1000:.0f}ms/line")
+    if result["config"]["speculative_translation"]:
+        spec = result["speculation"]
+        print(f"[Bench] Speculation: {spec['started']} started, {spec['hit']} hits / {spec['extend']} extended / "
+              f"{spec['miss']} misses, ~{spec['saved_s']:.1f}s LLM time saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay audio clips through the pipeline and report latency percentiles")
+    parser.add_argument("clips", help="Directory of .wav/.raw clips (or a single file)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 = real time, N = N× faster, 0 = as fast as possible")
+    parser.add_argument("--whisper-model", default=str(core.CONFIG["whisper_model"]))
+    parser.add_argument("--first-token-delay", type=float, default=0.15, help="Fake server delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="Fake server delay per streamed token (s)")
+    parser.add_argument("--streaming", action="store_true", help="Enable streaming ASR (partial decodes)")
+    parser.add_argument("--batched", action="store_true", help="Enable batched ASR for queued backlogs")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Translate streaming hypotheses before segments close (implies --streaming)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=str(core.CONFIG["translation_backend"]),
+                        help="Translation backend ('ctranslate2' runs in-process; no server involved)")
+    parser.add_argument("--mt-model", metavar="DIR", help="CTranslate2 MT model directory for --backend ctranslate2")
+    parser.add_argument("--asr-processes", type=int, default=int(core.CONFIG["asr_processes"]),
+                        help="Whisper worker processes (0 = decode in the benchmark process)")
+    parser.add_argument("--workers", type=int, default=int(core.CONFIG["translation_workers"]),
+                        help="Translations in flight at once (results are still shown in order)")
+    parser.add_argument("--no-chat", action="store_true",
+                        help="Send /api/generate prompts instead of /api/chat (no prompt-prefix reuse)")
+    parser.add_argument("--no-controller", action="store_true", help="Disable the closed-loop latency controller")
+    parser.add_argument("--cache-path", default=":memory:",
+                        help="Translation cache database (default: fresh in-memory cache, so runs are comparable)")
+    parser.add_argument("--target-lag", type=float, default=float(core.CONFIG["target_lag_s"]),
+                        help="Latency controller target (s)")
+    parser.add_argument("--ollama-url", help="Benchmark a real /api/generate endpoint (chat uses /api/chat next to it) instead of the fake server")
+    parser.add_argument("--json", metavar="PATH", help="Write machine-readable results here ('-' for stdout)")
+    args = parser.parse_args()
+
+    core.CONFIG["streaming_asr"] = args.streaming or args.speculative
+    core.CONFIG["speculative_translation"] = args.speculative
+    core.CONFIG["batched_asr"] = args.batched
+    core.CONFIG["asr_processes"] = args.asr_processes
+    core.CONFIG["ollama_chat"] = not args.no_chat
+    core.CONFIG["translation_backend"] = args.backend
+    core.CONFIG["translation_workers"] = args.workers
+    if args.mt_model:
+        core.CONFIG["mt_model_path"] = args.mt_model
+    core.CONFIG["latency_controller"] = not args.no_controller
+    core.CONFIG["target_lag_s"] = args.target_lag
+    core.CONFIG["translation_cache_path"] = args.cache_path
+    clips = find_clips(args.clips)
+    if not clips:
+        parser.error(f"no audio clips found in {args.clips}")
+
+    result = run_benchmark(clips, args.speed, args.first_token_delay, args.token_delay,
+                           args.whisper_model, args.ollama_url)
+    print_summary(result)
+
+    if args.json == "-":
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[Bench] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
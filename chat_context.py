@@ -0,0 +1,68 @@
+# ================= Chat Context (prompt-prefix reuse) =================
+# Ollama keeps the KV cache of the previous request and only evaluates the
+# part of a new prompt that differs from it. The old prompt rebuilt a
+# sliding "last 3 pairs" history on every request, so the prefix changed
+# each time and the whole prompt was re-evaluated for every short subtitle.
+#
+# Translations are now sent as a chat: the system prompt, then the history
+# as user/assistant turns, then the new segment. The history is append-only
+# -- each request extends the previous one -- until it reaches max_pairs,
+# when it is cut back to the last keep_pairs in one go. Only that rebase
+# costs a full prompt evaluation; every other request pays for the newest
+# turns only.
+
+
+class ChatContext:
+    """Append-only bilingual history rendered as /api/chat messages."""
+
+    def __init__(self, max_pairs: int = 8, keep_pairs: int = 2):
+        self.max_pairs = max(1, int(max_pairs))
+        self.keep_pairs = max(0, min(int(keep_pairs), self.max_pairs - 1))
+        self.pairs: list[tuple[str, str]] = []  # (source, zh)
+        self.rebases: int = 0
+
+    def remember(self, source_text: str, zh_text: str):
+        self.pairs.append((source_text, zh_text))
+        if len(self.pairs) > self.max_pairs:
+            # One cut instead of a sliding window keeps the prefix stable in between
+            self.pairs = self.pairs[len(self.pairs) - self.keep_pairs:] if self.keep_pairs else []
+            self.rebases += 1
+
+    def messages(self, system_prompt: str, source_text: str) -> list[dict]:
+        messages = [{"role": "system", "content": system_prompt}]
+        for source, zh in self.pairs:
+            messages.append({"role": "user", "content": source})
+            messages.append({"role": "assistant", "content": zh})
+        messages.append({"role": "user", "content": source_text})
+        return messages
+
+    def reset(self):
+        self.pairs = []
+
+
+class PromptEvalStats:
+    """Per-request prompt evaluation reported by Ollama's final chunk."""
+
+    def __init__(self):
+        self.requests: int = 0
+        self.tokens: int = 0  # Prompt tokens actually evaluated (cached prefix excluded)
+        self.seconds: float = 0.0
+        self.last: tuple[int, float] | None = None
+
+    def record(self, chunk: dict) -> tuple[int, float] | None:
+        """Record a final (done) chunk; returns (tokens evaluated, seconds) if it has timings."""
+        if "prompt_eval_duration" not in chunk and "prompt_eval_count" not in chunk:
+            return None
+        tokens = int(chunk.get("prompt_eval_count", 0))
+        seconds = int(chunk.get("prompt_eval_duration", 0)) / 1e9
+        self.requests += 1
+        self.tokens += tokens
+        self.seconds += seconds
+        self.last = (tokens, seconds)
+        return self.last
+
+    def format(self) -> str:
+        if not self.requests:
+            return "no prompt timings"
+        return (f"{self.requests} requests, {self.tokens / self.requests:.0f} prompt tokens evaluated "
+                f"in {self.seconds / self.requests * 1000:.0f}ms on average")
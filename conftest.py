@@ -0,0 +1,3 @@
+# The older test_*.py scripts are manual checks that need real hardware /
+# services (PyAudio devices, a running Ollama, a display); pytest skips them.
+collect_ignore = ["test_audio.py", "test_whisper.py", "test_translate.py", "test_ui.py"]
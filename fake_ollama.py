@@ -0,0 +1,189 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ================= Fake Ollama Server =================
+# A stand-in for `ollama serve` that answers /api/generate and /api/chat
+# with a canned Chinese "translation", streamed token by token with
+# configurable delays. Like Ollama it keeps the previous prompt and reports
+# only the words past the shared prefix as prompt_eval_count, so prefix
+# reuse shows up in the timings. Used by bench_latency.py so latency runs
+# don't depend on a real LLM.
+
+FAKE_TOKENS = ["这是", "一段", "模拟", "的", "翻译", "，", "用于", "延迟", "测试", "。"]
+
+def fake_translation_tokens(source_text: str, max_tokens: int = 64) -> list[str]:
+    """One token per source word (at least 2), cycling through FAKE_TOKENS."""
+    n = max(2, min(max_tokens, len(source_text.split())))
+    return [FAKE_TOKENS[i % len(FAKE_TOKENS)] for i in range(n)]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server: "FakeOllamaServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model_name}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid json"}, status=400)
+            return
+
+        if self.path == "/api/chat":
+            messages = payload.get("messages") or []
+            prompt = "\n".join(str(m.get("content", "")) for m in messages)
+            # Only the new segment (last user turn) is "translated"
+            user_turns = [str(m.get("content", "")) for m in messages if m.get("role") == "user"]
+            source_text = user_turns[-1] if user_turns else ""
+            chat = True
+        elif self.path == "/api/generate":
+            prompt = f"{payload.get('system', '')}\n{payload.get('prompt', '')}"
+            # Only the new segment (last line) is "translated"
+            source_text = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+            chat = False
+        else:
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        self.server.record_request()
+        tokens = fake_translation_tokens(source_text)
+        model = str(payload.get("model", self.server.model_name))
+        evaluated = self.server.evaluate_prompt(prompt.split())
+
+        start_t = time.perf_counter()
+        time.sleep(self.server.first_token_delay)
+        prompt_eval_ns = int((time.perf_counter() - start_t) * 1e9)
+
+        if not payload.get("stream", True):
+            time.sleep(self.server.token_delay * len(tokens))
+            self._send_json(self._final_chunk(model, "".join(tokens), evaluated, len(tokens), prompt_eval_ns, start_t, chat))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i > 0:
+                    time.sleep(self.server.token_delay)
+                if chat:
+                    self._write_chunk({"model": model, "message": {"role": "assistant", "content": token}, "done": False})
+                else:
+                    self._write_chunk({"model": model, "response": token, "done": False})
+            self._write_chunk(self._final_chunk(model, "", evaluated, len(tokens), prompt_eval_ns, start_t, chat))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.record_cancel()  # Client gave up (timeout / cancellation)
+
+    def _write_chunk(self, obj):
+        data = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _final_chunk(self, model, response, prompt_eval_count, eval_count, prompt_eval_ns, start_t, chat=False):
+        total_ns = int((time.perf_counter() - start_t) * 1e9)
+        chunk = {"message": {"role": "assistant", "content": response}} if chat else {"response": response}
+        return {
+            "model": model,
+            **chunk,
+            "done": True,
+            "total_duration": total_ns,
+            "prompt_eval_count": prompt_eval_count,
+            "prompt_eval_duration": prompt_eval_ns,
+            "eval_count": eval_count,
+            "eval_duration": total_ns - prompt_eval_ns,
+        }
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_delay: float = 0.15,
+                 token_delay: float = 0.03, model_name: str = "fake:latest"):
+        super().__init__((host, port), FakeOllamaHandler)
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.model_name = model_name
+        self.request_count: int = 0
+        self.cancelled_count: int = 0  # Generations the client hung up on
+        self.last_prompt: list[str] = []  # Stand-in for the KV cache of the previous request
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def evaluate_prompt(self, words: list[str]) -> int:
+        """Words past the prefix shared with the previous prompt (what Ollama would evaluate)."""
+        with self._lock:
+            shared = 0
+            for old, new in zip(self.last_prompt, words):
+                if old != new:
+                    break
+                shared += 1
+            self.last_prompt = words
+            return max(1, len(words) - shared)
+
+    def record_cancel(self):
+        with self._lock:
+            self.cancelled_count += 1
+
+    def start_background(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate + /api/chat server for latency testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-delay", type=float, default=0.15, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="Seconds between streamed tokens")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.first_token_delay, args.token_delay)
+    print(f"[FakeOllama] Serving on {server.base_url} "
+          f"(first token {args.first_token_delay*1000:.0f}ms, {args.token_delay*1000:.0f}ms/token)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
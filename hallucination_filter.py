@@ -0,0 +1,124 @@
+import re
+import json
+import logging
+import threading
+import collections
+
+# ================= Hallucination Filter =================
+# Whisper fills silence and music with stock phrases ("thanks for watching",
+# "ご視聴ありがとうございました", ...) and, when it gets stuck, repetition
+# loops. Two checks run before any text reaches Ollama:
+#
+#   * decoder confidence per Whisper segment: no_speech_prob, avg_logprob
+#     and compression_ratio (repetition) — free, they come with the decode
+#   * stock phrases, compiled into one case-insensitive regex per kind so a
+#     check is a single scan instead of a loop of substring tests. Short
+#     stock lines ("thank you", "bye") only count as the whole line, or a
+#     real sentence like "Thank you for this great talk" would be lost;
+#     distinctive phrases ("thanks for watching", "ご視聴") match anywhere.
+#     Both apply to every language: Whisper hallucinates CJK phrases into
+#     whatever language it detected.
+#
+# Patterns live in hallucination_patterns.json and can be reloaded at runtime.
+
+_PUNCTUATION_ONLY = re.compile(r"^[\s.,!?…\-。、！？—「」『』（）]*$")
+_SEPARATOR = r"[\W_]*"  # Punctuation and spaces around and between repeated lines
+
+
+class HallucinationFilter:
+    """Rejects Whisper output that is likely hallucinated, with per-reason counters."""
+
+    def __init__(self, path: str | None = None, max_no_speech_prob: float = 0.6,
+                 min_avg_logprob: float = -1.0, max_compression_ratio: float = 2.4):
+        self.max_no_speech_prob = max_no_speech_prob
+        self.min_avg_logprob = min_avg_logprob
+        self.max_compression_ratio = max_compression_ratio
+        self._lock = threading.Lock()
+        self._patterns: dict[str, dict[str, list[str]]] = {}
+        self._compiled: dict[str, re.Pattern | None] = {}
+        self.stats: collections.Counter[str] = collections.Counter()
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        """(Re)load pattern sets: {"asr": {"lines": [...], "phrases": [...]}, "translation": {...}}."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[Filter] Could not load hallucination patterns from {path}: {e}")
+            logging.warning(f"[Filter] Could not load hallucination patterns from {path}: {e}")
+            return
+        patterns = {kind: {mode: [str(p) for p in phrases] for mode, phrases in sets.items()}
+                    for kind, sets in data.items() if isinstance(sets, dict)}
+        with self._lock:
+            self._patterns = patterns
+            self._compiled.clear()
+        count = sum(len(p) for sets in patterns.values() for p in sets.values())
+        print(f"[Filter] Loaded {count} hallucination patterns from {path}")
+
+    def _matcher(self, kind: str) -> re.Pattern | None:
+        with self._lock:
+            if kind not in self._compiled:
+                sets = self._patterns.get(kind, {})
+
+                def alternation(phrases) -> str:
+                    # Longest first so the reported match is the most specific phrase
+                    escaped = sorted((re.escape(p.lower()).replace(r"\ ", r"\s+") for p in set(phrases) if p),
+                                     key=len, reverse=True)
+                    return "(?:" + "|".join(escaped) + ")" if escaped else ""
+
+                alternatives = []
+                if line := alternation(sets.get("lines", [])):
+                    alternatives.append(f"^{_SEPARATOR}{line}(?:{_SEPARATOR}{line})*{_SEPARATOR}$")
+                if phrase := alternation(sets.get("phrases", [])):
+                    alternatives.append(phrase)
+                self._compiled[kind] = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+            return self._compiled[kind]
+
+    def segment_reason(self, segment) -> str | None:
+        """Why a faster-whisper Segment looks like garbage, or None."""
+        if segment.compression_ratio > self.max_compression_ratio:
+            return "repetitive"
+        if segment.avg_logprob < self.min_avg_logprob:
+            return "low_logprob"
+        # Whisper thinks there is no speech and isn't sure of what it wrote either
+        if segment.no_speech_prob > self.max_no_speech_prob and segment.avg_logprob < self.min_avg_logprob / 2:
+            return "no_speech"
+        return None
+
+    def filter_segments(self, segments) -> list:
+        """Keep only the segments that pass the confidence checks."""
+        kept = []
+        for seg in segments:
+            reason = self.segment_reason(seg)
+            if reason is None:
+                kept.append(seg)
+                continue
+            self.stats[reason] += 1
+            print(f"[Filter] Dropped segment ({reason}: no_speech={seg.no_speech_prob:.2f}, "
+                  f"logprob={seg.avg_logprob:.2f}, ratio={seg.compression_ratio:.2f}): '{seg.text.strip()}'")
+        return kept
+
+    def text_reason(self, text: str, kind: str = "asr") -> str | None:
+        """Why a piece of text is a stock hallucination, or None."""
+        t = text.strip()
+        if kind == "asr":
+            # Very short text (covers single CJK chars like "你", "の", etc.)
+            if len(t) <= 2:
+                return "too_short"
+            if _PUNCTUATION_ONLY.match(t):
+                return "punctuation"
+        matcher = self._matcher(kind)
+        if matcher is not None and matcher.search(t):
+            return "pattern"
+        return None
+
+    def is_hallucination(self, text: str, kind: str = "asr") -> bool:
+        reason = self.text_reason(text, kind)
+        if reason is not None:
+            self.stats[reason] += 1
+        return reason is not None
+
+    def format_stats(self) -> str:
+        return ", ".join(f"{k}={v}" for k, v in self.stats.most_common()) or "none"
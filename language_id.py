@@ -0,0 +1,62 @@
+# ================= Language Identification =================
+# Whisper's own detection is one encoder pass plus a single decoder step, so
+# running it on a short prefix of the segment is far cheaper than the full
+# auto-detect transcribe we used to do. Each detection's probability
+# distribution is folded into a decaying running score; the active language
+# only changes once another language leads it by `switch_margin`, so one
+# ambiguous segment on mixed-language content no longer flips the cache.
+
+
+class LanguageEstimator:
+    """Probability-weighted running language estimate with switching hysteresis."""
+
+    def __init__(self, decay: float = 0.6, switch_margin: float = 0.25,
+                 min_confidence: float = 0.5, top_k: int = 5):
+        self.decay = decay
+        self.switch_margin = switch_margin
+        self.min_confidence = min_confidence
+        self.top_k = top_k
+        self.reset()
+
+    def reset(self):
+        self.scores: dict[str, float] = {}
+        self.language: str | None = None  # Active language, None until confident
+        self.updates: int = 0
+        self.switches: int = 0
+
+    def share(self, lang: str | None) -> float:
+        """Fraction of the running score held by `lang`."""
+        total = sum(self.scores.values())
+        if not lang or total <= 0:
+            return 0.0
+        return self.scores.get(lang, 0.0) / total
+
+    @property
+    def best(self) -> str | None:
+        """Leading language, whether or not it is active yet."""
+        return max(self.scores, key=self.scores.__getitem__) if self.scores else None
+
+    @property
+    def confident(self) -> bool:
+        return self.language is not None and self.share(self.language) >= self.min_confidence
+
+    def update(self, language_probs, weight: float = 1.0) -> str | None:
+        """Fold one detection ([(lang, prob), ...], highest first) in; returns the active language."""
+        for lang in self.scores:
+            self.scores[lang] *= self.decay
+        for lang, prob in list(language_probs)[:self.top_k]:
+            self.scores[lang] = self.scores.get(lang, 0.0) + weight * float(prob)
+        self.updates += 1
+
+        best = self.best
+        if self.language is None:
+            if self.share(best) >= self.min_confidence:
+                self.language = best
+        elif best != self.language and self.share(best) - self.share(self.language) >= self.switch_margin:
+            self.language = best
+            self.switches += 1
+        return self.language
+
+    def describe(self) -> str:
+        top = sorted(self.scores.items(), key=lambda kv: -kv[1])[:3]
+        return ", ".join(f"{lang} {self.share(lang):.0%}" for lang, _ in top) or "no estimate"
@@ -0,0 +1,194 @@
+import time
+import logging
+import threading
+import collections
+
+# ================= Closed-Loop Latency Controller =================
+# Watches finished segment traces (ASR real-time factor, queue waits,
+# end-to-end lag) plus the current audio_queue depth, and nudges the
+# segmentation / decode knobs in CONFIG to hold `target_lag_s`:
+#
+#   over target   ASR-bound        → beam 1, tighter ASR deadline, longer segments
+#                 translate-bound  → longer segments (fewer LLM calls), tighter deadline
+#                 cut-bound        → shorter segments, faster silence trigger
+#   under target  step back toward the configured defaults
+#
+# One knob moves per step so every change can be attributed. Each decision
+# is recorded as an event (deque + listeners + log) for auditing.
+
+# knob -> (min, max, step)
+KNOB_LIMITS = {
+    "max_chunk_duration_s": (1.0, 4.0, 0.5),
+    "silence_trigger_ms": (60, 300, 30),
+    "beam_size": (1, 5, 1),
+}
+
+class _Ewma:
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.value: float | None = None
+
+    def add(self, x: float):
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+
+    def get(self, default: float = 0.0) -> float:
+        return default if self.value is None else self.value
+
+
+class LatencyController:
+    """Adjusts CONFIG knobs from measured latency to hold a target end-to-end lag."""
+
+    def __init__(self, config: dict, audio_queue_depth, translation_queue_depth,
+                 interval_s: float = 2.0, max_events: int = 200):
+        self.config = config
+        self.audio_queue_depth = audio_queue_depth
+        self.translation_queue_depth = translation_queue_depth
+        self.interval_s = interval_s
+        # Values to relax back to when there is headroom
+        self.defaults = {knob: config[knob] for knob in KNOB_LIMITS}
+        self.defaults["segment_deadline_s"] = config["segment_deadline_s"]
+        self._lock = threading.Lock()
+        self._last_step = time.monotonic()
+        self._calm_steps: int = 0
+        self.lag = _Ewma()
+        self.asr_s = _Ewma()
+        self.rtf = _Ewma()
+        self.queue_wait = _Ewma()
+        self.translate_wait = _Ewma()
+        self.events: collections.deque[dict] = collections.deque(maxlen=max_events)
+        self._listeners: list = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get("latency_controller", True))
+
+    @property
+    def target_lag_s(self) -> float:
+        return float(self.config["target_lag_s"])
+
+    def add_listener(self, callback):
+        """callback(event dict) runs for every decision."""
+        self._listeners.append(callback)
+
+    # ---- measurements ----
+    def on_trace(self, trace):
+        """LatencyTracer listener: fold one finished/dropped segment into the estimates."""
+        with self._lock:
+            asr = trace.interval("asr")
+            if asr is not None:
+                self.asr_s.add(asr)
+                if trace.audio_s > 0:
+                    self.rtf.add(asr / trace.audio_s)
+            for name, ewma in (("queue_wait", self.queue_wait), ("translate_wait", self.translate_wait)):
+                value = trace.interval(name)
+                if value is not None:
+                    ewma.add(value)
+            lag = trace.interval("end_to_end")
+            if lag is not None:
+                self.lag.add(lag)
+        self.maybe_step()
+
+    def metrics(self) -> dict:
+        depth = self.audio_queue_depth()
+        return {
+            "lag_s": round(self.lag.get(), 3),
+            # Segments still waiting will add roughly one ASR call each
+            "predicted_lag_s": round(self.lag.get() + depth * self.asr_s.get(), 3),
+            "asr_rtf": round(self.rtf.get(), 3),
+            "queue_wait_s": round(self.queue_wait.get(), 3),
+            "translate_wait_s": round(self.translate_wait.get(), 3),
+            "audio_queue_depth": depth,
+            "translation_queue_depth": self.translation_queue_depth(),
+        }
+
+    # ---- control ----
+    def maybe_step(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_step < self.interval_s or self.lag.value is None:
+                return
+            self._last_step = now
+            self._step(self.metrics())
+
+    def _step(self, m: dict):
+        target = self.target_lag_s
+        lag = m["predicted_lag_s"]
+        if lag > target * 1.15:
+            self._calm_steps = 0
+            self._tighten(m)
+        elif lag < target * 0.7:
+            # Relax only after sustained headroom, to avoid oscillating
+            self._calm_steps += 1
+            if self._calm_steps >= 3:
+                self._relax(m)
+        else:
+            self._calm_steps = 0
+
+    def _tighten(self, m: dict):
+        target = self.target_lag_s
+        asr_bound = m["queue_wait_s"] >= m["translate_wait_s"] and (m["audio_queue_depth"] >= 2 or m["asr_rtf"] > 0.8)
+        translate_bound = m["translate_wait_s"] > m["queue_wait_s"] and m["translate_wait_s"] > 0.3 * target
+
+        if self.config["beam_size"] > 1 and (asr_bound or m["asr_rtf"] > 0.5):
+            self._set("beam_size", 1, "ASR too slow for the lag target", m)
+        elif asr_bound:
+            if self.config["segment_deadline_s"] > target:
+                self._set("segment_deadline_s", target, "ASR backlog: shed segments that can't make the target", m)
+            else:
+                self._nudge("max_chunk_duration_s", +1, "ASR backlog: fewer, longer segments", m)
+        elif translate_bound:
+            if not self._nudge("max_chunk_duration_s", +1, "Translation backlog: fewer LLM calls", m):
+                if self.config["segment_deadline_s"] > target:
+                    self._set("segment_deadline_s", target, "Translation backlog: tighter ASR deadline", m)
+        else:
+            # Pipeline keeps up; the lag is in waiting for segments to close
+            if not self._nudge("max_chunk_duration_s", -1, "Segments too long for the lag target", m):
+                self._nudge("silence_trigger_ms", -1, "Cut segments sooner", m)
+
+    def _relax(self, m: dict):
+        self._calm_steps = 0
+        if self.config["segment_deadline_s"] != self.defaults["segment_deadline_s"]:
+            self._set("segment_deadline_s", self.defaults["segment_deadline_s"], "Headroom: relax the ASR deadline", m)
+            return
+        for knob in ("max_chunk_duration_s", "silence_trigger_ms"):
+            current, default = self.config[knob], self.defaults[knob]
+            if current != default:
+                self._nudge(knob, 1 if default > current else -1, "Headroom: back toward default", m, bound=default)
+                return
+        max_beam = int(self.config.get("controller_max_beam", self.defaults["beam_size"]))
+        if m["asr_rtf"] < 0.3 and self.config["beam_size"] < max_beam:
+            self._nudge("beam_size", +1, "Headroom: wider beam for accuracy", m, bound=max_beam)
+
+    def _nudge(self, knob: str, direction: int, reason: str, m: dict, bound=None) -> bool:
+        lo, hi, step = KNOB_LIMITS[knob]
+        current = self.config[knob]
+        new = current + direction * step
+        if bound is not None:
+            new = min(new, bound) if direction > 0 else max(new, bound)
+        new = max(lo, min(hi, new))
+        if new == current:
+            return False
+        self._set(knob, new, reason, m)
+        return True
+
+    def _set(self, knob: str, value, reason: str, m: dict):
+        old = self.config.get(knob)
+        self.config[knob] = value
+        event = {"t": time.time(), "knob": knob, "old": old, "new": value, "reason": reason, "metrics": m}
+        self.events.append(event)
+        msg = f"[Controller] {knob}: {old} -> {value} ({reason}; lag≈{m['predicted_lag_s']:.2f}s, rtf={m['asr_rtf']:.2f}, depth={m['audio_queue_depth']})"
+        print(msg)
+        logging.info(msg)
+        for callback in list(self._listeners):
+            callback(event)
+
+    def reset(self):
+        """Restore defaults and forget measurements (new content / restart)."""
+        with self._lock:
+            for knob, value in self.defaults.items():
+                self.config[knob] = value
+            for ewma in (self.lag, self.asr_s, self.rtf, self.queue_wait, self.translate_wait):
+                ewma.value = None
+            self._calm_steps = 0
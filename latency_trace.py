@@ -0,0 +1,221 @@
+import time
+import logging
+import threading
+import collections
+import numpy as np # type: ignore
+
+# ================= Per-Segment Latency Tracing =================
+# Every audio segment gets a SegmentTrace when the VAD cuts it. The trace
+# travels with the segment through audio_queue and translation_queue and
+# collects time.perf_counter() stamps at each stage. Finished (or dropped)
+# traces are folded into rolling histograms so we can see which stage the
+# lag comes from while the app is running.
+
+# Stages in pipeline order
+STAGES = (
+    "capture_start",    # First frame of the segment was read
+    "capture_end",      # Last voiced frame was read
+    "vad_cut",          # Segment pushed to audio_queue
+    "dequeue",          # Transcriber took it off audio_queue
+    "asr_start",
+    "asr_end",
+    "translate_start",  # Translator took it off translation_queue
+    "first_token",      # First streamed token reached the UI
+    "final_emit",       # Final subtitle reached the UI
+)
+
+# Interval name -> (from stage, to stage)
+INTERVALS = {
+    "vad_cut_delay": ("capture_end", "vad_cut"),
+    "queue_wait": ("vad_cut", "dequeue"),
+    "asr": ("asr_start", "asr_end"),
+    "translate_wait": ("asr_end", "translate_start"),
+    "first_token": ("translate_start", "first_token"),
+    "generation": ("first_token", "final_emit"),
+    "end_to_end": ("capture_end", "final_emit"),
+}
+
+
+class SegmentTrace:
+    """ID and stage timestamps for one segment."""
+
+    __slots__ = ("id", "stamps", "dropped", "lang", "text", "audio_s", "start_s", "end_s", "cut_reason",
+                 "merged_ids", "downgraded", "gate")
+
+    def __init__(self, segment_id: int):
+        self.id = segment_id
+        self.stamps: dict[str, float] = {}
+        self.dropped: str | None = None  # Reason, if the segment never made it to the screen
+        self.lang: str = ""
+        self.text: str = ""
+        self.audio_s: float = 0.0
+        # Position in the captured stream (seconds since capture started), for timed subtitles
+        self.start_s: float = 0.0
+        self.end_s: float = 0.0
+        self.cut_reason: str = ""  # "silence", "force" or "end" (replay finished)
+        self.merged_ids: list[int] = []  # Later segments the scheduler coalesced into this one
+        self.downgraded: bool = False  # Decoded fast because it was behind its deadline
+        self.gate: str = ""  # Speech gate flag (e.g. "music"); flagged segments are decoded fast too
+
+    def mark(self, stage: str, t: float | None = None):
+        self.stamps[stage] = time.perf_counter() if t is None else t
+
+    def mark_once(self, stage: str):
+        if stage not in self.stamps:
+            self.mark(stage)
+
+    def interval(self, name: str) -> float | None:
+        start, end = INTERVALS[name]
+        if start in self.stamps and end in self.stamps:
+            return self.stamps[end] - self.stamps[start]
+        return None
+
+    def to_dict(self) -> dict:
+        """Stage offsets in ms relative to capture_start, plus intervals."""
+        origin = self.stamps.get("capture_start", min(self.stamps.values(), default=0.0))
+        d = {
+            "id": self.id,
+            "lang": self.lang,
+            "text": self.text,
+            "audio_s": round(self.audio_s, 3),
+            "start_s": round(self.start_s, 3),
+            "end_s": round(self.end_s, 3),
+            "cut_reason": self.cut_reason,
+            "dropped": self.dropped,
+            "merged_ids": self.merged_ids,
+            "downgraded": self.downgraded,
+            "gate": self.gate,
+            "stamps_ms": {k: round((v - origin) * 1000.0, 2) for k, v in self.stamps.items()},
+        }
+        for name in INTERVALS:
+            value = self.interval(name)
+            if value is not None:
+                d[f"{name}_ms"] = round(value * 1000.0, 2)
+        return d
+
+
+class RollingHistogram:
+    """Keeps the last `window` samples (seconds, None = all) and summarizes them in ms."""
+
+    # Bucket upper edges in ms for the text histogram
+    EDGES_MS = (50, 100, 200, 500, 1000, 2000, 4000, 8000)
+
+    def __init__(self, window: int | None = 500):
+        self.samples: collections.deque[float] = collections.deque(maxlen=window)
+        self.total_count: int = 0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.total_count += 1
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": 0}
+        arr = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples)) * 1000.0
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        return {
+            "count": int(arr.size),
+            "mean_ms": round(float(arr.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(arr.max()), 2),
+        }
+
+    def buckets(self) -> dict[str, int]:
+        arr = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples)) * 1000.0
+        counts = np.bincount(np.searchsorted(self.EDGES_MS, arr), minlength=len(self.EDGES_MS) + 1)
+        labels = [f"<{e}ms" for e in self.EDGES_MS] + [f">={self.EDGES_MS[-1]}ms"]
+        return dict(zip(labels, (int(c) for c in counts)))
+
+
+class LatencyTracer:
+    """Hands out SegmentTraces and aggregates finished ones."""
+
+    def __init__(self, window: int = 500, report_every: int = 20):
+        self._lock = threading.Lock()
+        self._next_id: int = 0
+        self.histograms = {name: RollingHistogram(window) for name in INTERVALS}
+        self.drops: collections.Counter[str] = collections.Counter()
+        self.completed: int = 0
+        self.report_every = report_every
+        self._listeners: list = []
+
+    def new_segment(self) -> SegmentTrace:
+        with self._lock:
+            trace = SegmentTrace(self._next_id)
+            self._next_id += 1
+        return trace
+
+    def fork(self, trace: SegmentTrace) -> SegmentTrace:
+        """New trace sharing `trace`'s stamps so far (part of a segment sent on its own)."""
+        child = self.new_segment()
+        child.stamps.update(trace.stamps)
+        child.audio_s = trace.audio_s
+        child.start_s, child.end_s = trace.start_s, trace.end_s
+        return child
+
+    def add_listener(self, callback):
+        """callback(trace) runs for every completed or dropped segment."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def complete(self, trace: SegmentTrace):
+        with self._lock:
+            for name, hist in self.histograms.items():
+                value = trace.interval(name)
+                if value is not None:
+                    hist.add(value)
+            self.completed += 1
+            should_report = self.report_every > 0 and self.completed % self.report_every == 0
+        for callback in list(self._listeners):
+            callback(trace)
+        if should_report:
+            self.log_report()
+
+    def drop(self, trace: SegmentTrace, reason: str):
+        trace.dropped = reason
+        with self._lock:
+            self.drops[reason] += 1
+            # Stages the segment did pass through still count
+            for name, hist in self.histograms.items():
+                if name == "end_to_end":
+                    continue
+                value = trace.interval(name)
+                if value is not None:
+                    hist.add(value)
+        for callback in list(self._listeners):
+            callback(trace)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "completed": self.completed,
+                "drops": dict(self.drops),
+                "intervals": {name: hist.summary() for name, hist in self.histograms.items()},
+            }
+
+    def format_report(self) -> str:
+        snap = self.snapshot()
+        parts = []
+        for name, stats in snap["intervals"].items():
+            if stats["count"]:
+                parts.append(f"{name} p50={stats['p50_ms']:.0f} p95={stats['p95_ms']:.0f}")
+        drops = ", ".join(f"{k}={v}" for k, v in snap["drops"].items()) or "none"
+        return f"{snap['completed']} segments | " + " | ".join(parts) + f" | drops: {drops}"
+
+    def log_report(self):
+        report = self.format_report()
+        print(f"[Latency] {report}")
+        logging.info(f"[Latency] {report}")
+
+    def reset(self):
+        with self._lock:
+            for hist in self.histograms.values():
+                hist.samples.clear()
+                hist.total_count = 0
+            self.drops.clear()
+            self.completed = 0
@@ -1,5 +1,4 @@
 import sys
-import pyaudio
 import numpy as np
 import webrtcvad
 import time
@@ -9,6 +8,7 @@ import requests
 from PyQt6.QtWidgets import QApplication, QLabel, QWidget
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from faster_whisper import WhisperModel
+from audio_source import PyAudioSource, FileAudioSource
 
 # ================= Configuration =================
 CONFIG = {
@@ -162,36 +162,30 @@ class TranslatorThread(QThread):
                 print(f"[Ollama Error] {e}")
 
 class AudioCaptureThread(QThread):
-    def __init__(self):
+    def __init__(self, source=None):
         super().__init__()
-        self.p = pyaudio.PyAudio()
+        self.source = source if source is not None else PyAudioSource(CONFIG["sample_rate"], CHUNK_SIZE)
         self.vad = webrtcvad.Vad(CONFIG["vad_mode"])
-        self.stream = None
         self.running = True
 
     def run(self):
-        device_index = self.p.get_default_input_device_info()['index']
-        for i in range(self.p.get_device_count()):
-            info = self.p.get_device_info_by_index(i)
-            if "BlackHole" in info.get('name') and info.get('maxInputChannels') > 0:
-                device_index = i
-                break
-
-        print(f"[Audio] Capturing from device {device_index}")
-        
-        self.stream = self.p.open(format=pyaudio.paInt16, channels=1,
-                                  rate=CONFIG["sample_rate"], input=True,
-                                  input_device_index=device_index,
-                                  frames_per_buffer=CHUNK_SIZE)
+        self.source.open()
+        print(f"[Audio] Capturing from {self.source.describe()}")
         
         current_buffer = []
         silence_counter = 0
         
         try:
             while self.running:
-                if self.stream is None:
+                data = self.source.read(CHUNK_SIZE)
+                if data is None:
+                    # End of replay: flush what's left so the last words aren't lost
+                    if len(current_buffer) > 10:
+                        audio_np = np.frombuffer(b"".join(current_buffer), dtype=np.int16)
+                        audio_queue.put(audio_np.copy())
+                        print(f"[Audio] Replay ended (chunks: {len(current_buffer)}). Pushed to Whisper queue.")
+                    print("[Audio] Replay finished.")
                     break
-                data = self.stream.read(CHUNK_SIZE, exception_on_overflow=False) # type: ignore
                 is_speech = self.vad.is_speech(data, CONFIG["sample_rate"])
                 
                 if is_speech:
@@ -214,20 +208,16 @@ class AudioCaptureThread(QThread):
                     current_buffer = []
                     silence_counter = 0
         finally:
-            self.stop()
+            self.source.close()
 
     def stop(self):
         self.running = False
-        if self.stream and self.stream.is_active():
-            self.stream.stop_stream() # type: ignore
-            self.stream.close() # type: ignore
-        self.p.terminate()
 
 import signal
 
 # ================= Main =================
 def main():
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1])
     
     # Allow terminal Ctrl+C to penetrate the PyQt event loop
     signal.signal(signal.SIGINT, signal.SIG_DFL)
@@ -245,7 +235,12 @@ def main():
     transcriber_th.start()
     translator_th.start()
     
-    audio_th = AudioCaptureThread()
+    # Optional: python main.py recording.wav [speed]  (replay instead of live capture)
+    source = None
+    if len(sys.argv) > 1:
+        speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+        source = FileAudioSource(sys.argv[1], CONFIG["sample_rate"], speed=speed)
+    audio_th = AudioCaptureThread(source)
     audio_th.start()
 
     print("\nSystem running. Press Ctrl+C in terminal to exit.")
@@ -1,21 +1,21 @@
 import sys
-import json
+import startup # First: its import time is the startup reference point
+import argparse
 import os
-import multiprocessing
 import logging
 import traceback
-import collections
-import pyaudio # type: ignore
-import numpy as np # type: ignore
-import webrtcvad # type: ignore
-import time
-import queue
 import threading
-import requests # type: ignore
-from PyQt6.QtWidgets import QApplication, QLabel, QWidget, QSystemTrayIcon, QMenu, QMessageBox # type: ignore
+import time
+from PyQt6.QtWidgets import QApplication, QWidget, QSystemTrayIcon, QMenu, QMessageBox # type: ignore
 from PyQt6.QtGui import QIcon, QAction, QActionGroup, QPixmap, QPainter, QColor, QFont # type: ignore
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QPoint # type: ignore
-from faster_whisper import WhisperModel # type: ignore
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QPoint # type: ignore
+from audio_source import open_audio_source
+from translation_backends import BACKENDS
+from subtitle_coalescer import SubtitleCoalescer
+from subtitle_view import SubtitleView
+from asr_workers import WhisperProcessPool
+from realtime_core import (CONFIG, CHUNK_SIZE, STARTUP, TRACER, CONTROLLER, HALLUCINATION_FILTER, SPEECH_GATE,
+                           audio_queue, Pipeline)
 
 # ================= Logging & Error Handling =================
 LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "realtime_agent.log")
@@ -34,45 +34,14 @@ def exception_hook(exctype, value, tb):
 
 sys.excepthook = exception_hook
 
-# ================= Configuration =================
-CONFIG = {
-    "whisper_model": "small",
-    "sample_rate": 16000,
-    "chunk_duration_ms": 30,
-    "vad_mode": 1,
-    "silence_trigger_ms": 100, # Low-latency: faster silence detection
-    "max_chunk_duration_s": 2.0, # Low-latency: earlier force-cut for long speech
-    "ollama_api_url": "http://127.0.0.1:11434/api/generate",
-    "ollama_model": "qwen2.5:7b",
-    # Multi-language system prompt (auto-detect source language)
-    "system_prompt": (
-        "You are a professional subtitle translator.\n"
-        "Translate the following text from any language into natural, fluent Chinese (Simplified).\n"
-        "Automatically detect the source language and provide accurate translation.\n"
-        "Do NOT include any explanations, transliterations, or original text in your output.\n"
-        "Just provide the pure Chinese translation. If the text is already in Chinese, just output it as is."
-    ),
-    "ui_width": 800,
-    "ui_height": 90,
-    "ui_bottom_margin": 100
-}
-
-# Derived configurations
-_sample_rate = int(CONFIG["sample_rate"]) # type: ignore
-_chunk_duration_ms = float(CONFIG["chunk_duration_ms"]) # type: ignore
-_silence_trigger_ms = float(CONFIG["silence_trigger_ms"]) # type: ignore
-_max_chunk_duration_s = float(CONFIG["max_chunk_duration_s"]) # type: ignore
-
-CHUNK_SIZE = int(_sample_rate * _chunk_duration_ms / 1000)
-SILENCE_CHUNKS_THRESHOLD = int(_silence_trigger_ms / _chunk_duration_ms)
-MAX_CHUNKS = int(_max_chunk_duration_s * 1000 / _chunk_duration_ms)
-
-# ================= Global Queues =================
-audio_queue = queue.Queue()
-translation_queue = queue.Queue(maxsize=5)  # Increased from 1 to prevent dropped segments
+# Latest subtitle state for the window, taken once per frame
+SUBTITLES = SubtitleCoalescer()
 
 # ================= UI Component =================
 class SubtitleWindow(QWidget):
+    # Emitted from worker threads (via SUBTITLES.on_wake); delivered on the GUI thread
+    wake = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.initUI()
@@ -88,27 +57,24 @@ class SubtitleWindow(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
         self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
-        self.label = QLabel("Waiting for speech... (Start from Menu 📝)", self)
-        self.label.setStyleSheet("""
-            QLabel {
-                color: white;
-                background-color: rgba(28, 28, 30, 100);
-                font-family: '-apple-system', 'SF Pro Text', 'Helvetica Neue', sans-serif;
-                font-size: 24px;
-                padding: 10px;
-                border-radius: 12px;
-                border: 1px solid rgba(255, 255, 255, 10);
-            }
-        """)
+        self.view = SubtitleView(self, min_scale=float(CONFIG["ui_min_font_scale"])) # type: ignore
+        self.view.set_lines("Waiting for speech... (Start from Menu 📝)")
 
         screen = QApplication.primaryScreen().geometry()
         x = (screen.width() - CONFIG["ui_width"]) // 2
         y = screen.height() - CONFIG["ui_height"] - CONFIG["ui_bottom_margin"]
         
         self.setGeometry(x, y, CONFIG["ui_width"], CONFIG["ui_height"])
-        self.label.setGeometry(0, 0, CONFIG["ui_width"], CONFIG["ui_height"])
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.view.setGeometry(0, 0, CONFIG["ui_width"], CONFIG["ui_height"])
         self.oldPos = self.pos()
+        self.last_zh_text = ""
+        # Pending updates from the worker threads are rendered at most ui_max_fps times per second;
+        # the timer runs only while updates keep arriving
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setInterval(max(1, round(1000 / float(CONFIG["ui_max_fps"])))) # type: ignore
+        self.frame_timer.timeout.connect(self.render_pending)
+        self.wake.connect(self.start_frames)
+        SUBTITLES.on_wake = self.wake.emit
 
     # Language code to flag emoji mapping
     LANG_FLAGS = {
@@ -117,12 +83,54 @@ class SubtitleWindow(QWidget):
         "hi": "🇮🇳", "th": "🇹🇭", "vi": "🇻🇳", "zh": "🇨🇳",
     }
 
-    def update_text(self, zh_text, source_text, source_lang=""):
-        if zh_text or source_text:
-            flag = self.LANG_FLAGS.get(source_lang, "🌍") if source_lang else ""
-            lang_indicator = f"<span style='font-size:12px;'>{flag}</span> " if flag else ""
-            html = f"<div align='center' style='line-height:1.2; font-weight: bold;'>{zh_text}<br>{lang_indicator}<span style='font-size:16px; color:#aeaeb2; font-weight: normal;'>{source_text}</span></div>"
-            self.label.setText(html)
+    def showEvent(self, event):
+        self.start_frames()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.frame_timer.stop()
+        super().hideEvent(event)
+
+    def start_frames(self):
+        if self.isVisible() and not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def render_pending(self):
+        """Frame tick: apply everything posted since the last frame, render once (idle: stop ticking)."""
+        pending = SUBTITLES.take()
+        if not pending:
+            self.frame_timer.stop()
+            return
+        for kind, args in pending:
+            if kind == "translation":
+                self.set_text(*args)
+            else:
+                self.set_partial(*args)
+
+    def show_message(self, text):
+        self.last_zh_text = ""
+        self.view.set_lines(text)
+
+    def source_prefix(self, source_lang):
+        return f"{self.LANG_FLAGS.get(source_lang, '🌍')} " if source_lang else ""
+
+    def set_text(self, zh_text, source_text, source_lang=""):
+        if not (zh_text or source_text):
+            return
+        self.last_zh_text = zh_text
+        self.view.set_lines(zh_text, self.source_prefix(source_lang) + source_text)
+
+    def set_partial(self, committed_text, provisional_text, source_lang=""):
+        """Streaming ASR: the live source line, provisional words dimmed."""
+        if not (committed_text or provisional_text):
+            return
+        source = self.source_prefix(source_lang) + committed_text
+        dim_from = None
+        if provisional_text:
+            source += " "
+            dim_from = len(source)
+            source += provisional_text
+        self.view.set_lines(self.last_zh_text, source, dim_from)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -134,355 +142,28 @@ class SubtitleWindow(QWidget):
             self.move(self.pos() + delta)
             self.oldPos = event.globalPosition().toPoint()
 
-# Whisper hallucination detection: substring patterns (case-insensitive for English)
-HALLUCINATION_PATTERNS = [
-    "thank you", "thanks for watching", "please subscribe", 
-    "bye bye", "bye.", "subtitles by", "don't forget to like",
-    "see you in the next", "i'll be right back",
-    "set to continue", "mbc",
-]
-
-# CJK hallucination patterns (checked at Whisper level for multi-language mode)
-CJK_HALLUCINATION_PATTERNS = [
-    # Chinese
-    "感谢观看", "谢谢观看", "谢谢", "别忘了点赞", "请订阅", "下次再见",
-    "我马上回来", "广告之后", "字幕由", "字幕提供",
-    # Japanese  
-    "ご視聴", "チャンネル登録", "ありがとうございました",
-    "お疲れ様", "よろしくお願い",
-    # Korean
-    "시청해", "구독", "감사합니다",
-]
-
-# Chinese hallucination patterns (for Ollama output filtering)
-ZH_HALLUCINATION_PATTERNS = [
-    "感谢观看", "谢谢观看", "别忘了点赞", "请订阅", "下次再见",
-    "我马上回来", "广告之后",
-]
-
-def is_whisper_hallucination(text: str, processing_time: float) -> bool:
-    """Check if Whisper output is likely a hallucination."""
-    t = text.strip()
-    t_lower = t.lower()
-    # Very short text (covers single CJK chars like "你", "の", etc.)
-    if len(t) <= 2:
-        return True
-    # Only punctuation (including CJK punctuation)
-    if all(c in '.,!?…-。、！？…—「」『』（）' for c in t):
-        return True
-    # English substring pattern match (case-insensitive)
-    for pattern in HALLUCINATION_PATTERNS:
-        if pattern in t_lower:
-            return True
-    # CJK substring pattern match (exact, no case folding needed)
-    for pattern in CJK_HALLUCINATION_PATTERNS:
-        if pattern in t:
-            return True
-    # If Whisper took >5s on a single chunk, it's likely processing silence
-    if processing_time > 5.0:
-        return True
-    return False
-
-def is_zh_hallucination(zh_text: str) -> bool:
-    """Check if Ollama output contains hallucinated Chinese phrases."""
-    for pattern in ZH_HALLUCINATION_PATTERNS:
-        if pattern in zh_text:
-            return True
-    return False
-
-class TranscriberThread(QThread):
-    def __init__(self):
-        super().__init__()
-        # Language detection cache: detect first N segments, then reuse
-        self.detected_language: str | None = None
-        self.lang_detect_count: int = 0
-        self.LANG_STABLE_THRESHOLD: int = 3  # After 3 consistent detections, cache
-        self.segment_since_last_recheck: int = 0
-        self.RECHECK_INTERVAL: int = 10  # Re-detect language every N segments
-
-    def reset_language_cache(self):
-        """Reset language detection cache — call when starting new content."""
-        self.detected_language = None
-        self.lang_detect_count = 0
-        self.segment_since_last_recheck = 0
-        print("[Whisper] Language cache reset")
-
-    def run(self):
-        print(f"[Whisper] Loading model '{CONFIG['whisper_model']}'...")
-        try:
-            model = WhisperModel(CONFIG["whisper_model"], device="cpu", compute_type="int8")
-            print("[Whisper] Model loaded (multi-language auto-detect).")
-        except Exception as e:
-            print(f"[Whisper] Failed to load model: {e}")
-            return
-
-        while True:
-            audio_data = audio_queue.get()
-            if audio_data is None: break # Exit signal
-            
-            if not isinstance(audio_data, np.ndarray): continue
-            audio_float32 = audio_data.astype(np.float32) / 32768.0 # type: ignore
-            
-            start_t = time.time()
-            
-            # Language detection with caching + periodic re-check:
-            # - First N segments: auto-detect language
-            # - After stable: reuse cached language, but re-check every RECHECK_INTERVAL
-            self.segment_since_last_recheck += 1
-            needs_detection = (
-                not self.detected_language
-                or self.lang_detect_count < self.LANG_STABLE_THRESHOLD
-                or self.segment_since_last_recheck >= self.RECHECK_INTERVAL
-            )
-            
-            if not needs_detection:
-                # Language is stable and no re-check needed
-                segments, _ = model.transcribe(
-                    audio_float32,
-                    beam_size=1,
-                    best_of=1,
-                    language=self.detected_language,
-                    vad_filter=False,
-                    condition_on_previous_text=False,
-                )
-                detected_lang = self.detected_language
-            else:
-                # Auto-detect language (first few segments)
-                segments_gen, info = model.transcribe(
-                    audio_float32,
-                    beam_size=1,
-                    best_of=1,
-                    vad_filter=False,
-                    condition_on_previous_text=False,
-                )
-                segments = segments_gen
-                detected_lang = info.language
-                self.segment_since_last_recheck = 0  # Reset re-check counter
-                
-                # Update cache
-                if detected_lang == self.detected_language:
-                    self.lang_detect_count += 1
-                else:
-                    # Language changed! Reset cache to new language
-                    if self.detected_language is not None:
-                        print(f"[Whisper] Language changed: {self.detected_language} -> {detected_lang}")
-                    self.detected_language = detected_lang
-                    self.lang_detect_count = 1
-                
-                print(f"[Whisper] Detected language: {detected_lang} (count: {self.lang_detect_count}/{self.LANG_STABLE_THRESHOLD})")
-            
-            text = "".join([s.text for s in segments]).strip()
-            processing_time = time.time() - start_t
-            
-            # HALLUCINATION FILTER (substring + timing based)
-            if text:
-                if is_whisper_hallucination(text, processing_time):
-                    print(f"[Whisper] Filtered hallucination: '{text}' ({processing_time:.2f}s)")
-                    continue
-
-                print(f"[Whisper] [{detected_lang}] {text} ({processing_time:.2f}s)")
-                try:
-                    translation_queue.put_nowait((text, detected_lang))
-                except queue.Full:
-                    try:
-                        _ = translation_queue.get_nowait()
-                        translation_queue.put_nowait((text, detected_lang))
-                    except queue.Empty:
-                        translation_queue.put_nowait((text, detected_lang))
-
-class TranslatorThread(QThread):
-    translation_ready = pyqtSignal(str, str, str)  # zh_text, source_text, source_lang
-    
-    def __init__(self):
-        super().__init__()
-        # Bilingual context: list of (source, zh) tuples
-        self.context_pairs: list[tuple[str, str]] = []
-
-    def run(self):
-        print("[Translator] Thread started (streaming, multi-language).")
-        while True:
-            item = translation_queue.get()
-            if item is None: break # Exit signal
-            
-            # Unpack (text, lang) tuple from queue
-            source_text, source_lang = item  # type: ignore
-            source_text = str(source_text).strip()
-            if not source_text:
-                continue
-            
-            # If source is already Chinese, display directly without translation
-            if source_lang == "zh":
-                print(f"[Translator] Chinese detected, displaying directly: '{source_text}'")
-                self.translation_ready.emit(source_text, source_text, source_lang)
-                continue
-
-            # Build BILINGUAL context: show both EN and ZH of recent segments
-            context_lines = []
-            for en, zh in self.context_pairs[-3:]:  # type: ignore
-                context_lines.append(f"EN: {en}")
-                context_lines.append(f"ZH: {zh}")
-            
-            if context_lines:
-                context_block = "\n".join(context_lines)
-                full_prompt = f"[Translation history for context:]\n{context_block}\n\n[Now translate this new segment:]\n{source_text}"
-            else:
-                full_prompt = source_text
-            
-            system_msg = str(CONFIG["system_prompt"])
-            
-            payload = {
-                "model": str(CONFIG["ollama_model"]),
-                "prompt": full_prompt,
-                "system": system_msg,
-                "stream": True,  # Low-latency: streaming output
-                "options": {
-                    "temperature": 0.0,
-                    "top_p": 0.1
-                }
-            }
-            
-            start_t = time.time()
-            try:
-                resp = requests.post(
-                    CONFIG["ollama_api_url"], 
-                    json=payload, 
-                    timeout=10.0,
-                    stream=True,  # Enable HTTP streaming
-                    proxies={"http": None, "https": None}
-                )
-                resp.raise_for_status()
-                
-                # Stream tokens and update UI incrementally
-                zh_text = ""
-                for line in resp.iter_lines(decode_unicode=True):
-                    if not line:
-                        continue
-                    try:
-                        chunk = json.loads(line)
-                        token = str(chunk.get("response", ""))
-                        if token:
-                            zh_text += token
-                            # Emit after each token for instant UI update
-                            self.translation_ready.emit(zh_text, source_text, source_lang)
-                    except json.JSONDecodeError:
-                        continue
-                
-                zh_text = str(zh_text).strip()
-                
-                # Filter garbage output + Chinese hallucinations
-                if zh_text and not zh_text.startswith("[") and not zh_text.startswith("Translate") and not is_zh_hallucination(zh_text):
-                    print(f"[Ollama] {zh_text} ({time.time()-start_t:.2f}s)")
-                    # Final emit with clean text
-                    self.translation_ready.emit(zh_text, source_text, source_lang)
-                    
-                    # Store bilingual pair for future context
-                    self.context_pairs.append((source_text, zh_text))
-                    if len(self.context_pairs) > 5:
-                        self.context_pairs = self.context_pairs[-5:]  # type: ignore
-                else:
-                    print(f"[Ollama] Filtered bad output: {zh_text}")
-                    
-            except requests.exceptions.Timeout:
-                print(f"[Ollama] Timeout ({time.time()-start_t:.2f}s) - skipping")
-            except Exception as e:
-                print(f"[Ollama Error] {e}")
-
-class AudioCaptureThread(QThread):
-    error_signal = pyqtSignal(str)
-
-    def __init__(self):
-        super().__init__()
-        self.p = pyaudio.PyAudio()
-        self.vad = webrtcvad.Vad(CONFIG["vad_mode"])
-        self.stream = None
-        self.running = True
-
-    def run(self):
-        device_index = self.p.get_default_input_device_info()['index']
-        blackhole_found = False
-        for i in range(self.p.get_device_count()):
-            info = self.p.get_device_info_by_index(i)
-            if "BlackHole" in info.get('name') and info.get('maxInputChannels') > 0:
-                device_index = i
-                blackhole_found = True
-                break
-
-        if not blackhole_found:
-            self.error_signal.emit("BlackHole not found! Capturing from default mic instead. Please set aggregate device.")
-
-        print(f"[Audio] Capturing from device {device_index}")
-        
-        try:
-            self.stream = self.p.open(format=pyaudio.paInt16, channels=1,
-                                      rate=CONFIG["sample_rate"], input=True,
-                                      input_device_index=device_index,
-                                      frames_per_buffer=CHUNK_SIZE)
-        except Exception as e:
-            self.error_signal.emit(f"Failed to open audio stream: {e}")
-            return
-            
-        current_buffer = []
-        silence_counter: int = 0
-        
-        try:
-            while self.running:
-                if self.stream is None:
-                    break
-                try:
-                    data = self.stream.read(CHUNK_SIZE, exception_on_overflow=False) # type: ignore
-                except Exception:
-                    continue
-                    
-                is_speech = self.vad.is_speech(data, CONFIG["sample_rate"])
-                
-                if is_speech:
-                    silence_counter = 0
-                    current_buffer.append(data)
-                else:
-                    import typing
-                    sc_val = typing.cast(int, silence_counter)
-                    silence_counter = sc_val + 1
-                    if current_buffer:
-                        current_buffer.append(data)
-                        
-                force_cut = len(current_buffer) >= int(MAX_CHUNKS)
-                silence_cut = (int(silence_counter) >= int(SILENCE_CHUNKS_THRESHOLD)) and len(current_buffer) > 10
-                
-                if force_cut or silence_cut:
-                    combined = b"".join(current_buffer)
-                    audio_np = np.frombuffer(combined, dtype=np.int16)
-                    audio_queue.put(audio_np.copy())
-                    current_buffer = []
-                    silence_counter = 0
-        finally:
-            # Clean up stream resources here (in the worker thread, not stop())
-            if self.stream:
-                try:
-                    self.stream.stop_stream()  # type: ignore
-                    self.stream.close()  # type: ignore
-                except Exception:
-                    pass
-            try:
-                self.p.terminate()
-            except Exception:
-                pass
-
-    def stop(self):
-        # Only set flag — stream cleanup happens in run()'s finally block
-        self.running = False
-
 # ================= System Tray Agent =================
+# A thin Qt consumer of the headless pipeline (realtime_core.py): it starts
+# and stops capture and re-emits the worker threads' callbacks as signals,
+# so they are handled on the GUI thread.
 class MenuBarAgent(QSystemTrayIcon):
-    def __init__(self, app, window, transcriber, translator):
+    ollama_models_loaded = pyqtSignal(list)  # Model names from /api/tags (fetched off the GUI thread)
+    readiness_changed = pyqtSignal()  # STARTUP.states changed
+    model_status = pyqtSignal(str, bool)  # model_name, loaded_ok (background model switch)
+    capture_error = pyqtSignal(str)
+
+    def __init__(self, app, window, pipeline, source_factory=None):
         # Initialize without positional arguments to satisfy strict linters
         super().__init__()
         self.setParent(app)
         self.setIcon(QIcon())
         self.app = app
         self.window = window
-        self.transcriber = transcriber
-        self.translator = translator
-        self.audio_thread = None
+        self.pipeline = pipeline
+        self.transcriber = pipeline.transcriber
+        self.translator = pipeline.translator
+        # Builds the AudioSource for each Start (None = live capture)
+        self.source_factory = source_factory
         
         # Create a High-Visibility custom icon
         self.update_icon()
@@ -492,6 +173,15 @@ class MenuBarAgent(QSystemTrayIcon):
         self.menu = QMenu() # No parent needed if it's set as context menu, but app is safer 
         self.menu.setMinimumWidth(180)
         
+        # Readiness of the models (loading in the background)
+        self.status_action = QAction(STARTUP.describe() or "Starting...", self)
+        self.status_action.setEnabled(False)
+        self.menu.addAction(self.status_action)
+        self.transcriber.on_readiness = self.readiness_changed.emit
+        self.translator.on_readiness = self.readiness_changed.emit
+        self.readiness_changed.connect(self.update_status)
+        self.capture_error.connect(self.show_error)
+        
         # Start/Stop Action
         self.start_action = QAction("▶ Start Translation", self)
         self.start_action.triggered.connect(self.toggle_translation)
@@ -507,6 +197,8 @@ class MenuBarAgent(QSystemTrayIcon):
         self.whisper_menu = QMenu("ASR Model (Whisper)", self.settings_menu)
         self.settings_menu.addMenu(self.whisper_menu)
         self.whisper_group = QActionGroup(self)
+        self.transcriber.on_model_status = self.model_status.emit
+        self.model_status.connect(self.on_whisper_model_status)
         for model in ["tiny", "base", "small"]:
             action = QAction(model, self, checkable=True)
             if model == CONFIG["whisper_model"]:
@@ -515,15 +207,59 @@ class MenuBarAgent(QSystemTrayIcon):
             self.whisper_group.addAction(action)
             self.whisper_menu.addAction(action)
             
+        # Translation backend menu
+        self.backend_menu = QMenu("Translation Backend", self.settings_menu)
+        self.settings_menu.addMenu(self.backend_menu)
+        self.backend_group = QActionGroup(self)
+        for name, label in [("ollama", "Ollama (LLM)"), ("ctranslate2", "CTranslate2 (NLLB / OPUS-MT, in-process)")]:
+            action = QAction(label, self, checkable=True)
+            action.setChecked(name == CONFIG["translation_backend"])
+            action.triggered.connect(lambda checked, n=name: self.change_backend(n))
+            self.backend_group.addAction(action)
+            self.backend_menu.addAction(action)
+        
         # Ollama Menu
         self.ollama_menu = QMenu("LLM Translate (Ollama)", self.settings_menu)
         self.settings_menu.addMenu(self.ollama_menu)
         self.ollama_group = QActionGroup(self)
-        self.load_ollama_models()
+        loading_action = QAction("Loading models...", self)
+        loading_action.setEnabled(False)
+        self.ollama_menu.addAction(loading_action)
+        self.ollama_models_loaded.connect(self.populate_ollama_models)
+        threading.Thread(target=self.load_ollama_models, daemon=True).start()
         self.settings_menu.addSeparator()
         
+        # Streaming ASR toggle (partial results while speech continues)
+        self.streaming_action = QAction("Streaming ASR (partial results)", self, checkable=True)
+        self.streaming_action.setChecked(bool(CONFIG["streaming_asr"]))
+        self.streaming_action.triggered.connect(self.toggle_streaming)
+        self.settings_menu.addAction(self.streaming_action)
+        
+        # Speculative translation toggle (translate streaming hypotheses early)
+        self.speculative_action = QAction("Speculative translation (with streaming)", self, checkable=True)
+        self.speculative_action.setChecked(bool(CONFIG["speculative_translation"]))
+        self.speculative_action.triggered.connect(self.toggle_speculative)
+        self.settings_menu.addAction(self.speculative_action)
+        
+        # Batched ASR toggle (decode backlogs in one call)
+        self.batched_action = QAction("Batched ASR (catch up on backlogs)", self, checkable=True)
+        self.batched_action.setChecked(bool(CONFIG["batched_asr"]))
+        self.batched_action.triggered.connect(self.toggle_batched)
+        self.settings_menu.addAction(self.batched_action)
+        
+        # Latency controller toggle
+        self.controller_action = QAction(f"Auto-tune for {CONFIG['target_lag_s']}s lag", self, checkable=True)
+        self.controller_action.setChecked(bool(CONFIG["latency_controller"]))
+        self.controller_action.triggered.connect(self.toggle_controller)
+        self.settings_menu.addAction(self.controller_action)
+        
         self.menu.addSeparator()
         
+        # Latency stats from the per-segment traces
+        stats_action = QAction("📊 Latency Stats", self)
+        stats_action.triggered.connect(self.show_latency_stats)
+        self.menu.addAction(stats_action)
+        
         # Quit
         quit_action = QAction("Quit", self)
         quit_action.triggered.connect(self.quit_app)
@@ -550,8 +286,14 @@ class MenuBarAgent(QSystemTrayIcon):
         painter.end()
         self.setIcon(QIcon(pixmap))
 
+    def update_status(self):
+        self.status_action.setText(STARTUP.describe())
+
     def load_ollama_models(self):
+        """Runs on a helper thread; the menu is filled in on the GUI thread."""
+        start = time.perf_counter()
         try:
+            import requests # type: ignore
             resp = requests.get("http://127.0.0.1:11434/api/tags", timeout=2.0)
             if resp.status_code == 200:
                 models = [m["name"] for m in resp.json().get("models", [])]
@@ -561,7 +303,11 @@ class MenuBarAgent(QSystemTrayIcon):
                 models = ["qwen2.5:3b (fallback)"]
         except Exception:
             models = ["qwen2.5:3b (fallback)"]
-            
+        STARTUP.record("list Ollama models", start)
+        self.ollama_models_loaded.emit(models)
+
+    def populate_ollama_models(self, models):
+        self.ollama_menu.clear()
         for model in models:
             m_str = str(model)
             action = QAction(m_str, self, checkable=True)
@@ -572,92 +318,152 @@ class MenuBarAgent(QSystemTrayIcon):
             self.ollama_menu.addAction(action)
 
     def change_whisper(self, model_name):
-        print(f"Applying new Whisper Model (Requires Restart): {model_name}")
-        CONFIG["whisper_model"] = model_name
+        print(f"Applying new Whisper Model (loading in background): {model_name}")
+        self.transcriber.request_model(model_name)
+
+    def on_whisper_model_status(self, model_name, ok):
+        if ok:
+            self.showMessage("Subtitle Agent", f"Whisper model switched to '{model_name}'",
+                             QSystemTrayIcon.MessageIcon.Information, 2000)
+            return
+        self.showMessage("Subtitle Agent", f"Failed to load Whisper model '{model_name}'",
+                         QSystemTrayIcon.MessageIcon.Warning, 3000)
+        # Put the check mark back on the model that is still serving
+        for action in self.whisper_group.actions():
+            action.setChecked(action.text() == self.transcriber.model_name)
 
     def change_ollama(self, model_name):
         actual_name = model_name.split(" ")[0]
         print(f"Applying new Ollama Model: {actual_name}")
         CONFIG["ollama_model"] = actual_name
+        self.translator.request_warm_up()
+
+    def change_backend(self, name):
+        print(f"Applying translation backend: {name}")
+        CONFIG["translation_backend"] = name
+        self.translator.request_warm_up()
+
+    def toggle_streaming(self, checked):
+        print(f"Streaming ASR: {'on' if checked else 'off'}")
+        CONFIG["streaming_asr"] = bool(checked)
+
+    def toggle_speculative(self, checked):
+        print(f"Speculative translation: {'on' if checked else 'off'}")
+        CONFIG["speculative_translation"] = bool(checked)
+
+    def toggle_batched(self, checked):
+        print(f"Batched ASR: {'on' if checked else 'off'}")
+        CONFIG["batched_asr"] = bool(checked)
+
+    def toggle_controller(self, checked):
+        print(f"Latency controller: {'on' if checked else 'off'}")
+        CONFIG["latency_controller"] = bool(checked)
+        if not checked:
+            CONTROLLER.reset()
 
     def toggle_translation(self):
-        thread = self.audio_thread
-        if thread is not None:
-            if thread.isRunning():
-                # Stop — non-blocking with timeout to prevent freeze
-                thread.stop()
-                if not thread.wait(3000):  # 3 second timeout
-                    print("[Agent] Audio thread didn't stop in time, forcing termination")
-                    thread.terminate()
-                    thread.wait(1000)
-                self.audio_thread = None
-                self.window.hide()
-                self.start_action.setText("▶ Start Translation")
-                
-                # Clear queues
-                while not audio_queue.empty():
-                    try: audio_queue.get_nowait()
-                    except: pass
-                while not translation_queue.empty():
-                    try: translation_queue.get_nowait()
-                    except: pass
-            else:
-                # Start
-                self.window.label.setText("Waiting for speech... 🎙️")
-                # ... rest of the logic involves creating a NEW thread anyway
-                pass
+        if self.pipeline.capture is not None:
+            # Stop (also after a replay has finished on its own)
+            self.pipeline.stop_capture(timeout=3.0)
+            self.window.hide()
+            SUBTITLES.discard()
+            self.start_action.setText("▶ Start Translation")
         else:
             # Start
-            self.window.label.setText("Waiting for speech... 🎙️")
+            self.window.show_message("Waiting for speech... 🎙️")
             self.window.show()
-            # Reset language cache for new content
-            self.transcriber.reset_language_cache()
-            new_thread = AudioCaptureThread()
-            self.audio_thread = new_thread
-            new_thread.error_signal.connect(self.show_error)
-            new_thread.start()
+            source = self.source_factory() if self.source_factory else None
+            self.pipeline.start_capture(source, on_error=self.capture_error.emit)
             self.start_action.setText("⏹ Stop Translation")
 
+    def show_latency_stats(self):
+        report = (TRACER.format_report() + f" | startup: {STARTUP.format_report()}"
+                  f" | scheduler: {audio_queue.format_stats()}"
+                  f" | filtered: {HALLUCINATION_FILTER.format_stats()}"
+                  f" | speech gate: {SPEECH_GATE.format_stats()}")
+        if isinstance(self.transcriber.model, WhisperProcessPool):
+            report += f" | ASR processes: {self.transcriber.model.format_stats()}"
+        if self.translator.cache:
+            report += f" | translation cache: {self.translator.cache.format_stats()}"
+        if CONFIG["speculative_translation"]:
+            report += f" | speculation: {self.translator.spec_stats.format()}"
+        report += f" | translation order: {self.translator.order.format_stats()}"
+        report += f" | subtitles: {SUBTITLES.format_stats()}, {self.window.view.format_stats()}"
+        for backend in list(self.translator.backends.values()):
+            report += f" | {backend.describe()}: {backend.format_stats()}"
+        TRACER.log_report()
+        self.showMessage("Latency (ms)", report.replace(" | ", "\n"), QSystemTrayIcon.MessageIcon.Information, 8000)
+
     def show_error(self, err):
         print(f"Error: {err}")
         # Could show OS notification here if needed
 
     def quit_app(self):
-        thread = self.audio_thread
-        if thread is not None and thread.isRunning():
-            thread.stop()
-            thread.wait()
-            
-        audio_queue.put(None)
-        translation_queue.put(None) # type: ignore
-        
-        self.transcriber.quit()
-        self.transcriber.wait()
-        self.translator.quit()
-        self.translator.wait()
-        
+        self.pipeline.close(drain=False)
         self.app.quit()
 
 # ================= Main =================
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Realtime subtitle translator (menu bar agent)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Replay a WAV/raw PCM file (or '-' for stdin) instead of live capture")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 = real time, N = N× faster, 0 = as fast as possible")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Start with streaming ASR (partial results) enabled")
+    parser.add_argument("--batched", action="store_true",
+                        help="Decode queued backlogs with batched Whisper inference")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Streaming ASR + translate hypotheses before segments close")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="Translation backend (default: CONFIG['translation_backend'])")
+    parser.add_argument("--mt-model", metavar="DIR", help="CTranslate2 MT model directory")
+    parser.add_argument("--asr-processes", type=int, metavar="N",
+                        help="Run Whisper in N worker processes (default: CONFIG['asr_processes'], 0 = in-process)")
+    # Leave unknown (Qt) arguments for QApplication
+    args, qt_args = parser.parse_known_args(argv[1:])
+    if args.replay and args.replay != "-" and not os.path.exists(args.replay):
+        parser.error(f"replay file not found: {args.replay}")
+    return args, qt_args
+
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Must NOT quit when window is hidden
     app.setQuitOnLastWindowClosed(False)
 
+    if args.streaming:
+        CONFIG["streaming_asr"] = True
+    if args.batched:
+        CONFIG["batched_asr"] = True
+    if args.speculative:
+        CONFIG["streaming_asr"] = True
+        CONFIG["speculative_translation"] = True
+    if args.backend:
+        CONFIG["translation_backend"] = args.backend
+    if args.mt_model:
+        CONFIG["mt_model_path"] = args.mt_model
+    if args.asr_processes is not None:
+        CONFIG["asr_processes"] = args.asr_processes
+
     window = SubtitleWindow()
     # DO NOT show window initially.
     
-    # Start blocking agent threads
-    transcriber_th = TranscriberThread()
-    translator_th = TranslatorThread()
-    translator_th.translation_ready.connect(window.update_text)
+    # Worker threads only post subtitle state; the window takes the latest once per frame
+    pipeline = Pipeline()
+    pipeline.transcriber.on_partial = lambda committed, provisional, lang: SUBTITLES.post("partial", committed, provisional, lang)
+    pipeline.translator.on_subtitle = lambda trace, zh_text, source_text, lang, final: SUBTITLES.post("translation", zh_text, source_text, lang)
     
-    transcriber_th.start()
-    translator_th.start()
-    
-    agent = MenuBarAgent(app, window, transcriber_th, translator_th)
+    source_factory = None
+    if args.replay:
+        source_factory = lambda: open_audio_source(args.replay, CONFIG["sample_rate"], CHUNK_SIZE, speed=args.speed)
+    agent = MenuBarAgent(app, window, pipeline, source_factory=source_factory)
     agent.show()
+    STARTUP.mark("tray icon shown")
+    
+    # Heavy imports, model loading and warm-ups all run in the background from here
+    pipeline.start()
     
     # Show a system notification to confirm it started
     agent.showMessage("Subtitle Agent", "Running in Menu Bar (右上角已启动)", QSystemTrayIcon.MessageIcon.Information, 3000)
@@ -0,0 +1,168 @@
+import json
+import asyncio
+import urllib.parse
+
+# ================= Async Ollama Client =================
+# Minimal asyncio HTTP/1.1 client for Ollama's streaming NDJSON endpoints.
+# Connections are kept alive and reused between requests, so a subtitle
+# doesn't pay for a new TCP handshake. Cancelling the task that consumes a
+# stream closes its connection mid-response; Ollama aborts a generation
+# when its client disconnects, so the LLM slot is freed right away instead
+# of finishing a translation nobody will see.
+
+
+class OllamaError(Exception):
+    pass
+
+
+class OllamaClient:
+    """Pooled keep-alive client: `async for chunk in client.stream(payload)`."""
+
+    def __init__(self, url: str, max_idle: int = 2, connect_timeout: float = 3.0):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Unsupported Ollama URL: {url}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0, "cancelled": 0}
+
+    async def _open(self):
+        conn = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        self.stats["connections_opened"] += 1
+        return conn
+
+    def _release(self, conn):
+        if len(self._idle) < self.max_idle and not conn[1].is_closing():
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def _request(self, conn, body: bytes, path: str):
+        reader, writer = conn
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _body(self, reader: asyncio.StreamReader, headers: dict):
+        """Yield raw body pieces (chunked, Content-Length or read-to-EOF)."""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # Trailers
+                    return
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)  # CRLF after each chunk
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining > 0:
+                data = await reader.read(min(remaining, 65536))
+                if not data:
+                    raise ConnectionResetError("Connection closed mid-body")
+                remaining -= len(data)
+                yield data
+        else:
+            while data := await reader.read(65536):
+                yield data
+
+    async def stream(self, payload: dict, path: str | None = None):
+        """POST `payload` and yield each NDJSON object of the (streamed) response."""
+        path = path or self.path
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.stats["requests"] += 1
+        reused = bool(self._idle)
+        conn = self._idle.pop() if reused else await self._open()
+        reusable = False
+        try:
+            try:
+                status, headers = await self._request(conn, body, path)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                # The server dropped the idle keep-alive connection; retry once on a fresh one
+                conn[1].close()
+                reused = False
+                conn = await self._open()
+                status, headers = await self._request(conn, body, path)
+            if reused:
+                self.stats["connections_reused"] += 1
+
+            pending = b""
+            error = None
+            async for data in self._body(conn[0], headers):
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError:
+                        if status != 200 and error is None:
+                            error = line.decode("utf-8", "replace")[:500]  # e.g. a proxy's HTML error page
+                        continue
+                    if status != 200:
+                        error = chunk.get("error", chunk) if isinstance(chunk, dict) else chunk
+                        continue
+                    yield chunk
+            if pending.strip():
+                try:
+                    chunk = json.loads(pending)
+                except json.JSONDecodeError:
+                    # Truncated stream or a non-JSON body (proxy error page)
+                    raise OllamaError(f"HTTP {status}: invalid response: "
+                                      f"{pending.decode('utf-8', 'replace')[:500]}") from None
+                if status != 200:
+                    error = chunk.get("error", chunk) if isinstance(chunk, dict) else chunk
+                else:
+                    yield chunk
+            # Whole body consumed: the connection can serve the next request
+            reusable = "transfer-encoding" in headers or "content-length" in headers
+            reusable = reusable and headers.get("connection", "").lower() != "close"
+            if status != 200:
+                raise OllamaError(f"HTTP {status}: {error}")
+        except (asyncio.CancelledError, GeneratorExit):
+            # Superseded: hanging up makes Ollama stop generating
+            self.stats["cancelled"] += 1
+            raise
+        finally:
+            if reusable:
+                self._release(conn)
+            else:
+                conn[1].close()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"{s['requests']} requests on {s['connections_opened']} connections "
+                f"({s['connections_reused']} reused), {s['cancelled']} cancelled")
@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import argparse
+
+# The pipeline logs with print() (some of it at import); keep the real stdout for subtitles only
+SUBTITLE_OUT, sys.stdout = sys.stdout, sys.stderr
+
+import realtime_core as core
+from audio_source import open_audio_source
+from translation_backends import BACKENDS
+from subtitle_formats import srt_cue
+
+# ================= Headless CLI =================
+# Runs the pipeline without Qt and writes subtitles to stdout as they are
+# finalized (in source order): one JSON object per line, or SRT cues. Log
+# lines go to stderr so stdout stays machine-readable.
+#
+#   python realtime_cli.py                               # live capture, JSONL
+#   python realtime_cli.py --replay talk.wav --speed 0 --format srt > talk.srt
+#   ffmpeg -i talk.mp4 -f s16le -ac 1 -ar 16000 - | python realtime_cli.py --replay - --speed 0
+
+
+class SubtitleWriter:
+    """Writes finalized subtitles (and, for JSONL, optionally partial updates) to a stream."""
+
+    def __init__(self, out, fmt: str = "jsonl", partials: bool = False):
+        self.out = out
+        self.fmt = fmt
+        self.partials = partials and fmt == "jsonl"
+        self.count: int = 0
+
+    def write_line(self, text: str):
+        self.out.write(text)
+        self.out.flush()
+
+    def on_subtitle(self, trace, zh_text: str, source_text: str, lang: str, final: bool):
+        if not final:
+            if self.partials:
+                self.write_line(json.dumps({"type": "partial", "id": trace.id, "lang": lang,
+                                            "source": source_text, "text": zh_text}, ensure_ascii=False) + "\n")
+            return
+        self.count += 1
+        if self.fmt == "srt":
+            self.write_line(srt_cue(self.count, trace.start_s, trace.end_s, zh_text, source_text))
+        else:
+            self.write_line(json.dumps({"type": "subtitle", "id": trace.id, "start": round(trace.start_s, 3),
+                                        "end": round(trace.end_s, 3), "lang": lang, "source": source_text,
+                                        "text": zh_text}, ensure_ascii=False) + "\n")
+
+    def on_partial(self, committed: str, provisional: str, lang: str):
+        """Streaming ASR: the source line of the segment still being spoken."""
+        if self.partials:
+            self.write_line(json.dumps({"type": "asr_partial", "lang": lang, "committed": committed,
+                                        "provisional": provisional}, ensure_ascii=False) + "\n")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Realtime subtitle translator without a GUI (subtitles on stdout)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Replay a WAV/raw PCM file (or '-' for stdin) instead of live capture")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 = real time, N = N× faster, 0 = as fast as possible")
+    parser.add_argument("--format", choices=["jsonl", "srt"], default="jsonl", help="Subtitle output format")
+    parser.add_argument("--partials", action="store_true",
+                        help="JSONL: also write streamed translation tokens and ASR partials")
+    parser.add_argument("--whisper-model", default=str(core.CONFIG["whisper_model"]))
+    parser.add_argument("--streaming", action="store_true", help="Enable streaming ASR (partial results)")
+    parser.add_argument("--batched", action="store_true", help="Decode queued backlogs with batched Whisper inference")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Streaming ASR + translate hypotheses before segments close")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="Translation backend (default: CONFIG['translation_backend'])")
+    parser.add_argument("--mt-model", metavar="DIR", help="CTranslate2 MT model directory")
+    parser.add_argument("--asr-processes", type=int, metavar="N",
+                        help="Run Whisper in N worker processes (default: CONFIG['asr_processes'], 0 = in-process)")
+    args = parser.parse_args(argv[1:])
+    if args.replay and args.replay != "-" and not os.path.exists(args.replay):
+        parser.error(f"replay file not found: {args.replay}")
+    return args
+
+
+def main() -> int:
+    args = parse_args(sys.argv)
+    core.CONFIG["whisper_model"] = args.whisper_model
+    if args.streaming:
+        core.CONFIG["streaming_asr"] = True
+    if args.batched:
+        core.CONFIG["batched_asr"] = True
+    if args.speculative:
+        core.CONFIG["streaming_asr"] = True
+        core.CONFIG["speculative_translation"] = True
+    if args.backend:
+        core.CONFIG["translation_backend"] = args.backend
+    if args.mt_model:
+        core.CONFIG["mt_model_path"] = args.mt_model
+    if args.asr_processes is not None:
+        core.CONFIG["asr_processes"] = args.asr_processes
+
+    writer = SubtitleWriter(SUBTITLE_OUT, args.format, args.partials)
+    pipeline = core.Pipeline()
+    pipeline.transcriber.on_partial = writer.on_partial
+    pipeline.translator.on_subtitle = writer.on_subtitle
+    pipeline.start()
+    # Segments captured while Whisper loads would only pile up against their deadlines
+    if not pipeline.wait_ready():
+        print(f"[CLI] Whisper model '{core.CONFIG['whisper_model']}' failed to load")
+        pipeline.close(drain=False)
+        return 1
+
+    source = None
+    if args.replay:
+        source = open_audio_source(args.replay, core.CONFIG["sample_rate"], core.CHUNK_SIZE, speed=args.speed)
+    capture = pipeline.start_capture(source)
+    try:
+        while capture.is_alive():
+            capture.join(0.5)
+    except KeyboardInterrupt:
+        print("[CLI] Interrupted, finishing queued segments...")
+    # Replay finished (or Ctrl-C): translate what was captured, then exit
+    pipeline.close(drain=True)
+    print(f"[CLI] {writer.count} subtitles | {core.TRACER.format_report()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1127 @@
+import os
+import gc
+import time
+import queue
+import asyncio
+import threading
+import numpy as np # type: ignore
+from startup import StartupLog
+from audio_source import AudioSource, PyAudioSource
+from latency_trace import LatencyTracer, SegmentTrace
+from ring_buffer import AudioRingBuffer
+from latency_controller import LatencyController
+from language_id import LanguageEstimator
+from hallucination_filter import HallucinationFilter
+from segment_scheduler import SegmentScheduler
+from speech_gate import SpeechGate
+from translation_cache import TranslationCache
+from translation_backends import TranslationBackend, create_backend
+from reorder_buffer import ReorderBuffer
+from speculative_translation import Speculation, SpeculationStats, classify, grows, same_text
+from streaming_asr import LiveSegment, LocalAgreement, clean_word_boundary
+from asr_workers import ASRWorkerError, WhisperProcessPool
+
+# ================= Headless Pipeline Core =================
+# Capture → VAD → ASR → translation on plain threads, with no Qt import, so
+# the pipeline runs on a headless box or inside another service. The stages
+# report through callbacks (on_subtitle, on_partial, on_readiness, ...)
+# called on their own threads; consumers such as the tray app
+# (main_agent.py), the CLI (realtime_cli.py) and the benchmark hand them on
+# however they like. Pipeline wires the threads together.
+
+# ================= Configuration =================
+CONFIG = {
+    "whisper_model": "small",
+    "sample_rate": 16000,
+    "chunk_duration_ms": 30,
+    "vad_mode": 1,
+    "silence_trigger_ms": 100, # Low-latency: faster silence detection
+    "max_chunk_duration_s": 2.0, # Low-latency: earlier force-cut for long speech
+    "ring_buffer_s": 30.0, # Preallocated capture ring (must exceed max_chunk_duration_s)
+    "force_cut_carryover": True, # Force cuts: commit up to the last clean word, carry the tail over
+    "carryover_guard_s": 0.25, # Words ending this close to a force cut count as clipped
+    "beam_size": 1, # Whisper beam width (the latency controller may raise it when there is headroom)
+    "latency_controller": True, # Retune segmentation/decode knobs to hold target_lag_s
+    "target_lag_s": 2.5, # End-to-end lag (speech end -> final subtitle) the controller aims for
+    "controller_max_beam": 3,
+    "segment_deadline_s": 6.0, # ASR must finish this long after speech ends, else downgrade/shed (the controller tightens it)
+    "max_merge_s": 8.0, # Behind: coalesce queued segments that would miss their deadline, up to this length
+    "batched_asr": False, # Backlog: decode all queued segments in one batched Whisper call
+    "asr_batch_size": 8, # Max segments per batched call
+    "asr_processes": 0, # Run Whisper in this many worker processes (0 = in this process); audio goes via shared memory
+    "asr_process_timeout_s": 30.0, # A worker stuck this long on one call is killed and restarted
+    "lid_prefix_s": 3.0, # Language ID looks at this much of the segment (one encoder pass)
+    "lid_interval": 5, # Once the language is settled, re-identify every N segments
+    "lid_switch_margin": 0.25, # Another language must lead the running estimate by this share to switch
+    "hallucination_patterns_file": "hallucination_patterns.json", # Stock phrases per language (relative to this file)
+    "max_no_speech_prob": 0.6, # Drop Whisper segments that look like silence ...
+    "min_avg_logprob": -1.0, # ... or that the decoder has little confidence in ...
+    "max_compression_ratio": 2.4, # ... or that are repetition loops
+    "speech_gate": True, # Drop segments that are clearly not speech before they reach Whisper
+    "gate_min_level_db": -50.0, # Quieter than this (90th-percentile frame level, dBFS) = no speech
+    "gate_max_flatness": 0.4, # Flatter spectrum than this = noise / applause
+    "gate_min_speech_band": 0.3, # Less energy than this share in 100-4000 Hz = rumble / hiss
+    "gate_music_dynamics_db": 3.0, # Steadier level than this = music (flagged, decoded fast) ...
+    "gate_music_min_s": 4.0, # ... but only on segments this long (a held vowel is as steady)
+    "streaming_asr": False, # Re-decode the open segment for partial results
+    "stream_step_ms": 400, # Streaming: re-decode interval
+    "stream_max_chunk_duration_s": 10.0, # Streaming: partials show early, so segments can run longer
+    "translation_backend": "ollama", # "ollama" (LLM server) or "ctranslate2" (in-process MT model)
+    "mt_model_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "nllb-200-distilled-600M-ct2"),
+    "mt_compute_type": "int8",
+    "mt_threads": 4, # CTranslate2 intra-op threads
+    "mt_beam_size": 1, # Batched MT (streamed lines always decode greedily)
+    "mt_batch_size": 8, # Max queued lines translated in one MT call
+    "mt_max_decoding_length": 256,
+    "mt_source_lang": "", # Source language of a fixed-pair (OPUS-MT) model; "" = from its name (opus-mt-en-zh -> en)
+    "mt_target_token": ">>cmn_Hans<<", # OPUS-MT target-language token, prepended if the model knows it
+    "mt_fallback_backend": "ollama", # Translates lines a fixed pair can't read; "" = skip them
+    "ollama_api_url": "http://127.0.0.1:11434/api/generate",
+    "ollama_model": "qwen2.5:7b",
+    "ollama_chat": True, # Send /api/chat with an append-only history so Ollama reuses the prompt prefix
+    "ollama_keep_alive": "30m", # Keep the model loaded between subtitles (every request renews it)
+    "context_max_pairs": 8, # Chat history grows up to this many (source, translation) pairs ...
+    "context_keep_pairs": 2, # ... then is cut back to this many (the only full prompt re-evaluation)
+    "translation_timeout_s": 10.0,
+    "translation_workers": 2, # Translations in flight at once (shown in source order; see OLLAMA_NUM_PARALLEL)
+    "warm_up_models": True, # Throwaway Whisper decode + Ollama prefill at startup (and on model switch)
+    "speculative_translation": False, # Streaming ASR: translate the hypothesis before the segment closes
+    "cancel_superseded": True, # Backlogged past target_lag_s: a waiting segment cancels the oldest in-flight translation
+    "translation_cache": True, # Reuse translations of recurring lines (persisted across restarts)
+    "translation_cache_path": os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.sqlite3"),
+    "translation_cache_size": 5000, # Max cached translations (least recently used are evicted)
+    "batch_asr_workers": 0, # Offline batch mode: Whisper processes (0 = one per batch_asr_threads cores)
+    "batch_asr_threads": 2, # Offline batch mode: CPU threads per Whisper process
+    "batch_beam_size": 5, # Offline batch mode: no latency budget, so decode for accuracy
+    "batch_silence_ms": 300, # Offline batch mode: pause that ends a segment
+    "batch_max_segment_s": 15.0, # Offline batch mode: force-cut longer speech (longer cues decode more efficiently)
+    # Multi-language system prompt (auto-detect source language)
+    "system_prompt": (
+        "You are a professional subtitle translator.\n"
+        "Translate the following text from any language into natural, fluent Chinese (Simplified).\n"
+        "Automatically detect the source language and provide accurate translation.\n"
+        "Do NOT include any explanations, transliterations, or original text in your output.\n"
+        "Just provide the pure Chinese translation. If the text is already in Chinese, just output it as is."
+    ),
+    "ui_max_fps": 30, # Subtitle repaints per second at most (streamed tokens in between are coalesced)
+    "ui_width": 800,
+    "ui_min_font_scale": 0.6, # Long subtitles wrap, then shrink down to this fraction of the normal font size
+    "ui_height": 90,
+    "ui_bottom_margin": 100
+}
+
+# Derived configurations
+_sample_rate = int(CONFIG["sample_rate"]) # type: ignore
+_chunk_duration_ms = float(CONFIG["chunk_duration_ms"]) # type: ignore
+_silence_trigger_ms = float(CONFIG["silence_trigger_ms"]) # type: ignore
+_max_chunk_duration_s = float(CONFIG["max_chunk_duration_s"]) # type: ignore
+
+CHUNK_SIZE = int(_sample_rate * _chunk_duration_ms / 1000)
+SILENCE_CHUNKS_THRESHOLD = int(_silence_trigger_ms / _chunk_duration_ms)
+MAX_CHUNKS = int(_max_chunk_duration_s * 1000 / _chunk_duration_ms)
+STREAM_MAX_CHUNKS = int(float(CONFIG["stream_max_chunk_duration_s"]) * 1000 / _chunk_duration_ms) # type: ignore
+
+# ================= Lazy Heavy Imports =================
+# faster_whisper (ctranslate2, tokenizers, onnxruntime...) takes seconds to
+# import; it is only needed by the transcriber thread, which imports it
+# while the tray icon is already up.
+WhisperModel = None
+BatchedInferencePipeline = None
+
+def import_whisper():
+    global WhisperModel, BatchedInferencePipeline
+    if WhisperModel is None or BatchedInferencePipeline is None:
+        with STARTUP.phase("import faster_whisper"):
+            from faster_whisper import WhisperModel as _WhisperModel, BatchedInferencePipeline as _Batched # type: ignore
+        WhisperModel = WhisperModel or _WhisperModel
+        BatchedInferencePipeline = BatchedInferencePipeline or _Batched
+
+def load_whisper(model_name: str):
+    """WhisperModel in this process, or a WhisperProcessPool when asr_processes > 0."""
+    if int(CONFIG["asr_processes"]) > 0:
+        return WhisperProcessPool(model_name, int(CONFIG["asr_processes"]), warm_up=bool(CONFIG["warm_up_models"]),
+                                  timeout_s=float(CONFIG["asr_process_timeout_s"]))
+    import_whisper()
+    return WhisperModel(model_name, device="cpu", compute_type="int8") # type: ignore
+
+def release_whisper(model):
+    """Stop worker processes (an in-process model is freed by the garbage collector)."""
+    if isinstance(model, WhisperProcessPool):
+        model.close()
+
+def warm_up_whisper(model):
+    """One throwaway decode so the first real segment doesn't pay for lazy initialisation."""
+    if isinstance(model, WhisperProcessPool):
+        return  # Workers warm up before they report ready (and again after a restart)
+    segments, _ = model.transcribe(np.zeros(int(CONFIG["sample_rate"]), dtype=np.float32), # type: ignore
+                                   language="en", beam_size=1, without_timestamps=True)
+    list(segments)
+
+# ================= Global Queues =================
+# audio_queue carries (float32 audio, SegmentTrace); translation_queue carries (text, lang, SegmentTrace)
+translation_queue = queue.Queue(maxsize=5)  # Increased from 1 to prevent dropped segments
+
+# Per-segment stage timings, aggregated into rolling histograms
+TRACER = LatencyTracer()
+
+# Startup phase timings and component readiness (shown in the menu)
+STARTUP = StartupLog()
+
+# Coalesces / downgrades / sheds queued segments against their ASR deadline
+audio_queue = SegmentScheduler(CONFIG, TRACER)
+TRACER.add_listener(audio_queue.on_trace)
+
+# Cheap spectral check between segmentation and audio_queue
+SPEECH_GATE = SpeechGate(CONFIG, int(CONFIG["sample_rate"])) # type: ignore
+
+# Segment the capture thread is still filling (read by streaming ASR)
+live_segment = LiveSegment()
+
+# Retunes CONFIG knobs from the traces to hold target_lag_s
+CONTROLLER = LatencyController(CONFIG, lambda: audio_queue.qsize(), lambda: translation_queue.qsize())
+TRACER.add_listener(CONTROLLER.on_trace)
+
+# Whisper hallucination filter: decoder confidence + per-language stock phrases
+HALLUCINATION_FILTER = HallucinationFilter(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), str(CONFIG["hallucination_patterns_file"])),
+    max_no_speech_prob=float(CONFIG["max_no_speech_prob"]), # type: ignore
+    min_avg_logprob=float(CONFIG["min_avg_logprob"]), # type: ignore
+    max_compression_ratio=float(CONFIG["max_compression_ratio"]), # type: ignore
+)
+
+def is_usable_translation(zh_text: str) -> bool:
+    """Filter garbage output + Chinese hallucinations."""
+    return bool(zh_text) and not zh_text.startswith("[") and not zh_text.startswith("Translate") \
+        and not HALLUCINATION_FILTER.is_hallucination(zh_text, kind="translation")
+
+def push_translation(item):
+    """Queue (text, lang, trace) for translation, evicting the oldest item when full."""
+    try:
+        translation_queue.put_nowait(item)
+    except queue.Full:
+        try:
+            evicted = translation_queue.get_nowait()
+            if evicted is not None:
+                TRACER.drop(evicted[2], "translation_queue_full")
+            translation_queue.put_nowait(item)
+        except queue.Empty:
+            translation_queue.put_nowait(item)
+
+class TranscriberThread(threading.Thread):
+    def __init__(self):
+        super().__init__(name="Transcriber", daemon=True)
+        # Running language estimate from cheap prefix detections (see language_id.py)
+        self.lid = LanguageEstimator(switch_margin=float(CONFIG["lid_switch_margin"]))
+        self.segments_since_lid: int = 0
+        self.ready = threading.Event()  # Set once the model is loaded
+        # Hot-swap: a replacement model loads in the background and is swapped in between segments
+        self.model = None
+        self.model_name: str = str(CONFIG["whisper_model"])
+        self._model_lock = threading.Lock()
+        self._pending_model: tuple[str, object] | None = None
+        self._load_generation: int = 0  # Only the most recent request may be swapped in
+        # Streaming mode: hypotheses for the segment still being captured
+        self.agreement = LocalAgreement()
+        self.stream_trace: SegmentTrace | None = None
+        self.stream_decoded: int = 0  # Samples covered by the last partial decode
+        # Audio after the last clean word of a force-cut segment, prepended to the next one
+        self.carry_audio: np.ndarray | None = None
+        # Streaming: on_hypothesis(text, lang, trace) gets the open segment's unflushed hypothesis
+        self.on_hypothesis = None
+        # Streaming: on_partial(committed, provisional, lang) after each partial decode
+        self.on_partial = None
+        # on_model_status(model_name, loaded_ok) after a background model switch
+        self.on_model_status = None
+        # on_readiness() when STARTUP.states["Whisper"] changes
+        self.on_readiness = None
+        # Batched decoding of a backlog (wraps self.model, rebuilt after a swap)
+        self.batched = None  # BatchedInferencePipeline
+
+    def reset_language_cache(self):
+        """Reset language detection cache — call when starting new content."""
+        self.lid.reset()
+        self.segments_since_lid = 0
+        self.carry_audio = None
+        print("[Whisper] Language cache reset")
+
+    @property
+    def detected_language(self) -> str | None:
+        return self.lid.language
+
+    def needs_language_id(self, trace: SegmentTrace, audio: np.ndarray) -> bool:
+        """Identify while unsure, then every lid_interval segments (not when behind)."""
+        if len(audio) < 0.5 * CONFIG["sample_rate"]:
+            return False  # Too little speech to tell; the decode's own detection covers the cold start
+        if not self.lid.confident:
+            return True
+        return not trace.downgraded and self.segments_since_lid >= int(CONFIG["lid_interval"])
+
+    def identify_language(self, audio: np.ndarray):
+        """Detect the language of a short prefix and fold it into the running estimate."""
+        prefix_s = float(CONFIG["lid_prefix_s"])
+        prefix = audio[:int(prefix_s * CONFIG["sample_rate"])]
+        start_t = time.time()
+        _, _, all_probs = self.model.detect_language(audio=prefix)
+        self.observe_language(all_probs, len(prefix) / CONFIG["sample_rate"] / prefix_s)
+        print(f"[Whisper] Language ID: {self.lid.describe()} ({time.time() - start_t:.2f}s)")
+
+    def observe_language(self, all_probs, weight: float):
+        before = self.lid.language
+        self.lid.update(all_probs, weight)
+        self.segments_since_lid = 0
+        if self.lid.language != before:
+            print(f"[Whisper] Language: {before} -> {self.lid.language} ({self.lid.describe()})")
+
+    def request_model(self, model_name: str):
+        """Load `model_name` in the background; the current model keeps serving until the swap."""
+        with self._model_lock:
+            self._load_generation += 1
+            generation = self._load_generation
+            self._pending_model = None
+        if model_name == self.model_name:
+            return
+        threading.Thread(target=self._load_model, args=(model_name, generation), daemon=True).start()
+
+    def _load_model(self, model_name: str, generation: int):
+        print(f"[Whisper] Loading model '{model_name}' in background...")
+        start_t = time.time()
+        try:
+            model = load_whisper(model_name)
+            if CONFIG["warm_up_models"]:
+                warm_up_whisper(model)
+        except Exception as e:
+            print(f"[Whisper] Failed to load model '{model_name}': {e}")
+            if self.on_model_status is not None:
+                self.on_model_status(model_name, False)
+            return
+        with self._model_lock:
+            if generation != self._load_generation:
+                print(f"[Whisper] Discarding '{model_name}' (superseded by a newer request)")
+                release_whisper(model)
+                return
+            self._pending_model = (model_name, model)
+        print(f"[Whisper] Model '{model_name}' ready ({time.time()-start_t:.2f}s), swapping in at next segment")
+
+    def swap_pending_model(self):
+        """Called between segments: install a background-loaded model and free the old one."""
+        with self._model_lock:
+            pending = self._pending_model
+            self._pending_model = None
+        if pending is None:
+            return
+        name, model = pending
+        old_name, old_model = self.model_name, self.model
+        self.model, self.model_name = model, name
+        self.batched = None
+        CONFIG["whisper_model"] = name
+        # Hypotheses from the old model can't be compared with the new one
+        self.agreement.reset()
+        self.stream_trace = None
+        self.stream_decoded = 0
+        release_whisper(old_model)
+        del pending, model, old_model
+        gc.collect()  # Release the old CTranslate2 weights now rather than later
+        print(f"[Whisper] Swapped model '{old_name}' -> '{name}'")
+        self.set_readiness(f"ready ({name})")
+        if self.on_model_status is not None:
+            self.on_model_status(name, True)
+
+    def stream_partial(self):
+        """Re-decode the still-open segment and publish committed/provisional text."""
+        peek = live_segment.peek()
+        if peek is None:
+            return
+        trace, n_samples = peek
+        decoded = self.stream_decoded if trace is self.stream_trace else 0
+        step = int(float(CONFIG["stream_step_ms"]) / 1000.0 * CONFIG["sample_rate"])
+        if n_samples < step or n_samples - decoded < step:
+            return
+        snap = live_segment.snapshot()
+        if snap is None:
+            return
+        snapshot_t = time.perf_counter()
+        trace, audio_float32 = snap
+        if trace is not self.stream_trace:
+            self.stream_trace = trace
+            self.agreement.reset()
+
+        segments, info = self.model.transcribe(
+            audio_float32,
+            beam_size=1,
+            best_of=1,
+            language=self.detected_language,
+            vad_filter=False,
+            condition_on_previous_text=False,
+            without_timestamps=True,
+        )
+        text = "".join([s.text for s in segments]).strip()
+        asr_end_t = time.perf_counter()
+        self.stream_decoded = len(audio_float32)
+        lang = self.detected_language or info.language
+
+        committed, provisional = self.agreement.update(text)
+        if self.on_partial is not None:
+            self.on_partial(committed, provisional, lang)
+
+        # Whole sentences that are committed can be translated before the segment closes
+        sentence = self.agreement.take_sentences()
+        if sentence and not HALLUCINATION_FILTER.is_hallucination(sentence):
+            part = TRACER.fork(trace)
+            for stage in ("capture_end", "vad_cut", "dequeue", "asr_start"):
+                part.mark(stage, snapshot_t)
+            part.mark("asr_end", asr_end_t)
+            part.text = sentence
+            part.end_s = part.start_s + len(audio_float32) / CONFIG["sample_rate"]
+            part.lang = str(lang)
+            print(f"[Whisper] [{lang}] (streamed) {sentence}")
+            push_translation((sentence, lang, part))
+
+        if self.on_hypothesis is not None:
+            self.on_hypothesis(self.agreement.unflushed(), str(lang), trace)
+
+    def take_batch(self, first) -> tuple[list, bool]:
+        """`first` plus whatever else is queued when batching applies.
+
+        Only batches once the language is cached and no re-check is due, since a
+        batched call decodes every segment in one language. The second value is
+        True if the exit signal was taken off the queue.
+        """
+        batch = [first]
+        if (not CONFIG["batched_asr"] or CONFIG["streaming_asr"] or first[1].downgraded
+                or not self.lid.confident
+                or self.segments_since_lid + 1 >= int(CONFIG["lid_interval"])):
+            return batch, False
+        while len(batch) < int(CONFIG["asr_batch_size"]):
+            try:
+                item = audio_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            item[1].mark("dequeue")
+            batch.append(item)
+        return batch, False
+
+    def transcribe_batch(self, batch: list):
+        """Decode several queued segments in one batched call and publish them in order."""
+        sr = CONFIG["sample_rate"]
+        if self.batched is None:
+            if isinstance(self.model, WhisperProcessPool):
+                self.batched = self.model.batched()
+            else:
+                self.batched = BatchedInferencePipeline(model=self.model) # type: ignore
+        # Carried-over audio belongs to the oldest segment; force cuts inside a batch
+        # are committed as-is (word timestamps would serialize the batch again)
+        if self.carry_audio is not None:
+            audio, trace = batch[0]
+            batch[0] = (np.concatenate((self.carry_audio, audio)), trace)
+            trace.start_s -= len(self.carry_audio) / sr
+            self.carry_audio = None
+        lengths = np.array([len(audio) for audio, _ in batch])
+        ends = np.cumsum(lengths) / sr
+        clips = [{"start": float(end - n / sr), "end": float(end)} for n, end in zip(lengths, ends)]
+        self.segments_since_lid += len(batch)
+
+        start_t = time.time()
+        for audio, trace in batch:
+            trace.audio_s = len(audio) / sr
+            trace.mark("asr_start")
+        try:
+            segments, _ = self.batched.transcribe(
+                np.concatenate([audio for audio, _ in batch]),
+                language=self.detected_language,
+                beam_size=1 if any(trace.downgraded for _, trace in batch) else int(CONFIG["beam_size"]),
+                best_of=1,
+                vad_filter=False,
+                clip_timestamps=clips,
+                batch_size=len(batch),
+                without_timestamps=True,
+            )
+        except ASRWorkerError as e:
+            self.drop_failed([trace for _, trace in batch], e)
+            return
+        # Output segments carry timestamps in the concatenated audio; map them back by midpoint
+        decoded: list[list] = [[] for _ in batch]
+        for seg in segments:
+            i = min(int(np.searchsorted(ends, (seg.start + seg.end) / 2)), len(batch) - 1)
+            decoded[i].append(seg)
+        processing_time = time.time() - start_t
+        print(f"[Whisper] Batched {len(batch)} segments ({ends[-1]:.1f}s audio, {processing_time:.2f}s)")
+
+        for (_, trace), segs in zip(batch, decoded):
+            trace.mark("asr_end")
+            kept = HALLUCINATION_FILTER.filter_segments(segs)
+            if segs and not kept:
+                self.drop_hallucination(trace)
+                continue
+            self.publish(trace, "".join(seg.text for seg in kept).strip(), self.detected_language, processing_time / len(batch))
+
+    def drop_hallucination(self, trace: SegmentTrace):
+        self.agreement.reset()
+        TRACER.drop(trace, "hallucination")
+
+    def drop_failed(self, traces: list[SegmentTrace], error: Exception):
+        """A Whisper worker process crashed or hung on these segments: skip them, keep running."""
+        print(f"[Whisper] Dropping segment(s) {[t.id for t in traces]}: {error}")
+        self.agreement.reset()
+        for trace in traces:
+            trace.mark("asr_end")
+            TRACER.drop(trace, "asr_error")
+
+    def publish(self, trace: SegmentTrace, text: str, lang, processing_time: float, streamed: bool = False):
+        """Check one decoded segment for stock phrases and hand it to the translator (or drop its trace)."""
+        trace.text = text
+        trace.lang = str(lang)
+        if not text:
+            self.agreement.reset()
+            TRACER.drop(trace, "empty")
+            return
+
+        if HALLUCINATION_FILTER.is_hallucination(text):
+            print(f"[Whisper] Filtered hallucination: '{text}'")
+            self.drop_hallucination(trace)
+            return
+
+        if streamed:
+            text = self.agreement.finish(text)
+            if not text:
+                TRACER.drop(trace, "streamed")
+                return
+            trace.text = text
+
+        print(f"[Whisper] [{lang}] {text} ({processing_time:.2f}s)")
+        push_translation((text, lang, trace))
+
+    def set_readiness(self, state: str):
+        STARTUP.set_state("Whisper", state)
+        if self.on_readiness is not None:
+            self.on_readiness()
+
+    def run(self):
+        self.model_name = str(CONFIG["whisper_model"])
+        print(f"[Whisper] Loading model '{self.model_name}'...")
+        self.set_readiness("loading")
+        try:
+            if not int(CONFIG["asr_processes"]):
+                import_whisper()
+            with STARTUP.phase(f"load Whisper '{self.model_name}'"):
+                self.model = load_whisper(self.model_name)
+            print("[Whisper] Model loaded (multi-language auto-detect).")
+            if CONFIG["warm_up_models"]:
+                self.set_readiness("warming up")
+                with STARTUP.phase("warm up Whisper"):
+                    warm_up_whisper(self.model)
+        except Exception as e:
+            print(f"[Whisper] Failed to load model: {e}")
+            self.set_readiness("failed")
+            return
+        self.set_readiness(f"ready ({self.model_name})")
+        self.ready.set()
+
+        while True:
+            self.swap_pending_model()
+            if CONFIG["streaming_asr"]:
+                # Idle time between closed segments goes to partial decodes
+                try:
+                    item = audio_queue.get(timeout=float(CONFIG["stream_step_ms"]) / 1000.0)
+                except queue.Empty:
+                    try:
+                        self.stream_partial()
+                    except ASRWorkerError as e:
+                        print(f"[Whisper] Partial decode failed: {e}")
+                    continue
+            else:
+                item = audio_queue.get()
+            if item is None: break # Exit signal
+            self.swap_pending_model()
+            
+            audio_float32, trace = item
+            trace.mark("dequeue")
+            if not isinstance(audio_float32, np.ndarray): continue
+            
+            # Backlog with a known language: one batched call instead of N sequential ones
+            batch, exiting = self.take_batch(item)
+            if len(batch) > 1:
+                self.transcribe_batch(batch)
+            if exiting:
+                break
+            if len(batch) > 1:
+                continue
+            
+            # Streamed segment: sentences already sent to the translator are skipped
+            streamed = trace is self.stream_trace
+            if streamed:
+                self.stream_trace = None
+                self.stream_decoded = 0
+            
+            # Force cuts chop words in half: decode with word timestamps, commit up to
+            # the last clean word and carry the rest into the next segment
+            if self.carry_audio is not None and not streamed:
+                trace.start_s -= len(self.carry_audio) / CONFIG["sample_rate"]
+                audio_float32 = np.concatenate((self.carry_audio, audio_float32))
+                trace.audio_s = len(audio_float32) / CONFIG["sample_rate"]
+            self.carry_audio = None
+            # Downgraded by the scheduler (behind its deadline) or flagged by the speech
+            # gate (likely music): no word timestamps, beam 1
+            fast = trace.downgraded or bool(trace.gate)
+            carryover = (trace.cut_reason == "force" and bool(CONFIG["force_cut_carryover"])
+                         and not streamed and not fast)
+            beam_size = 1 if fast else int(CONFIG["beam_size"])
+            if trace.merged_ids:
+                print(f"[Whisper] Coalesced segments {trace.id}+{trace.merged_ids} ({trace.audio_s:.1f}s)")
+            
+            start_t = time.time()
+            trace.mark("asr_start")
+            
+            # Language: cheap prefix detection while unsure / periodically, then decode
+            # with the running estimate so transcribe() never auto-detects on its own
+            self.segments_since_lid += 1
+            try:
+                if not trace.gate and self.needs_language_id(trace, audio_float32):
+                    self.identify_language(audio_float32)
+                language = self.lid.language or self.lid.best
+                segments, info = self.model.transcribe(
+                    audio_float32,
+                    beam_size=beam_size,
+                    best_of=1,
+                    language=language,
+                    vad_filter=False,
+                    condition_on_previous_text=False,
+                    word_timestamps=carryover,
+                )
+            except ASRWorkerError as e:
+                self.carry_audio = None
+                self.drop_failed([trace], e)
+                continue
+            if language is None:
+                # Cold start on a very short segment: use the decode's own detection
+                self.observe_language(info.all_language_probs or [(info.language, info.language_probability)],
+                                      min(1.0, trace.audio_s / float(CONFIG["lid_prefix_s"])))
+                language = info.language
+            detected_lang = language
+            
+            # Reject silence / low-confidence / looping output before it costs an LLM call
+            segments = list(segments)
+            kept = HALLUCINATION_FILTER.filter_segments(segments)
+            if segments and not kept:
+                trace.mark("asr_end")
+                self.drop_hallucination(trace)
+                continue
+            segments = kept
+            
+            if carryover:
+                duration_s = len(audio_float32) / CONFIG["sample_rate"]
+                text, carry_from = clean_word_boundary(segments, duration_s, float(CONFIG["carryover_guard_s"]))
+                if carry_from is not None:
+                    self.carry_audio = audio_float32[int(carry_from * CONFIG["sample_rate"]):]
+                    print(f"[Whisper] Force cut: carrying {duration_s - carry_from:.2f}s into next segment")
+            else:
+                text = "".join([s.text for s in segments]).strip()
+            processing_time = time.time() - start_t
+            trace.mark("asr_end")
+            self.publish(trace, text, detected_lang, processing_time, streamed)
+        release_whisper(self.model)
+
+class TranslatorThread(threading.Thread):
+    def __init__(self):
+        super().__init__(name="Translator", daemon=True)
+        # Created on first use by name (CONFIG["translation_backend"]), in the translator's event loop
+        self.backends: dict[str, TranslationBackend] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        # Final translations in flight (task -> newest trace it covers), released in source order
+        self.active: dict[asyncio.Task, SegmentTrace] = {}
+        self.order = ReorderBuffer(self.release)
+        self.warm_up_task: asyncio.Task | None = None
+        # Speculative translation of the open segment's hypothesis (streaming ASR)
+        self.spec: Speculation | None = None
+        self.spec_stats = SpeculationStats()
+        # on_subtitle(trace, zh_text, source_text, source_lang, final) as output reaches the screen, in source order
+        self.on_subtitle = None
+        # on_readiness() when STARTUP.states["Translation"] changes
+        self.on_readiness = None
+        self.cache: TranslationCache | None = None
+        if CONFIG["translation_cache"]:
+            self.cache = TranslationCache(str(CONFIG["translation_cache_path"]), int(CONFIG["translation_cache_size"])) # type: ignore
+
+    def get_backend(self) -> TranslationBackend:
+        name = str(CONFIG["translation_backend"])
+        if name not in self.backends:
+            self.backends[name] = create_backend(name, CONFIG)
+        return self.backends[name]
+
+    def remember(self, source_text: str, zh_text: str):
+        """Store bilingual pair for future context."""
+        self.get_backend().remember(source_text, zh_text)
+
+    def run(self):
+        print("[Translator] Thread started (streaming, multi-language).")
+        asyncio.run(self.serve())
+        if self.cache:
+            self.cache.close()
+
+    async def serve(self):
+        """Translate queued segments; when backlogged, a newer segment cancels the oldest stale generation."""
+        loop = asyncio.get_running_loop()
+        self.loop = loop
+        if CONFIG["warm_up_models"]:
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+        exiting = False
+        while not exiting:
+            item = await loop.run_in_executor(None, translation_queue.get)
+            if item is None: break # Exit signal
+            
+            if CONFIG["cancel_superseded"]:
+                self.cancel_stale(item[2])
+            # All workers busy: wait for one (meanwhile translation_queue absorbs the burst)
+            while len(self.active) >= max(1, int(CONFIG["translation_workers"])):
+                await asyncio.wait(list(self.active), return_when=asyncio.FIRST_COMPLETED)
+                self.active = {task: t for task, t in self.active.items() if not task.done()}
+            
+            # Unpack (text, lang, trace) tuple from queue
+            source_text, source_lang, trace = item  # type: ignore
+            batch = [(str(source_text).strip(), source_lang, trace)]
+            if self.get_backend().batching:
+                # Backlog: one batched call is cheaper than a call per line
+                while len(batch) < int(CONFIG["mt_batch_size"]):
+                    try:
+                        extra = translation_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is None:
+                        exiting = True
+                        break
+                    batch.append((str(extra[0]).strip(), extra[1], extra[2]))
+            for _, _, queued_trace in batch:
+                self.order.open(queued_trace)
+            if len(batch) > 1:
+                task = asyncio.create_task(self.translate_batch(batch))
+            else:
+                task = asyncio.create_task(self.translate(*batch[0]))
+            self.active[task] = batch[-1][2]
+        if self.active:
+            await asyncio.gather(*self.active, return_exceptions=True)
+            self.active = {}
+        if self.spec is not None and self.spec.running:
+            self.spec.task.cancel() # type: ignore
+        if self.warm_up_task is not None and not self.warm_up_task.done():
+            self.warm_up_task.cancel()
+            await asyncio.gather(self.warm_up_task, return_exceptions=True)
+        self.loop = None
+        print(f"[Translator] Order: {self.order.format_stats()}")
+        if CONFIG["speculative_translation"]:
+            print(f"[Translator] Speculation: {self.spec_stats.format()}")
+        for backend in self.backends.values():
+            print(f"[Translator] {backend.describe()}: {backend.format_stats()}")
+            await backend.close()
+
+    def cancel_stale(self, newer: SegmentTrace):
+        """Backlogged: free a worker for `newer` by cancelling the oldest translation in flight.
+
+        Only when every worker is busy and `newer` has already waited past target_lag_s;
+        otherwise in-flight subtitles finish (they are shown in order anyway).
+        """
+        running = [(task, old) for task, old in self.active.items() if not task.done()]
+        if len(running) < max(1, int(CONFIG["translation_workers"])):
+            return
+        now = time.perf_counter()
+        if now - newer.stamps.get("capture_end", now) <= float(CONFIG["target_lag_s"]):
+            return
+        task, old_trace = min(running, key=lambda r: r[1].stamps.get("capture_end", now))
+        age = now - old_trace.stamps.get("capture_end", now)
+        print(f"[Translator] Backlogged: cancelling stale translation #{old_trace.id} ({age:.1f}s old)")
+        task.cancel()
+
+    def set_readiness(self, state: str):
+        STARTUP.set_state("Translation", state)
+        if self.on_readiness is not None:
+            self.on_readiness()
+
+    def request_warm_up(self):
+        """Thread-safe: warm up the current backend/model (e.g. after a switch)."""
+        loop = self.loop
+        if loop is not None and CONFIG["warm_up_models"]:
+            loop.call_soon_threadsafe(self._start_warm_up)
+
+    def _start_warm_up(self):
+        if self.warm_up_task is not None and not self.warm_up_task.done():
+            self.warm_up_task.cancel()
+        self.warm_up_task = asyncio.get_running_loop().create_task(self.warm_up())
+
+    async def warm_up(self):
+        backend = self.get_backend()
+        self.set_readiness(f"warming up ({backend.describe()})")
+        start = time.perf_counter()
+        try:
+            await backend.warm_up()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Translator] Warm-up of {backend.describe()} failed: {e}")
+            self.set_readiness(f"unavailable ({backend.describe()})")
+            return
+        STARTUP.record(f"warm up {backend.describe()}", start)
+        self.set_readiness(f"ready ({backend.describe()})")
+
+    def release(self, trace: SegmentTrace, output: tuple, final: bool):
+        """Called by the reorder buffer once `trace` may reach the screen."""
+        zh_text, source_text, source_lang = output
+        if self.on_subtitle is not None:
+            self.on_subtitle(trace, zh_text, source_text, source_lang, final)
+        trace.mark_once("first_token")
+        if final:
+            trace.mark("final_emit")
+            TRACER.complete(trace)
+            if source_lang != "zh":
+                self.remember(source_text, zh_text)
+
+    def drop(self, trace: SegmentTrace, reason: str):
+        TRACER.drop(trace, reason)
+        self.order.drop(trace)
+
+    def shortcut(self, source_text: str, source_lang, trace: SegmentTrace) -> bool:
+        """Finish segments that need no translation (empty, already Chinese, cached); True if handled."""
+        trace.mark("translate_start")
+        if not source_text:
+            self.drop(trace, "empty")
+            return True
+        
+        # If source is already Chinese, display directly without translation
+        if source_lang == "zh":
+            print(f"[Translator] Chinese detected, displaying directly: '{source_text}'")
+            self.order.finish(trace, (source_text, source_text, source_lang))
+            return True
+
+        # Recurring line: skip the translation entirely
+        cached = self.cache.get(source_text, source_lang, *self.get_backend().cache_key()) if self.cache else None
+        if cached is not None:
+            print(f"[Translator] Cache hit: {cached}")
+            self.order.finish(trace, (cached, source_text, source_lang))
+            return True
+        return False
+
+    async def translate(self, source_text: str, source_lang, trace: SegmentTrace):
+        if self.shortcut(source_text, source_lang, trace):
+            return
+
+        # Speculation on this segment's hypothesis: reuse it whole, or translate only the new tail
+        prefix_zh, pending_text = await self.claim_speculation(trace, source_text)
+        if prefix_zh:
+            self.order.update(trace, (prefix_zh, source_text, source_lang))
+        
+        def on_token(zh_partial: str):
+            # Post after each token; the window shows the latest once per frame (held back if an earlier segment is unfinished)
+            self.order.update(trace, (prefix_zh + zh_partial, source_text, source_lang))
+        
+        start_t = time.time()
+        try:
+            zh_tail = ""
+            if pending_text:
+                zh_tail = await asyncio.wait_for(self.get_backend().translate(pending_text, source_lang, on_token),
+                                                 timeout=float(CONFIG["translation_timeout_s"]))
+        except asyncio.CancelledError:
+            self.drop(trace, "superseded")
+            raise
+        except asyncio.TimeoutError:
+            print(f"[Translator] Timeout ({time.time()-start_t:.2f}s) - skipping")
+            self.drop(trace, "timeout")
+            return
+        except Exception as e:
+            print(f"[Translator Error] {e}")
+            self.drop(trace, "error")
+            return
+        self.finish(trace, source_text, source_lang, (prefix_zh + zh_tail).strip(), start_t)
+
+    async def translate_batch(self, batch: list[tuple[str, str, SegmentTrace]]):
+        """Translate a backlog in one backend call (batching backends)."""
+        pending = [item for item in batch if not self.shortcut(*item)]
+        if not pending:
+            return
+        start_t = time.time()
+        try:
+            results = await asyncio.wait_for(
+                self.get_backend().translate_batch([(text, lang) for text, lang, _ in pending]),
+                timeout=float(CONFIG["translation_timeout_s"]))
+        except asyncio.CancelledError:
+            for _, _, trace in pending:
+                self.drop(trace, "superseded")
+            raise
+        except Exception as e:
+            print(f"[Translator Error] Batch of {len(pending)}: {e!r}")
+            for _, _, trace in pending:
+                self.drop(trace, "timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+            return
+        print(f"[Translator] Batch of {len(pending)} lines ({time.time()-start_t:.2f}s)")
+        for (source_text, source_lang, trace), zh_text in zip(pending, results):
+            self.finish(trace, source_text, source_lang, zh_text.strip(), start_t)
+
+    def finish(self, trace: SegmentTrace, source_text: str, source_lang, zh_text: str, start_t: float):
+        if is_usable_translation(zh_text):
+            print(f"[Translator] {zh_text} ({time.time()-start_t:.2f}s)")
+            # Final emit with clean text
+            self.order.finish(trace, (zh_text, source_text, source_lang))
+            if self.cache:
+                self.cache.put(source_text, source_lang, *self.get_backend().cache_key(), zh_text)
+        else:
+            print(f"[Translator] Filtered bad output: {zh_text}")
+            self.drop(trace, "bad_translation")
+
+    # ---- speculative translation (streaming ASR only) ----
+    def speculate(self, text: str, lang, trace: SegmentTrace):
+        """Thread-safe: translate the open segment's current hypothesis in the background."""
+        loop = self.loop
+        if loop is None or not CONFIG["speculative_translation"] or not text or lang == "zh":
+            return
+        loop.call_soon_threadsafe(self._speculate, text, lang, trace)
+
+    def _speculate(self, text: str, lang, trace: SegmentTrace):
+        if any(not task.done() for task in self.active):
+            return  # Final translations get the backend first
+        spec = self.spec
+        if spec is not None:
+            if spec.trace is trace:
+                if same_text(spec.text, text) or (spec.running and grows(spec.text, text)):
+                    return  # Unchanged, or only grown: let the running one finish
+                if spec.running:
+                    self.spec_stats.counts["restarted"] += 1
+            if spec.running:
+                spec.task.cancel() # type: ignore
+        spec = Speculation(trace, text, lang)
+        spec.task = asyncio.get_running_loop().create_task(self.run_speculation(spec))
+        self.spec = spec
+        self.spec_stats.counts["started"] += 1
+
+    async def run_speculation(self, spec: Speculation):
+        backend = self.get_backend()
+        cached = self.cache.get(spec.text, spec.lang, *backend.cache_key()) if self.cache else None
+        if cached is not None:
+            spec.finish(cached)
+            return
+        try:
+            zh_text = await asyncio.wait_for(backend.translate(spec.text, spec.lang),
+                                             timeout=float(CONFIG["translation_timeout_s"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Translator] Speculation failed: {e}")
+            zh_text = ""
+        spec.finish(zh_text or None)
+
+    async def claim_speculation(self, trace: SegmentTrace, source_text: str) -> tuple[str, str]:
+        """(already translated prefix, text still to translate) for a final segment."""
+        spec, self.spec = self.spec, None
+        if spec is None:
+            return "", source_text
+        if spec.trace is not trace:
+            # Another segment's final text: it needs the LLM now
+            if spec.running:
+                spec.task.cancel() # type: ignore
+                self.spec_stats.counts["preempted"] += 1
+            return "", source_text
+        kind, tail = classify(spec.text, source_text)
+        if kind == "miss":
+            if spec.running:
+                spec.task.cancel() # type: ignore
+            self.spec_stats.counts["miss"] += 1
+            return "", source_text
+        saved = spec.saved_s()
+        if spec.running:
+            await asyncio.gather(spec.task, return_exceptions=True) # type: ignore
+        if not spec.result:
+            self.spec_stats.counts["miss"] += 1
+            return "", source_text
+        self.spec_stats.counts[kind] += 1
+        self.spec_stats.saved_s += saved
+        print(f"[Translator] Speculation {kind} on #{trace.id} (~{saved:.2f}s saved)")
+        return spec.result, tail
+
+class AudioCaptureThread(threading.Thread):
+    def __init__(self, source: AudioSource | None = None):
+        super().__init__(name="AudioCapture", daemon=True)
+        # Default to live capture; pass a FileAudioSource to replay a recording
+        self.source = source if source is not None else PyAudioSource(CONFIG["sample_rate"], CHUNK_SIZE)
+        import webrtcvad # type: ignore
+        self.vad = webrtcvad.Vad(CONFIG["vad_mode"])
+        self.ring = AudioRingBuffer(int(float(CONFIG["ring_buffer_s"]) * CONFIG["sample_rate"]))
+        self.running = True
+        # on_error(message) if the source can't be opened (or opened with a warning)
+        self.on_error = None
+
+    def run(self):
+        try:
+            self.source.open()
+        except Exception as e:
+            self.report_error(f"Failed to open audio stream: {e}")
+            self.source.close()
+            return
+
+        if self.source.warning:
+            self.report_error(self.source.warning)
+
+        print(f"[Audio] Capturing from {self.source.describe()}")
+            
+        # Every frame goes into the ring; a segment is the span [segment_start, ring.total_written)
+        ring = self.ring
+        segment_start: int | None = None
+        segment_trace: SegmentTrace | None = None
+        segment_chunks: int = 0
+        silence_counter: int = 0
+        last_speech_t: float = 0.0  # Read time of the latest voiced frame
+        
+        try:
+            while self.running:
+                try:
+                    data = self.source.read(CHUNK_SIZE)
+                except Exception:
+                    continue
+                if data is None:
+                    # End of replay: flush what's left so the last words aren't lost
+                    if segment_start is not None and segment_chunks > 10:
+                        self.push_segment(segment_trace, segment_start, ring.total_written, last_speech_t, "end")
+                    print("[Audio] Replay finished")
+                    break
+                read_t = time.perf_counter()
+                frame_start = ring.write_pcm16(data)
+                    
+                is_speech = self.vad.is_speech(data, CONFIG["sample_rate"])
+                
+                if is_speech:
+                    silence_counter = 0
+                    if segment_start is None:
+                        segment_start = frame_start
+                        segment_trace = TRACER.new_segment()
+                        segment_trace.mark("capture_start", read_t)
+                        segment_trace.start_s = segment_start / CONFIG["sample_rate"]
+                        live_segment.open(ring, segment_start, segment_trace)
+                    last_speech_t = read_t
+                    segment_chunks += 1
+                else:
+                    silence_counter += 1
+                    if segment_start is not None:
+                        segment_chunks += 1
+                        
+                # Thresholds are re-read every frame: the latency controller may retune them
+                if CONFIG["streaming_asr"]:
+                    max_chunks = STREAM_MAX_CHUNKS
+                else:
+                    max_chunks = int(float(CONFIG["max_chunk_duration_s"]) * 1000 / _chunk_duration_ms)
+                silence_chunks = int(float(CONFIG["silence_trigger_ms"]) / _chunk_duration_ms)
+                force_cut = segment_chunks >= max_chunks
+                silence_cut = (silence_counter >= silence_chunks) and segment_chunks > 10
+                
+                if (force_cut or silence_cut) and segment_start is not None:
+                    self.push_segment(segment_trace, segment_start, ring.total_written, last_speech_t,
+                                      "force" if force_cut else "silence")
+                    segment_start = None
+                    segment_trace = None
+                    segment_chunks = 0
+                    silence_counter = 0
+        finally:
+            # Clean up source resources here (in the worker thread, not stop())
+            live_segment.close()
+            self.source.close()
+            print(f"[Audio] Ring buffer: {ring.format_stats()}")
+
+    def push_segment(self, trace: SegmentTrace, start: int, end: int, speech_end_t: float, cut_reason: str):
+        # One float32 copy out of the ring; the transcriber uses it as-is
+        audio_float32 = self.ring.segment(start, end)
+        live_segment.close()
+        trace.cut_reason = cut_reason
+        trace.mark("capture_end", speech_end_t)
+        trace.audio_s = len(audio_float32) / CONFIG["sample_rate"]
+        trace.end_s = end / CONFIG["sample_rate"]
+        if SPEECH_GATE.enabled:
+            verdict, reason, features = SPEECH_GATE.check(audio_float32)
+            if verdict == "drop":
+                SPEECH_GATE.record_saving(trace.audio_s, audio_queue.estimate_asr_s(trace.audio_s))
+                print(f"[Gate] Dropped segment #{trace.id} ({reason}, {trace.audio_s:.1f}s): {features}")
+                TRACER.drop(trace, "non_speech")
+                return
+            trace.gate = reason
+        trace.mark("vad_cut")
+        audio_queue.put((audio_float32, trace))
+
+    def report_error(self, message: str):
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            print(f"[Audio] {message}")
+
+    def stop(self):
+        # Only set flag — source cleanup happens in run()'s finally block
+        self.running = False
+
+
+# ================= Pipeline =================
+class Pipeline:
+    """The transcriber and translator threads plus one capture thread at a time."""
+
+    def __init__(self):
+        self.transcriber = TranscriberThread()
+        self.translator = TranslatorThread()
+        self.transcriber.on_hypothesis = self.translator.speculate
+        self.capture: AudioCaptureThread | None = None
+
+    def start(self):
+        """Start the worker threads; models load and warm up in the background."""
+        self.transcriber.start()
+        self.translator.start()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until Whisper is loaded; False if loading failed or timed out."""
+        start = time.perf_counter()
+        while not self.transcriber.ready.wait(0.1):
+            if not self.transcriber.is_alive():
+                return False
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return False
+        return True
+
+    @property
+    def capturing(self) -> bool:
+        return self.capture is not None and self.capture.is_alive()
+
+    def start_capture(self, source: AudioSource | None = None, on_error=None) -> AudioCaptureThread:
+        """Capture from `source` (None = live input) as new content: language and controller start over."""
+        self.transcriber.reset_language_cache()
+        CONTROLLER.reset()
+        capture = AudioCaptureThread(source)
+        capture.on_error = on_error
+        self.capture = capture
+        capture.start()
+        return capture
+
+    def stop_capture(self, timeout: float = 3.0):
+        """Stop capturing and discard queued segments."""
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.stop()
+            capture.join(timeout)
+            if capture.is_alive():
+                print("[Pipeline] Audio thread didn't stop in time, leaving it to exit on its own")
+        for trace in audio_queue.drain():
+            TRACER.drop(trace, "stopped")
+        exit_signal = False
+        while not translation_queue.empty():
+            try: item = translation_queue.get_nowait()
+            except queue.Empty: break
+            if item is None:
+                exit_signal = True  # close() already asked the translator to exit
+            else:
+                TRACER.drop(item[2], "stopped")
+        if exit_signal:
+            translation_queue.put_nowait(None) # type: ignore
+        TRACER.log_report()
+
+    def close(self, drain: bool = True):
+        """Stop the threads; with `drain`, everything already captured is transcribed and translated first."""
+        capture = self.capture
+        if capture is not None and capture.is_alive():
+            capture.stop()
+            capture.join()
+        # Exit signals in pipeline order
+        audio_queue.put(None)
+        if drain:
+            self.transcriber.join()
+        translation_queue.put(None) # type: ignore
+        self.transcriber.join()
+        self.translator.join()
@@ -0,0 +1,102 @@
+import time
+
+# ================= Reorder Buffer =================
+# With several translations in flight, a later segment can finish before an
+# earlier one. Segments are numbered in the order the translator takes them
+# from the queue, and only the oldest unfinished one (the head) reaches the
+# screen: it streams tokens as before. Later segments keep just their latest
+# text until everything before them is finished or dropped, then their
+# final text is released in order. Dropped segments are skipped.
+#
+# Single-threaded: every call comes from the translator's event loop.
+
+
+class _Slot:
+    __slots__ = ("trace", "latest", "final", "done", "waiting_since")
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.latest: tuple | None = None  # Latest partial output while not the head
+        self.final: tuple | None = None
+        self.done = False
+        self.waiting_since: float | None = None
+
+
+class ReorderBuffer:
+    """Release per-segment output in source order via release(trace, output, final)."""
+
+    def __init__(self, release):
+        self.release = release
+        self._slots: dict[int, _Slot] = {}  # seq -> slot
+        self._seq_of: dict[int, int] = {}  # trace id -> seq
+        self._issued: int = 0
+        self._head: int = 0
+        self.stats = {"released": 0, "dropped": 0, "waited": 0, "wait_s": 0.0, "max_depth": 0}
+
+    def open(self, trace):
+        seq = self._issued
+        self._issued += 1
+        self._slots[seq] = _Slot(trace)
+        self._seq_of[trace.id] = seq
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(self._slots))
+
+    def _slot(self, trace) -> tuple[int, _Slot] | None:
+        seq = self._seq_of.get(trace.id)
+        return None if seq is None else (seq, self._slots[seq])
+
+    def update(self, trace, output: tuple):
+        """Partial output (streamed tokens): shown now if the segment is the head."""
+        found = self._slot(trace)
+        if found is None:
+            self.release(trace, output, False)
+            return
+        seq, slot = found
+        if seq == self._head:
+            self.release(trace, output, False)
+        else:
+            slot.latest = output
+            if slot.waiting_since is None:
+                slot.waiting_since = time.perf_counter()
+
+    def finish(self, trace, output: tuple):
+        found = self._slot(trace)
+        if found is None:
+            self.release(trace, output, True)
+            return
+        seq, slot = found
+        slot.final = output
+        slot.done = True
+        if seq != self._head and slot.waiting_since is None:
+            slot.waiting_since = time.perf_counter()
+        self._advance()
+
+    def drop(self, trace):
+        found = self._slot(trace)
+        if found is None:
+            return
+        found[1].done = True
+        self.stats["dropped"] += 1
+        self._advance()
+
+    def _advance(self):
+        while (slot := self._slots.get(self._head)) is not None and slot.done:
+            del self._slots[self._head]
+            del self._seq_of[slot.trace.id]
+            self._head += 1
+            if slot.final is not None:
+                if slot.waiting_since is not None:
+                    self.stats["waited"] += 1
+                    self.stats["wait_s"] += time.perf_counter() - slot.waiting_since
+                self.stats["released"] += 1
+                self.release(slot.trace, slot.final, True)
+        # The new head streams from here on; show what it has so far
+        slot = self._slots.get(self._head)
+        if slot is not None and slot.latest is not None:
+            self.release(slot.trace, slot.latest, False)
+            slot.latest = None
+
+    def format_stats(self) -> str:
+        s = self.stats
+        avg = f", {s['wait_s'] / s['waited'] * 1000:.0f}ms avg wait" if s["waited"] else ""
+        return (f"{s['released']} released, {s['waited']} held for order{avg}, "
+                f"{s['dropped']} dropped, max {s['max_depth']} in flight")
@@ -0,0 +1,74 @@
+import threading
+import numpy as np # type: ignore
+
+# ================= Capture Ring Buffer =================
+# The capture loop used to keep a list of 30 ms `bytes` frames per segment
+# and then join → frombuffer → copy → astype → divide, i.e. four full copies
+# before Whisper saw a sample. AudioRingBuffer converts each int16 frame to
+# float32 straight into a preallocated array, and a segment is read back as
+# a single float32 copy. (Not a view: a queued segment can wait longer than
+# the ring takes to wrap around onto it.)
+
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class AudioRingBuffer:
+    """Fixed-capacity float32 ring addressed by absolute sample index."""
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self.total_written: int = 0  # Absolute index of the next sample to be written
+        self._read_lock = threading.Lock()  # Segments may be read from the capture and ASR threads
+        self.stats = {
+            "segments": 0,
+            "wrapped_segments": 0,  # Straddled the end of the ring (copied in two parts)
+            "bytes_copied": 0,
+        }
+
+    def write_pcm16(self, data: bytes) -> int:
+        """Convert an int16 PCM frame into the ring in place; returns its start index."""
+        frame = np.frombuffer(data, dtype=np.int16)
+        start = self.total_written
+        n = len(frame)
+        if n > self.capacity:
+            frame = frame[-self.capacity:]
+            start += n - self.capacity
+        pos = start % self.capacity
+        first = min(len(frame), self.capacity - pos)
+        np.multiply(frame[:first], _INT16_SCALE, out=self._buf[pos:pos + first], dtype=np.float32)
+        if first < len(frame):
+            rest = len(frame) - first
+            np.multiply(frame[first:], _INT16_SCALE, out=self._buf[:rest], dtype=np.float32)
+        self.total_written = start + len(frame)
+        return start
+
+    def is_valid(self, start: int, end: int | None = None) -> bool:
+        """True while samples [start, end) have not been overwritten yet."""
+        end = self.total_written if end is None else end
+        return start >= self.total_written - self.capacity and end <= self.total_written
+
+    def segment(self, start: int, end: int, count: bool = True) -> np.ndarray:
+        """Samples [start, end) as a new float32 array in [-1, 1].
+
+        count=False keeps extra reads (e.g. streaming snapshots) out of the stats.
+        """
+        with self._read_lock:
+            if not self.is_valid(start, end):
+                raise ValueError(f"Samples [{start}, {end}) are no longer in the ring buffer")
+            n = end - start
+            pos = start % self.capacity
+            out = np.empty(n, dtype=np.float32)
+            first = min(n, self.capacity - pos)
+            out[:first] = self._buf[pos:pos + first]
+            out[first:] = self._buf[:n - first]
+            if count:
+                self.stats["segments"] += 1
+                self.stats["wrapped_segments"] += first < n
+                self.stats["bytes_copied"] += out.nbytes
+            return out
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"{s['segments']} segments ({s['wrapped_segments']} wrapped), "
+                f"{s['bytes_copied'] / 1e6:.1f} MB copied")
@@ -0,0 +1,146 @@
+import time
+import queue
+import threading
+import numpy as np # type: ignore
+
+# ================= Deadline-Aware Segment Scheduler =================
+# Drop-in replacement for audio_queue (put/get/qsize/get_nowait). Every
+# segment gets an ASR deadline of capture_end + segment_deadline_s. When the
+# transcriber asks for work and segments are waiting, the scheduler:
+#
+#   1. sheds the oldest segments that can't finish by their deadline even
+#      with a downgraded decode (the newest one is always kept),
+#   2. coalesces a waiting neighbour into the same transcribe call when
+#      decoding it separately afterwards would miss its deadline, since
+#      Whisper's cost is dominated by the fixed 30 s encoder window,
+#   3. downgrades (beam 1, no re-detection, no word timestamps) a segment
+#      whose normal decode would miss the deadline.
+#
+# Bounded lag matters more than transcribing every syllable.
+
+class SegmentScheduler(queue.Queue):
+    """Queue of (float32 audio, SegmentTrace) that plans work at get() time."""
+
+    # Assumed share of an average ASR call that doesn't scale with audio length
+    FIXED_COST_SHARE = 0.5
+    # Downgraded decodes are assumed to cost this fraction of a normal one
+    FAST_COST_FACTOR = 0.6
+
+    def __init__(self, config: dict, tracer):
+        super().__init__()
+        self.config = config
+        self.tracer = tracer
+        self._stats_lock = threading.Lock()
+        self._deferred_drops: list[tuple[object, str]] = []
+        self._call_s: float | None = None  # EWMA of ASR seconds per call
+        self._audio_s: float | None = None  # EWMA of audio seconds per call
+        self.stats = {
+            "scheduled": 0,         # transcribe calls handed out
+            "coalesced_calls": 0,   # calls that merged several segments
+            "coalesced_segments": 0,  # segments folded into an earlier one
+            "downgraded": 0,
+            "shed": 0,
+        }
+
+    # ---- cost model ----
+    def on_trace(self, trace):
+        """LatencyTracer listener: learn ASR cost per call."""
+        asr = trace.interval("asr")
+        if asr is None or trace.audio_s <= 0:
+            return
+        with self._stats_lock:
+            if self._call_s is None:
+                self._call_s, self._audio_s = asr, trace.audio_s
+            else:
+                self._call_s = 0.3 * asr + 0.7 * self._call_s
+                self._audio_s = 0.3 * trace.audio_s + 0.7 * self._audio_s # type: ignore
+
+    def estimate_asr_s(self, audio_s: float, fast: bool = False) -> float:
+        with self._stats_lock:
+            call_s, avg_audio_s = self._call_s, self._audio_s
+        if call_s is None or not avg_audio_s:
+            return 0.0  # Nothing measured yet: assume every deadline can be met
+        fixed = self.FIXED_COST_SHARE * call_s
+        per_s = (1.0 - self.FIXED_COST_SHARE) * call_s / avg_audio_s
+        cost = fixed + per_s * audio_s
+        return cost * self.FAST_COST_FACTOR if fast else cost
+
+    def deadline(self, trace) -> float:
+        return trace.stamps["capture_end"] + float(self.config["segment_deadline_s"])
+
+    # ---- queue hooks (called with the queue mutex held) ----
+    def _get(self):
+        q = self.queue
+        now = time.perf_counter()
+        sr = self.config["sample_rate"]
+
+        # 1. Shed segments that are hopeless even downgraded; always keep the newest
+        while len(q) > 1 and q[0] is not None and q[1] is not None:
+            audio, trace = q[0]
+            if now + self.estimate_asr_s(len(audio) / sr, fast=True) <= self.deadline(trace):
+                break
+            q.popleft()
+            self.stats["shed"] += 1
+            self._deferred_drops.append((trace, "deadline"))
+
+        item = q.popleft()
+        if item is None:
+            return None
+        audio, trace = item
+        self.stats["scheduled"] += 1
+
+        # 2. Behind: fold a waiting neighbour into this call if decoding it after
+        # this one would miss its deadline. Not while streaming, since
+        # LocalAgreement tracks flushed text per open segment, nor when the
+        # transcriber batches backlogs itself.
+        if q and q[0] is not None and not self.config["streaming_asr"] and not self.config["batched_asr"]:
+            max_samples = int(float(self.config["max_merge_s"]) * sr)
+            gap = np.zeros(int(0.2 * sr), dtype=np.float32)  # Keep a word break between parts
+            parts = [audio]
+            total = len(audio)
+            while q and q[0] is not None and total + len(gap) + len(q[0][0]) <= max_samples:
+                next_audio, next_trace = q[0]
+                separate_s = self.estimate_asr_s(total / sr) + self.estimate_asr_s(len(next_audio) / sr)
+                if now + separate_s <= self.deadline(next_trace):
+                    break  # On time anyway: no need to merge
+                q.popleft()
+                parts += [gap, next_audio]
+                total += len(gap) + len(next_audio)
+                trace.merged_ids.append(next_trace.id)
+                trace.cut_reason = next_trace.cut_reason
+                trace.end_s = next_trace.end_s
+                self.stats["coalesced_segments"] += 1
+            if len(parts) > 1:
+                audio = np.concatenate(parts)
+                trace.audio_s = len(audio) / sr
+                self.stats["coalesced_calls"] += 1
+
+        # 3. Downgrade if a normal decode would miss the deadline
+        if now + self.estimate_asr_s(len(audio) / sr) > self.deadline(trace):
+            trace.downgraded = True
+            self.stats["downgraded"] += 1
+        return audio, trace
+
+    def get(self, block=True, timeout=None):
+        try:
+            return super().get(block, timeout)
+        finally:
+            # Report drops outside the queue mutex (tracer listeners may call qsize())
+            with self.mutex:
+                drops, self._deferred_drops = self._deferred_drops, []
+            for trace, reason in drops:
+                self.tracer.drop(trace, reason)
+
+    def drain(self) -> list:
+        """Remove queued segments without planning (an exit signal stays); returns their traces."""
+        with self.mutex:
+            items = list(self.queue)
+            self.queue.clear()
+            if None in items:
+                self.queue.append(None)
+        return [item[1] for item in items if item is not None]
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"{s['scheduled']} ASR calls, {s['coalesced_segments']} segments coalesced into "
+                f"{s['coalesced_calls']} calls, {s['downgraded']} downgraded, {s['shed']} shed")
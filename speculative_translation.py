@@ -0,0 +1,73 @@
+import time
+from translation_cache import normalize_text
+
+# ================= Speculative Translation =================
+# With streaming ASR the transcriber knows most of a segment's text before
+# the segment closes. The translator translates that hypothesis early (in
+# the background, nothing is shown) and, when the final text arrives:
+#
+#   hit     final == hypothesis          → reuse the translation as-is
+#   extend  final starts with hypothesis → show it, translate only the tail
+#   miss    anything else                → translate normally
+#
+# A running speculation is only cancelled and restarted when the hypothesis
+# actually changes; a hypothesis that merely grows lets it finish.
+
+
+class Speculation:
+    """One background translation of a provisional hypothesis."""
+
+    def __init__(self, trace, text: str, lang):
+        self.trace = trace  # Segment the hypothesis belongs to
+        self.text = text
+        self.lang = lang
+        self.task = None  # asyncio.Task producing the translation
+        self.result: str | None = None
+        self.start_t = time.perf_counter()
+        self.done_t: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def finish(self, result: str | None):
+        self.result = result
+        self.done_t = time.perf_counter()
+
+    def saved_s(self) -> float:
+        """LLM time already spent when the final text arrived."""
+        end = self.done_t if self.done_t is not None else time.perf_counter()
+        return end - self.start_t
+
+
+def same_text(a: str, b: str) -> bool:
+    return normalize_text(a) == normalize_text(b)
+
+
+def classify(hypothesis: str, final_text: str) -> tuple[str, str]:
+    """("hit" | "extend" | "miss", tail left to translate)."""
+    if same_text(hypothesis, final_text):
+        return "hit", ""
+    if final_text.startswith(hypothesis) and normalize_text(final_text[len(hypothesis):]):
+        return "extend", final_text[len(hypothesis):].strip()
+    return "miss", final_text
+
+
+def grows(old: str, new: str) -> bool:
+    """True if `new` only appends to `old` (the running speculation stays useful)."""
+    return normalize_text(new).startswith(normalize_text(old))
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.counts = {"started": 0, "restarted": 0, "preempted": 0, "hit": 0, "extend": 0, "miss": 0}
+        self.saved_s: float = 0.0
+
+    def format(self) -> str:
+        c = self.counts
+        used = c["hit"] + c["extend"]
+        finals = used + c["miss"]
+        rate = f"{used / finals:.0%}" if finals else "n/a"
+        return (f"{c['started']} started ({c['restarted']} restarted, {c['preempted']} preempted), "
+                f"{c['hit']} hits / {c['extend']} extended / {c['miss']} misses ({rate} used), "
+                f"~{self.saved_s:.1f}s LLM time saved")
@@ -0,0 +1,53 @@
+import time
+import threading
+import contextlib
+
+# ================= Startup Timing & Readiness =================
+# The tray icon comes up before anything heavy happens: faster_whisper is
+# imported and the model loaded on the transcriber thread, Ollama's model
+# list is fetched on a helper thread and the LLM is warmed up from the
+# translator's event loop, all at the same time. Each phase is logged with
+# its duration and when it finished relative to process start, and each
+# component's state is shown at the top of the menu.
+
+PROCESS_START = time.perf_counter()  # main_agent imports this module first thing
+
+
+class StartupLog:
+    """Phase timings (relative to process start) and per-component readiness."""
+
+    def __init__(self, t0: float = PROCESS_START):
+        self.t0 = t0
+        self._lock = threading.Lock()
+        self.phases: list[tuple[str, float, float]] = []  # (name, finished at, duration)
+        self.states: dict[str, str] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def record(self, name: str, start: float):
+        end = time.perf_counter()
+        with self._lock:
+            self.phases.append((name, end - self.t0, end - start))
+        print(f"[Startup] {name}: {end - start:.2f}s (done at +{end - self.t0:.2f}s)")
+
+    def mark(self, name: str):
+        """A point in time (e.g. tray icon shown) rather than a phase."""
+        self.record(name, time.perf_counter())
+
+    def set_state(self, component: str, state: str):
+        with self._lock:
+            self.states[component] = state
+
+    def describe(self) -> str:
+        with self._lock:
+            return " · ".join(f"{name}: {state}" for name, state in self.states.items())
+
+    def format_report(self) -> str:
+        with self._lock:
+            return ", ".join(f"{name} {duration:.2f}s (+{end:.2f}s)" for name, end, duration in self.phases)
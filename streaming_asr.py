@@ -0,0 +1,143 @@
+import re
+import threading
+
+# ================= Streaming ASR Helpers =================
+# clean_word_boundary() splits a force-cut segment at its last clean word.
+#
+# In streaming mode the transcriber re-decodes the segment that is still
+# being captured every few hundred ms. LocalAgreement keeps the prefix two
+# consecutive hypotheses agree on as "committed" text and shows the rest as
+# provisional, so partial subtitles don't flicker while Whisper changes its
+# mind about the last few words.
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Each token keeps its leading whitespace so "".join(tokens) restores the text.
+# CJK characters are single tokens since those scripts don't use spaces.
+_TOKEN_RE = re.compile(rf"\s*(?:[{_CJK}]|[^\s{_CJK}]+)")
+_PUNCT = ".,!?;:…-—\"'«»「」『』（）()。、，！？；："
+SENTENCE_ENDINGS = (".", "?", "!", "…", "。", "？", "！")
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text)
+
+def _key(token: str) -> str:
+    return token.strip().strip(_PUNCT).lower()
+
+
+def clean_word_boundary(segments, duration_s: float, guard_s: float,
+                        max_carry_ratio: float = 0.6) -> tuple[str, float | None]:
+    """Split force-cut Whisper output (word_timestamps=True) at a clean boundary.
+
+    Words ending within `guard_s` of the cut may be clipped, so only text up
+    to the last sentence ending (or failing that the last word) before that
+    point is returned. The second value is where the leftover audio starts,
+    or None if everything should be committed.
+    """
+    words = [w for seg in segments for w in (seg.words or [])]
+    if not words:
+        return "".join(seg.text for seg in segments).strip(), None
+    limit = duration_s - guard_s
+    clean = [i for i, w in enumerate(words) if w.end <= limit]
+    if not clean or clean[-1] == len(words) - 1:
+        return "".join(w.word for w in words).strip(), None
+
+    cut = clean[-1]
+    for i in reversed(clean):
+        if words[i].word.rstrip().endswith(SENTENCE_ENDINGS):
+            # Prefer a sentence ending unless it leaves most of the audio behind
+            if duration_s - words[i].end <= max_carry_ratio * duration_s:
+                cut = i
+            break
+    carry_from = words[cut].end
+    if duration_s - carry_from > max_carry_ratio * duration_s:
+        return "".join(w.word for w in words).strip(), None
+    return "".join(w.word for w in words[:cut + 1]).strip(), carry_from
+
+
+class LocalAgreement:
+    """LocalAgreement-2 over successive hypotheses of one growing segment."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.committed: list[str] = []
+        self.previous: list[str] = []
+        self.flushed: int = 0  # Committed tokens already sent to the translator
+
+    def update(self, hypothesis: str) -> tuple[str, str]:
+        """Feed a new hypothesis; returns (committed text, provisional text)."""
+        tokens = tokenize(hypothesis)
+        n = len(self.committed)
+        new, prev = tokens[n:], self.previous[n:]
+        agreed = 0
+        for a, b in zip(new, prev):
+            if _key(a) != _key(b):
+                break
+            agreed += 1
+        self.committed.extend(new[:agreed])
+        self.previous = tokens
+        return "".join(self.committed).strip(), "".join(tokens[len(self.committed):]).strip()
+
+    def take_sentences(self) -> str:
+        """Committed, not yet flushed text up to the last sentence ending."""
+        end = 0
+        for i in range(self.flushed, len(self.committed)):
+            if self.committed[i].rstrip().endswith(SENTENCE_ENDINGS):
+                end = i + 1
+        if end <= self.flushed:
+            return ""
+        text = "".join(self.committed[self.flushed:end]).strip()
+        self.flushed = end
+        return text
+
+    def unflushed(self) -> str:
+        """Latest hypothesis minus the sentences already sent to the translator."""
+        return "".join(self.previous[self.flushed:]).strip()
+
+    def finish(self, final_text: str) -> str:
+        """Final decode of the closed segment minus what was already flushed."""
+        tokens = tokenize(final_text)
+        rest = "".join(tokens[self.flushed:]).strip()
+        self.reset()
+        return rest
+
+
+class LiveSegment:
+    """The segment the capture thread is still filling, shared with the transcriber."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ring = None
+        self.start: int | None = None
+        self.trace = None
+
+    def open(self, ring, start: int, trace):
+        with self._lock:
+            self.ring = ring
+            self.start = start
+            self.trace = trace
+
+    def close(self):
+        with self._lock:
+            self.start = None
+            self.trace = None
+
+    def peek(self):
+        """(trace, samples so far) of the open segment, or None."""
+        with self._lock:
+            ring, start, trace = self.ring, self.start, self.trace
+        if ring is None or start is None:
+            return None
+        return trace, ring.total_written - start
+
+    def snapshot(self):
+        """(trace, float32 copy of the audio so far), or None."""
+        with self._lock:
+            ring, start, trace = self.ring, self.start, self.trace
+        if ring is None or start is None:
+            return None
+        try:
+            return trace, ring.segment(start, ring.total_written, count=False)
+        except ValueError:
+            return None
@@ -0,0 +1,53 @@
+import threading
+
+# ================= Subtitle Update Coalescing =================
+# Streaming produces a subtitle update per token (and per partial decode).
+# Sending each one to the GUI as a Qt signal queues an event on the GUI
+# thread, and rendering each re-lays out the subtitle, so fast token rates
+# flood the event loop with frames nobody gets to see. Worker threads now
+# only overwrite the latest pending state (one slot per kind, under a lock);
+# the subtitle window takes whatever is pending on a timer, at most
+# ui_max_fps times per second, and renders once per frame. The timer only
+# runs while updates arrive: on_wake fires on the first post after an empty
+# frame, and the window stops the timer on a frame with nothing to render.
+
+
+class SubtitleCoalescer:
+    """Latest pending subtitle state: posted from any thread, taken by the GUI once per frame."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # kind -> args, in posting order ("translation" / "partial")
+        self._pending: dict[str, tuple] = {}
+        self.stats = {"posted": 0, "frames": 0}
+        # on_wake() from the posting thread when an update arrives and nothing was pending
+        self.on_wake = None
+
+    def post(self, kind: str, *args):
+        with self._lock:
+            wake = not self._pending
+            self._pending.pop(kind, None)  # Re-insert so the order of kinds is kept
+            self._pending[kind] = args
+            self.stats["posted"] += 1
+        if wake and self.on_wake is not None:
+            self.on_wake()
+
+    def take(self) -> list[tuple[str, tuple]]:
+        """Everything posted since the last frame (latest per kind, oldest kind first)."""
+        with self._lock:
+            if not self._pending:
+                return []
+            pending = list(self._pending.items())
+            self._pending.clear()
+            self.stats["frames"] += 1
+            return pending
+
+    def discard(self):
+        """Drop pending updates (e.g. on Stop) without rendering them."""
+        with self._lock:
+            self._pending.clear()
+
+    def format_stats(self) -> str:
+        s = self.stats
+        ratio = f" ({s['posted'] / s['frames']:.1f} per frame)" if s["frames"] else ""
+        return f"{s['posted']} updates posted, {s['frames']} frames rendered{ratio}"
@@ -0,0 +1,39 @@
+# ================= Subtitle File Formats =================
+# SRT and WebVTT cues for the headless CLI and the offline batch mode. A cue
+# holds the translation over the source line, like the floating subtitle.
+
+
+def format_timestamp(seconds: float, sep: str = ",") -> str:
+    """HH:MM:SS,mmm (SRT) or, with sep=".", HH:MM:SS.mmm (WebVTT)."""
+    ms = max(0, int(round(seconds * 1000)))
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{sep}{ms:03d}"
+
+
+def cue_lines(text: str, source: str = "") -> str:
+    return "\n".join(line for line in (text, source) if line)
+
+
+def srt_cue(index: int, start_s: float, end_s: float, text: str, source: str = "") -> str:
+    return f"{index}\n{format_timestamp(start_s)} --> {format_timestamp(end_s)}\n{cue_lines(text, source)}\n\n"
+
+
+def vtt_cue(start_s: float, end_s: float, text: str, source: str = "") -> str:
+    return f"{format_timestamp(start_s, '.')} --> {format_timestamp(end_s, '.')}\n{cue_lines(text, source)}\n\n"
+
+
+VTT_HEADER = "WEBVTT\n\n"
+
+
+def write_subtitles(path: str, cues: list[tuple[float, float, str, str]], fmt: str = "srt"):
+    """Write (start_s, end_s, text, source) cues as an .srt or .vtt file."""
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "vtt":
+            f.write(VTT_HEADER)
+            for start_s, end_s, text, source in cues:
+                f.write(vtt_cue(start_s, end_s, text, source))
+        else:
+            for i, (start_s, end_s, text, source) in enumerate(cues, 1):
+                f.write(srt_cue(i, start_s, end_s, text, source))
@@ -0,0 +1,165 @@
+from PyQt6.QtWidgets import QWidget # type: ignore
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen, QTextCharFormat, QTextLayout, QTextOption # type: ignore
+from PyQt6.QtCore import Qt, QPointF, QRectF # type: ignore
+
+# ================= Subtitle Renderer =================
+# The subtitle used to be a QLabel with rich text: every update re-parsed an
+# HTML string, redid font fallback for the mixed CJK / Latin / emoji text and
+# laid out the whole label again, and text longer than the fixed box was cut
+# off. SubtitleView paints the two lines itself. Each line keeps its own
+# QTextLayouts (one per scale tried), which cache the shaped glyph runs, and
+# is laid out again only when its text or the available width changes, so a
+# streamed token re-shapes just the translation line. Text that doesn't fit
+# wraps; if the wrapped lines are still too tall, both lines shrink in steps
+# down to min_scale. The fitted scale is kept until the text or size changes.
+
+
+class _Line:
+    """One subtitle line and its cached layout."""
+
+    def __init__(self, font: QFont, color: QColor):
+        self.font = font
+        self.color = color
+        self.text = ""
+        self.dim_from: int | None = None  # Characters from here on are drawn dimmed (provisional)
+        self.layouts: dict[tuple[float, float], tuple[QTextLayout, float]] = {}  # (width, scale) -> (layout, height)
+        self.height: float = 0.0
+
+    def set(self, text: str, dim_from: int | None = None) -> bool:
+        if text == self.text and dim_from == self.dim_from:
+            return False
+        self.text = text
+        self.dim_from = dim_from
+        self.layouts.clear()
+        return True
+
+    def has_layout(self, width: float, scale: float) -> bool:
+        return (width, scale) in self.layouts
+
+    def layout_for(self, width: float, scale: float, dim_color: QColor) -> QTextLayout:
+        cached = self.layouts.get((width, scale))
+        if cached is not None:
+            layout, self.height = cached
+            return layout
+        if any(w != width for w, _ in self.layouts):
+            self.layouts.clear()  # Resized: layouts for the old width won't be used again
+        font = QFont(self.font)
+        font.setPixelSize(max(8, round(self.font.pixelSize() * scale)))
+        layout = QTextLayout(self.text, font)
+        layout.setCacheEnabled(True)
+        option = QTextOption(Qt.AlignmentFlag.AlignHCenter)
+        option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        if self.dim_from is not None and self.dim_from < len(self.text):
+            dim = QTextLayout.FormatRange()
+            dim.start = self.dim_from
+            dim.length = len(self.text) - self.dim_from
+            fmt = QTextCharFormat()
+            fmt.setForeground(dim_color)
+            fmt.setFontItalic(True)
+            dim.format = fmt
+            layout.setFormats([dim])
+        layout.beginLayout()
+        y = 0.0
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, y))
+            y += line.height()
+        layout.endLayout()
+        self.layouts[(width, scale)] = (layout, y)
+        self.height = y
+        return layout
+
+
+class SubtitleView(QWidget):
+    """Translation line over the (dimmer, smaller) source line, on a rounded translucent panel."""
+
+    PADDING = 10
+    LINE_GAP = 2
+    SCALE_STEPS = (1.0, 0.9, 0.8, 0.7, 0.6)
+
+    def __init__(self, parent=None, min_scale: float = 0.6):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        families = ["SF Pro Text", "Helvetica Neue", "PingFang SC", "Apple Color Emoji"]
+        main_font = QFont()
+        main_font.setFamilies(families)
+        main_font.setPixelSize(24)
+        main_font.setBold(True)
+        source_font = QFont()
+        source_font.setFamilies(families)
+        source_font.setPixelSize(16)
+        self.main = _Line(main_font, QColor("white"))
+        self.source = _Line(source_font, QColor("#aeaeb2"))
+        self.dim_color = QColor("#6e6e73")
+        self.background = QColor(28, 28, 30, 100)
+        self.border = QColor(255, 255, 255, 10)
+        self.scales = [s for s in self.SCALE_STEPS if s >= min_scale] or [1.0]
+        self.scale = 1.0
+        self.fit_key: tuple | None = None  # (texts, width, height) self.scale was fitted for
+        self.stats = {"updates": 0, "layouts": 0, "paints": 0}
+
+    def set_lines(self, main_text: str, source_text: str = "", dim_from: int | None = None):
+        changed = self.main.set(main_text)
+        changed = self.source.set(source_text, dim_from) or changed
+        if changed:
+            self.stats["updates"] += 1
+            self.update()
+
+    def fit(self, width: float, height: float):
+        """Largest scale at which both lines fit; re-fitted only when the text or the size changed."""
+        key = (self.main.text, self.source.text, self.source.dim_from, width, height)
+        if key == self.fit_key:
+            return
+        self.fit_key = key
+        for scale in self.scales:
+            total = self.measure(width, scale)
+            if total <= height:
+                break
+        self.scale = scale
+
+    def measure(self, width: float, scale: float) -> float:
+        total = 0.0
+        for line in (self.main, self.source):
+            if not line.text:
+                continue
+            if not line.has_layout(width, scale):
+                self.stats["layouts"] += 1
+            line.layout_for(width, scale, self.dim_color)
+            total += line.height
+        if self.main.text and self.source.text:
+            total += self.LINE_GAP
+        return total
+
+    def paintEvent(self, event):
+        self.stats["paints"] += 1
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(0.5, 0.5, -0.5, -0.5)
+        painter.setPen(QPen(self.border, 1))
+        painter.setBrush(self.background)
+        painter.drawRoundedRect(rect, 12, 12)
+
+        width = float(self.width() - 2 * self.PADDING)
+        height = float(self.height() - 2 * self.PADDING)
+        if width <= 0:
+            return
+        self.fit(width, height)
+        total = self.measure(width, self.scale)
+        # Vertically centred (clipped to the panel if even min_scale doesn't fit)
+        y = self.PADDING + max(0.0, (height - total) / 2)
+        painter.setClipRect(rect)
+        for line in (self.main, self.source):
+            if not line.text:
+                continue
+            painter.setPen(line.color)
+            line.layout_for(width, self.scale, self.dim_color).draw(painter, QPointF(self.PADDING, y))
+            y += line.height + self.LINE_GAP
+        painter.end()
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return f"{s['updates']} changes, {s['paints']} paints, {s['layouts']} line layouts"
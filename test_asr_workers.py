@@ -0,0 +1,172 @@
+import time
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np # type: ignore
+import pytest
+
+import asr_workers
+from asr_workers import ASRWorkerError, WhisperProcessPool, _WorkerLost
+
+PACKED = (0.0, 1.0, " hello", 0.01, -0.2, 1.1, None)
+
+
+class FakeWorker:
+    """Stands in for _Worker: no process, scripted outcomes per call."""
+
+    script: list[str] = []  # "ok" / "lost" / "error", shared by all workers in call order
+    restart_fails = False
+    restart_gate = threading.Event()  # Restarted workers load only once this is set
+    started: list[int] = []
+
+    def __init__(self, ctx, index, model_name, cpu_threads, warm_up):
+        self.index = index
+        self.closed = False
+        FakeWorker.started.append(index)
+
+    def wait_ready(self):
+        if FakeWorker.started.count(self.index) > 1:
+            FakeWorker.restart_gate.wait(2.0)
+            if FakeWorker.restart_fails:
+                raise ASRWorkerError(f"worker {self.index} failed to load")
+
+    def call(self, op, audio, kwargs, timeout_s):
+        outcome = FakeWorker.script.pop(0) if FakeWorker.script else "ok"
+        if outcome == "lost":
+            raise _WorkerLost(f"worker {self.index} died")
+        if outcome == "error":
+            raise ASRWorkerError("decode failed")
+        return [PACKED], "en", 0.9, [("en", 0.9)]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool_factory(monkeypatch):
+    monkeypatch.setattr(asr_workers, "_Worker", FakeWorker)
+    monkeypatch.setattr(asr_workers.time, "sleep", lambda s: None)
+    FakeWorker.script, FakeWorker.restart_fails, FakeWorker.started = [], False, []
+    FakeWorker.restart_gate.set()
+    pools = []
+
+    def make(processes):
+        pool = WhisperProcessPool("tiny", processes)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def audio(seconds=1.0):
+    return np.zeros(int(16000 * seconds), dtype=np.float32)
+
+
+def test_transcribe_rebuilds_segments_and_returns_the_worker(pool_factory):
+    pool = pool_factory(2)
+    segments, info = pool.transcribe(audio(), beam_size=1)
+    segments = list(segments)
+    assert segments[0].text == " hello" and segments[0].words is None
+    assert info.language == "en" and info.language_probability == 0.9
+    assert pool._idle.qsize() == 2
+    assert pool.stats["calls"] == 1 and pool.stats["failed"] == 0
+
+
+def test_lost_worker_is_retried_once_on_an_idle_one_and_restarted(pool_factory):
+    pool = pool_factory(2)
+    FakeWorker.script = ["lost"]
+    FakeWorker.restart_gate.clear()
+    segments, _ = pool.transcribe(audio())
+    assert list(segments)[0].text == " hello"
+    assert pool.stats["crashes"] == 1 and pool.stats["retried"] == 1 and pool.stats["failed"] == 0
+    FakeWorker.restart_gate.set()
+    wait_until(lambda: pool.stats["restarts"] == 1 and pool._idle.qsize() == 2)
+
+
+def test_lost_only_worker_fails_the_call_and_comes_back(pool_factory):
+    pool = pool_factory(1)
+    FakeWorker.script = ["lost"]
+    FakeWorker.restart_gate.clear()
+    with pytest.raises(ASRWorkerError):
+        pool.transcribe(audio())
+    assert pool.stats["failed"] == 1 and pool.stats["retried"] == 0
+    FakeWorker.restart_gate.set()
+    wait_until(lambda: pool._idle.qsize() == 1)
+    assert list(pool.transcribe(audio())[0])[0].text == " hello"
+
+
+def test_decode_error_keeps_the_worker(pool_factory):
+    pool = pool_factory(1)
+    FakeWorker.script = ["error"]
+    with pytest.raises(ASRWorkerError, match="decode failed"):
+        pool.detect_language(audio())
+    assert pool._idle.qsize() == 1 and pool.stats["crashes"] == 0
+
+
+def test_restart_gives_up_after_max_attempts(pool_factory):
+    pool = pool_factory(1)
+    FakeWorker.script = ["lost"]
+    FakeWorker.restart_fails = True
+    with pytest.raises(ASRWorkerError):
+        pool.transcribe(audio())
+    wait_until(lambda: pool.live == 0)
+    assert FakeWorker.started.count(0) == 1 + asr_workers.MAX_RESTART_ATTEMPTS
+    with pytest.raises(ASRWorkerError, match="no Whisper worker"):
+        pool.transcribe(audio())
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def poll(self, timeout):
+        return True
+
+    def recv(self):
+        op, shm_name, n_samples, _ = self.sent[-1]
+        shm = shared_memory.SharedMemory(name=shm_name)
+        received = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf).copy()
+        shm.close()
+        return "ok", received
+
+
+def test_worker_buffer_starts_at_minimum_and_grows():
+    worker = asr_workers._Worker.__new__(asr_workers._Worker)
+    worker.index, worker.conn, worker.shm, worker.process = 0, FakeConn(), None, None
+    try:
+        small = np.arange(1000, dtype=np.float32)
+        assert np.array_equal(worker.call("transcribe", small, {}, 1.0), small)
+        first = worker.shm.name
+        assert worker.shm.size >= asr_workers.MIN_BUFFER_BYTES
+
+        big = np.ones(asr_workers.MIN_BUFFER_BYTES // 4 + 10, dtype=np.float32)
+        assert np.array_equal(worker.call("transcribe", big, {}, 1.0), big)
+        assert worker.shm.name != first and worker.shm.size >= big.nbytes * 3 // 2
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=first)  # The outgrown buffer was unlinked
+    finally:
+        worker.shm.close()
+        worker.shm.unlink()
+
+
+def test_second_lost_worker_does_not_strand_a_third(pool_factory):
+    pool = pool_factory(3)
+    FakeWorker.script = ["lost", "lost"]
+    FakeWorker.restart_gate.clear()
+    with pytest.raises(ASRWorkerError):
+        pool.transcribe(audio())
+    assert pool.stats["retried"] == 1 and pool._idle.qsize() == 1
+    FakeWorker.restart_gate.set()
+    wait_until(lambda: pool._idle.qsize() == 3)
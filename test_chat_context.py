@@ -0,0 +1,60 @@
+from chat_context import ChatContext, PromptEvalStats
+
+
+def prefix_of(shorter: list[dict], longer: list[dict]) -> bool:
+    return longer[:len(shorter)] == shorter
+
+
+def test_messages_render_history_as_chat_turns():
+    context = ChatContext()
+    context.remember("Hello", "你好")
+    assert context.messages("SYS", "Bye") == [
+        {"role": "system", "content": "SYS"},
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "你好"},
+        {"role": "user", "content": "Bye"},
+    ]
+
+
+def test_history_is_append_only_until_max_pairs():
+    context = ChatContext(max_pairs=3, keep_pairs=1)
+    previous = context.messages("SYS", "s0")[:-1]
+    for i in range(3):
+        context.remember(f"s{i}", f"z{i}")
+        current = context.messages("SYS", "next")[:-1]
+        # Each request extends the previous prompt, so Ollama reuses its KV cache
+        assert prefix_of(previous, current)
+        previous = current
+    assert context.rebases == 0
+
+
+def test_rebase_cuts_back_to_keep_pairs_once():
+    context = ChatContext(max_pairs=3, keep_pairs=1)
+    for i in range(4):
+        context.remember(f"s{i}", f"z{i}")
+    assert context.pairs == [("s3", "z3")]
+    assert context.rebases == 1
+
+
+def test_keep_pairs_is_clamped_below_max_pairs():
+    context = ChatContext(max_pairs=2, keep_pairs=5)
+    assert context.keep_pairs == 1
+    no_keep = ChatContext(max_pairs=1, keep_pairs=0)
+    no_keep.remember("a", "甲")
+    no_keep.remember("b", "乙")
+    assert no_keep.pairs == []
+
+
+def test_reset_clears_history():
+    context = ChatContext()
+    context.remember("a", "甲")
+    context.reset()
+    assert context.messages("SYS", "b") == [{"role": "system", "content": "SYS"}, {"role": "user", "content": "b"}]
+
+
+def test_prompt_eval_stats_records_final_chunks_only():
+    stats = PromptEvalStats()
+    assert stats.record({"done": True}) is None
+    assert stats.record({"done": True, "prompt_eval_count": 12, "prompt_eval_duration": 30_000_000}) == (12, 0.03)
+    assert stats.requests == 1 and stats.tokens == 12
+    assert "12 prompt tokens" in stats.format()
@@ -0,0 +1,78 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from hallucination_filter import HallucinationFilter
+
+PATTERNS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hallucination_patterns.json")
+
+
+@pytest.fixture(scope="module")
+def shipped():
+    return HallucinationFilter(PATTERNS)
+
+
+@pytest.mark.parametrize("text", [
+    "Thank you.", "  thank you!! ", "Thank you. Thank you.", "THANK YOU VERY MUCH", "Bye bye.", "MBC",
+])
+def test_stock_lines_match_the_whole_line(shipped, text):
+    assert shipped.text_reason(text) == "pattern"
+
+
+@pytest.mark.parametrize("text", [
+    "Thank you for this great talk.", "Say bye to the old API.", "The MBC report came out today.",
+    "The trend is set to continue next year.",
+])
+def test_stock_lines_inside_a_real_sentence_pass(shipped, text):
+    assert shipped.text_reason(text) is None
+
+
+def test_phrases_match_anywhere(shipped):
+    assert shipped.text_reason("OK, thanks for watching and see you") == "pattern"
+    assert shipped.text_reason("Subtitles by the Amara.org community") == "pattern"
+
+
+def test_cjk_phrases_apply_whatever_the_detected_language(shipped):
+    # Whisper often tags these as English or Japanese on silence
+    for text in ("ご視聴ありがとうございました", "请订阅我的频道", "구독과 좋아요"):
+        assert shipped.text_reason(text) == "pattern"
+
+
+def test_translation_patterns_are_separate(shipped):
+    assert shipped.text_reason("谢谢大家", kind="translation") is None
+    assert shipped.text_reason("感谢观看！", kind="translation") == "pattern"
+
+
+def test_short_and_punctuation_only_asr_text(shipped):
+    assert shipped.text_reason("你") == "too_short"
+    assert shipped.text_reason("...!?") == "punctuation"
+    assert shipped.text_reason("ok", kind="translation") is None
+
+
+def test_is_hallucination_counts_reasons(shipped):
+    fresh = HallucinationFilter(PATTERNS)
+    assert fresh.is_hallucination("Thank you.")
+    assert not fresh.is_hallucination("Thank you for coming.")
+    assert fresh.stats == {"pattern": 1}
+
+
+def test_bad_patterns_file_keeps_the_filter_usable(tmp_path):
+    path = tmp_path / "patterns.json"
+    path.write_text("{not json", encoding="utf-8")
+    hf = HallucinationFilter(str(path))
+    assert hf.text_reason("Thank you.") is None
+
+
+def test_segment_confidence_checks():
+    hf = HallucinationFilter()
+
+    def seg(no_speech=0.1, logprob=-0.3, ratio=1.5):
+        return SimpleNamespace(no_speech_prob=no_speech, avg_logprob=logprob, compression_ratio=ratio, text=" x")
+
+    assert hf.segment_reason(seg()) is None
+    assert hf.segment_reason(seg(ratio=3.0)) == "repetitive"
+    assert hf.segment_reason(seg(logprob=-1.5)) == "low_logprob"
+    assert hf.segment_reason(seg(no_speech=0.9, logprob=-0.6)) == "no_speech"
+    assert len(hf.filter_segments([seg(), seg(ratio=3.0)])) == 1
+    assert hf.stats["repetitive"] == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from language_id import LanguageEstimator
+
+
+def test_no_language_until_confident():
+    lid = LanguageEstimator(min_confidence=0.6)
+    assert lid.update([("en", 0.5), ("de", 0.4)]) is None
+    assert lid.best == "en" and not lid.confident
+    assert lid.update([("en", 0.9), ("de", 0.1)]) == "en"
+    assert lid.confident
+
+
+def test_one_ambiguous_segment_does_not_switch():
+    lid = LanguageEstimator(decay=0.6, switch_margin=0.25)
+    for _ in range(3):
+        lid.update([("en", 0.95), ("ja", 0.05)])
+    assert lid.update([("ja", 0.6), ("en", 0.4)]) == "en"
+    assert lid.switches == 0
+
+
+def test_sustained_new_language_switches_once():
+    lid = LanguageEstimator(decay=0.6, switch_margin=0.25)
+    lid.update([("en", 0.95), ("ja", 0.05)])
+    for _ in range(4):
+        lid.update([("ja", 0.95), ("en", 0.05)])
+    assert lid.language == "ja"
+    assert lid.switches == 1
+
+
+def test_weight_scales_a_detection():
+    lid = LanguageEstimator(decay=1.0)
+    lid.update([("en", 1.0)], weight=0.5)
+    lid.update([("fr", 1.0)], weight=1.0)
+    assert lid.share("fr") == pytest.approx(2 / 3)
+    assert lid.share(None) == 0.0
+
+
+def test_top_k_limits_tracked_languages_and_reset_clears():
+    lid = LanguageEstimator(top_k=2)
+    lid.update([("en", 0.5), ("de", 0.3), ("fr", 0.2)])
+    assert set(lid.scores) == {"en", "de"}
+    assert lid.describe().startswith("en")
+    lid.reset()
+    assert lid.scores == {} and lid.language is None and lid.describe() == "no estimate"
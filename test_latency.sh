@@ -1,2 +1,9 @@
+#!/bin/bash
+# End-to-end latency benchmark: replays clips through the full pipeline
+# against a local fake Ollama server and writes percentiles as JSON.
+# Usage: ./test_latency.sh [clips_dir] [extra bench_latency.py args...]
+cd "$(dirname "$0")"
 source .venv/bin/activate
-python main.py
+CLIPS="${1:-clips}"
+[ $# -gt 0 ] && shift
+python bench_latency.py "$CLIPS" --json bench_output.json "$@"
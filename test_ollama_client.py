@@ -0,0 +1,135 @@
+import json
+import asyncio
+
+import pytest
+
+from ollama_client import OllamaClient, OllamaError
+
+
+async def read_request(reader: asyncio.StreamReader) -> dict | None:
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    return json.loads(await reader.readexactly(length))
+
+
+def chunked(*pieces: bytes) -> bytes:
+    body = b"".join(b"%x\r\n%s\r\n" % (len(p), p) for p in pieces)
+    return b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + body + b"0\r\n\r\n"
+
+
+def fixed(status: str, body: bytes) -> bytes:
+    return f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+
+async def serve(responses, close_after_each: bool = False):
+    """Answer requests with `responses` in order; returns (server, url, connection count)."""
+    connections = [0]
+
+    async def handle(reader, writer):
+        connections[0] += 1
+        try:
+            while responses:
+                await read_request(reader)
+                writer.write(responses.pop(0))
+                await writer.drain()
+                if close_after_each:
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/api/generate", connections
+
+
+async def collect(client: OllamaClient, payload=None):
+    return [chunk async for chunk in client.stream(payload or {"model": "m"})]
+
+
+def test_chunked_ndjson_split_across_chunks():
+    async def main():
+        lines = b'{"response": "\xe4\xbd\xa0"}\n{"response": "\xe5\xa5\xbd"}\n{"done": true}\n'
+        server, url, _ = await serve([chunked(lines[:7], lines[7:30], lines[30:])])
+        client = OllamaClient(url)
+        try:
+            return await collect(client)
+        finally:
+            await client.close()
+            server.close()
+
+    assert asyncio.run(main()) == [{"response": "你"}, {"response": "好"}, {"done": True}]
+
+
+def test_keep_alive_connection_is_reused():
+    async def main():
+        body = b'{"response": "ok", "done": true}'
+        server, url, connections = await serve([fixed("200 OK", body), chunked(body + b"\n")])
+        client = OllamaClient(url)
+        try:
+            await collect(client)
+            await collect(client)
+            return client.stats, connections[0]
+        finally:
+            await client.close()
+            server.close()
+
+    stats, connections = asyncio.run(main())
+    assert connections == 1
+    assert stats["connections_opened"] == 1 and stats["connections_reused"] == 1
+
+
+def test_stale_idle_connection_is_retried_on_a_fresh_one():
+    async def main():
+        body = b'{"response": "ok", "done": true}\n'
+        # The server hangs up after every response, as an idle keep-alive timeout would
+        server, url, connections = await serve([fixed("200 OK", body), fixed("200 OK", body)],
+                                               close_after_each=True)
+        client = OllamaClient(url)
+        try:
+            await collect(client)
+            await asyncio.sleep(0.05)
+            second = await collect(client)
+            return second, client.stats, connections[0]
+        finally:
+            await client.close()
+            server.close()
+
+    second, stats, connections = asyncio.run(main())
+    assert second == [{"response": "ok", "done": True}]
+    assert stats["connections_opened"] == 2 and connections == 2
+
+
+def test_http_error_raises_ollama_error():
+    async def main():
+        server, url, _ = await serve([fixed("404 Not Found", b'{"error": "model not found"}')])
+        client = OllamaClient(url)
+        try:
+            await collect(client)
+        finally:
+            await client.close()
+            server.close()
+
+    with pytest.raises(OllamaError, match="404: model not found"):
+        asyncio.run(main())
+
+
+@pytest.mark.parametrize("status, body", [
+    ("502 Bad Gateway", b"<html>502 Bad Gateway</html>"),  # A proxy's error page
+    ("200 OK", b'{"response": "hi", "do'),  # Truncated stream
+])
+def test_non_json_body_raises_ollama_error(status, body):
+    async def main():
+        server, url, _ = await serve([fixed(status, body)])
+        client = OllamaClient(url)
+        try:
+            await collect(client)
+        finally:
+            await client.close()
+            server.close()
+
+    with pytest.raises(OllamaError, match="invalid response"):
+        asyncio.run(main())
@@ -0,0 +1,69 @@
+from latency_trace import SegmentTrace
+from reorder_buffer import ReorderBuffer
+
+
+def make_buffer(n: int):
+    released: list[tuple[int, str, bool]] = []
+    buffer = ReorderBuffer(lambda trace, output, final: released.append((trace.id, output[0], final)))
+    traces = [SegmentTrace(i) for i in range(n)]
+    for trace in traces:
+        buffer.open(trace)
+    return buffer, traces, released
+
+
+def test_in_order_output_passes_straight_through():
+    buffer, (a, b), released = make_buffer(2)
+    buffer.update(a, ("a1",))
+    buffer.finish(a, ("a",))
+    buffer.update(b, ("b1",))
+    buffer.finish(b, ("b",))
+    assert released == [(0, "a1", False), (0, "a", True), (1, "b1", False), (1, "b", True)]
+    assert buffer.stats["waited"] == 0
+
+
+def test_later_segment_is_held_until_the_head_finishes():
+    buffer, (a, b), released = make_buffer(2)
+    buffer.update(b, ("b1",))
+    buffer.finish(b, ("b",))
+    assert released == []  # b finished first but a is still the head
+    buffer.update(a, ("a1",))
+    buffer.finish(a, ("a",))
+    assert released == [(0, "a1", False), (0, "a", True), (1, "b", True)]
+    assert buffer.stats["released"] == 2 and buffer.stats["waited"] == 1
+
+
+def test_new_head_shows_its_latest_partial():
+    buffer, (a, b), released = make_buffer(2)
+    buffer.update(b, ("b1",))
+    buffer.update(b, ("b2",))
+    buffer.finish(a, ("a",))
+    assert released == [(0, "a", True), (1, "b2", False)]
+    buffer.update(b, ("b3",))  # Now the head: streams directly
+    assert released[-1] == (1, "b3", False)
+
+
+def test_dropped_head_releases_the_segments_behind_it():
+    buffer, (a, b, c), released = make_buffer(3)
+    buffer.finish(c, ("c",))
+    buffer.finish(b, ("b",))
+    buffer.drop(a)
+    assert released == [(1, "b", True), (2, "c", True)]
+    assert buffer.stats["dropped"] == 1
+
+
+def test_dropped_middle_segment_is_skipped():
+    buffer, (a, b, c), released = make_buffer(3)
+    buffer.drop(b)
+    buffer.finish(c, ("c",))
+    assert released == []
+    buffer.finish(a, ("a",))
+    assert released == [(0, "a", True), (2, "c", True)]
+
+
+def test_untracked_segments_are_released_immediately():
+    buffer, _, released = make_buffer(1)
+    stray = SegmentTrace(99)
+    buffer.update(stray, ("s1",))
+    buffer.finish(stray, ("s",))
+    buffer.drop(stray)
+    assert released == [(99, "s1", False), (99, "s", True)]
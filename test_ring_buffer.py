@@ -0,0 +1,59 @@
+import numpy as np # type: ignore
+import pytest
+
+from ring_buffer import AudioRingBuffer
+
+
+def pcm(values) -> bytes:
+    return np.asarray(values, dtype=np.int16).tobytes()
+
+
+def test_write_converts_int16_to_float32():
+    ring = AudioRingBuffer(8)
+    assert ring.write_pcm16(pcm([0, 16384, -32768])) == 0
+    assert ring.total_written == 3
+    np.testing.assert_array_equal(ring.segment(0, 3), np.array([0.0, 0.5, -1.0], dtype=np.float32))
+
+
+def test_segment_across_the_wrap_is_contiguous():
+    ring = AudioRingBuffer(8)
+    ring.write_pcm16(pcm(range(6)))
+    assert ring.write_pcm16(pcm(range(6, 11))) == 6  # Samples 8..10 wrap to positions 0..2
+    out = ring.segment(4, 11)
+    np.testing.assert_array_equal(out * 32768, np.arange(4, 11, dtype=np.float32))
+    assert ring.stats["segments"] == 1 and ring.stats["wrapped_segments"] == 1
+
+
+def test_segment_is_a_copy_that_survives_overwrites():
+    ring = AudioRingBuffer(4)
+    ring.write_pcm16(pcm([1, 2, 3, 4]))
+    out = ring.segment(0, 4)
+    ring.write_pcm16(pcm([9, 9, 9, 9]))
+    np.testing.assert_array_equal(out * 32768, np.array([1, 2, 3, 4], dtype=np.float32))
+
+
+def test_overwritten_samples_are_rejected():
+    ring = AudioRingBuffer(4)
+    ring.write_pcm16(pcm([1, 2, 3]))
+    ring.write_pcm16(pcm([4, 5, 6]))
+    assert not ring.is_valid(0, 3) and ring.is_valid(2, 6)
+    with pytest.raises(ValueError):
+        ring.segment(1, 6)
+    np.testing.assert_array_equal(ring.segment(2, 6) * 32768, np.array([3, 4, 5, 6], dtype=np.float32))
+
+
+def test_frame_larger_than_the_ring_keeps_its_tail():
+    ring = AudioRingBuffer(4)
+    assert ring.write_pcm16(pcm(range(10))) == 6
+    assert ring.total_written == 10
+    np.testing.assert_array_equal(ring.segment(6, 10) * 32768, np.arange(6, 10, dtype=np.float32))
+
+
+def test_uncounted_reads_stay_out_of_the_stats():
+    ring = AudioRingBuffer(8)
+    ring.write_pcm16(pcm([1, 2]))
+    ring.segment(0, 2, count=False)
+    assert ring.stats == {"segments": 0, "wrapped_segments": 0, "bytes_copied": 0}
+    ring.segment(0, 2)
+    assert ring.stats["bytes_copied"] == 8
+    assert ring.format_stats() == "1 segments (0 wrapped), 0.0 MB copied"
@@ -0,0 +1,114 @@
+import time
+
+import numpy as np # type: ignore
+
+from latency_trace import SegmentTrace
+from segment_scheduler import SegmentScheduler
+
+SR = 16000
+
+
+class Tracer:
+    def __init__(self):
+        self.drops: list[tuple[int, str]] = []
+
+    def drop(self, trace, reason):
+        self.drops.append((trace.id, reason))
+
+
+def make_scheduler(**overrides):
+    config = {"sample_rate": SR, "segment_deadline_s": 5.0, "max_merge_s": 8.0,
+              "streaming_asr": False, "batched_asr": False}
+    config.update(overrides)
+    tracer = Tracer()
+    return SegmentScheduler(config, tracer), tracer
+
+
+def segment(segment_id: int, seconds: float, age_s: float = 0.0):
+    trace = SegmentTrace(segment_id)
+    trace.mark("capture_end", time.perf_counter() - age_s)
+    trace.audio_s = seconds
+    trace.end_s = float(segment_id)
+    return np.zeros(int(seconds * SR), dtype=np.float32), trace
+
+
+def learn_cost(scheduler, asr_s: float, audio_s: float):
+    """Feed one measured ASR call into the cost model."""
+    trace = SegmentTrace(0)
+    trace.mark("asr_start", 0.0)
+    trace.mark("asr_end", asr_s)
+    trace.audio_s = audio_s
+    scheduler.on_trace(trace)
+
+
+def test_single_segment_passes_through():
+    scheduler, tracer = make_scheduler()
+    audio, trace = segment(1, 2.0)
+    scheduler.put((audio, trace))
+    got_audio, got_trace = scheduler.get_nowait()
+    assert got_trace is trace and len(got_audio) == len(audio)
+    assert not trace.downgraded and not trace.merged_ids
+    assert tracer.drops == []
+
+
+def test_late_segments_are_coalesced_up_to_max_merge():
+    scheduler, tracer = make_scheduler(max_merge_s=5.0)
+    learn_cost(scheduler, asr_s=2.0, audio_s=2.0)
+    for i, seconds in enumerate((2.0, 2.0, 2.0), 1):
+        scheduler.put(segment(i, seconds, age_s=2.0))  # 3 s left: two separate 2 s decodes miss it
+    audio, trace = scheduler.get_nowait()
+    assert trace.id == 1 and trace.merged_ids == [2]
+    assert len(audio) == int(4.0 * SR) + int(0.2 * SR)  # Two parts and the word-break gap
+    assert trace.end_s == 2.0
+    assert tracer.drops == []  # Merged segments are reported on the trace, not as drops
+    assert scheduler.get_nowait()[1].id == 3
+    assert scheduler.stats["coalesced_calls"] == 1 and scheduler.stats["coalesced_segments"] == 1
+
+
+def test_no_coalescing_while_deadlines_are_met():
+    scheduler, _ = make_scheduler()
+    learn_cost(scheduler, asr_s=0.5, audio_s=2.0)
+    scheduler.put(segment(1, 2.0))
+    scheduler.put(segment(2, 2.0))
+    assert scheduler.get_nowait()[1].merged_ids == []
+    assert scheduler.qsize() == 1
+    assert scheduler.stats["coalesced_calls"] == 0
+
+
+def test_no_coalescing_while_streaming():
+    scheduler, _ = make_scheduler(streaming_asr=True)
+    scheduler.put(segment(1, 1.0))
+    scheduler.put(segment(2, 1.0))
+    assert scheduler.get_nowait()[1].merged_ids == []
+    assert scheduler.qsize() == 1
+
+
+def test_hopeless_segments_are_shed_but_newest_is_kept():
+    scheduler, tracer = make_scheduler(segment_deadline_s=1.0)
+    learn_cost(scheduler, asr_s=2.0, audio_s=2.0)
+    scheduler.put(segment(1, 2.0, age_s=3.0))
+    scheduler.put(segment(2, 2.0, age_s=3.0))
+    _, trace = scheduler.get_nowait()
+    assert trace.id == 2
+    assert trace.downgraded  # Still behind: decoded fast
+    assert tracer.drops == [(1, "deadline")]
+    assert scheduler.stats["shed"] == 1 and scheduler.stats["downgraded"] == 1
+
+
+def test_exit_signal_is_never_shed():
+    scheduler, _ = make_scheduler(segment_deadline_s=0.0)
+    learn_cost(scheduler, asr_s=2.0, audio_s=2.0)
+    scheduler.put(segment(1, 2.0, age_s=3.0))
+    scheduler.put(None)
+    assert scheduler.get_nowait()[1].id == 1
+    assert scheduler.get_nowait() is None
+
+
+def test_drain_returns_queued_traces_and_keeps_the_exit_signal():
+    scheduler, _ = make_scheduler()
+    scheduler.put(segment(1, 1.0))
+    scheduler.put(None)
+    scheduler.put(segment(2, 1.0))
+    assert [t.id for t in scheduler.drain()] == [1, 2]
+    assert scheduler.get_nowait() is None
+    assert scheduler.drain() == [] and scheduler.qsize() == 0
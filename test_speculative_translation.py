@@ -0,0 +1,39 @@
+from speculative_translation import Speculation, SpeculationStats, classify, grows, same_text
+
+
+def test_classify_hit_ignores_case_and_edge_punctuation():
+    assert classify("we are testing", "We are testing.") == ("hit", "")
+
+
+def test_classify_extend_returns_the_untranslated_tail():
+    assert classify("we are testing", "we are testing streaming today") == ("extend", "streaming today")
+
+
+def test_classify_extend_needs_real_words_in_the_tail():
+    assert classify("we are testing", "we are testing!") == ("hit", "")
+
+
+def test_classify_miss_translates_everything():
+    assert classify("we are testing", "we were testing it") == ("miss", "we were testing it")
+
+
+def test_grows_and_same_text():
+    assert grows("the quick", "The quick brown fox")
+    assert not grows("the quick brown", "the slow brown")
+    assert same_text("Hello, World", "hello world") is False
+    assert same_text("Hello world!", "hello world")
+
+
+def test_speculation_tracks_time_spent():
+    spec = Speculation(trace=None, text="hi", lang="en")
+    assert not spec.running
+    spec.finish("你好")
+    assert spec.result == "你好"
+    assert spec.saved_s() >= 0.0
+
+
+def test_stats_format_reports_use_rate():
+    stats = SpeculationStats()
+    assert "n/a used" in stats.format()
+    stats.counts.update(started=4, hit=2, extend=1, miss=1)
+    assert "(75% used)" in stats.format()
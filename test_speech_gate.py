@@ -0,0 +1,60 @@
+import numpy as np # type: ignore
+import pytest
+
+from speech_gate import SpeechGate
+
+SR = 16000
+CONFIG = {"speech_gate": True, "gate_min_level_db": -50.0, "gate_max_flatness": 0.4,
+          "gate_min_speech_band": 0.3, "gate_music_dynamics_db": 3.0, "gate_music_min_s": 4.0}
+
+
+def voiced(seconds: float, f0: float = 120.0, syllable_hz: float = 0.0, amp: float = 0.3) -> np.ndarray:
+    """Harmonic source like a vowel; syllable_hz adds a speech-rate level envelope."""
+    t = np.arange(int(seconds * SR)) / SR
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.01 * np.sin(2 * np.pi * 5 * t))) / SR  # Slight vibrato
+    x = sum(np.sin(k * phase) / k for k in range(1, int(4000 / f0)))
+    if syllable_hz:
+        x = x * (0.55 + 0.45 * np.sin(2 * np.pi * syllable_hz * t))
+    noise = 0.001 * np.random.default_rng(0).standard_normal(len(t))
+    return (x / np.max(np.abs(x)) * amp + noise).astype(np.float32)
+
+
+def chord(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.075 * sum(np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392.0, 523.3))).astype(np.float32)
+
+
+@pytest.fixture
+def gate():
+    return SpeechGate(dict(CONFIG), SR)
+
+
+@pytest.mark.parametrize("seconds", [0.5, 2.0, 3.5])
+def test_sustained_vowel_is_not_flagged_as_music(gate, seconds):
+    verdict, reason, features = gate.check(voiced(seconds))
+    assert features["dynamics_db"] < 3.0  # As steady as music ...
+    assert (verdict, reason) == ("pass", "")  # ... but too short to call
+
+
+def test_syllabic_speech_passes(gate):
+    verdict, _, features = gate.check(voiced(6.0, syllable_hz=4.0))
+    assert verdict == "pass" and features["dynamics_db"] >= 3.0
+
+
+def test_long_steady_music_is_flagged_not_dropped(gate):
+    assert gate.check(chord(6.0))[:2] == ("flag", "music")
+    assert gate.stats["flagged"] == 1 and gate.reasons["music"] == 1
+
+
+def test_clear_non_speech_is_dropped(gate):
+    rng = np.random.default_rng(1)
+    assert gate.check(np.zeros(SR, dtype=np.float32))[:2] == ("drop", "quiet")
+    assert gate.check((0.2 * rng.standard_normal(SR)).astype(np.float32))[:2] == ("drop", "noise")
+    t = np.arange(SR) / SR
+    rumble = (0.3 * np.sin(2 * np.pi * 50 * t)).astype(np.float32)
+    assert gate.check(rumble)[:2] == ("drop", "out_of_band")
+    assert gate.stats["dropped"] == 3 and gate.stats["checked"] == 3
+
+
+def test_audio_shorter_than_a_frame_counts_as_quiet(gate):
+    assert gate.features(np.zeros(100, dtype=np.float32))["level_db"] == -120.0
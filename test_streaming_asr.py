@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from streaming_asr import LocalAgreement, clean_word_boundary, tokenize
+
+
+def word(text, start, end):
+    return SimpleNamespace(word=text, start=start, end=end)
+
+
+def segment(*words):
+    return SimpleNamespace(text="".join(w.word for w in words), words=list(words))
+
+
+def test_tokenize_keeps_whitespace_and_splits_cjk():
+    assert tokenize("hello  world") == ["hello", "  world"]
+    assert tokenize("你好 ok") == ["你", "好", " ok"]
+    assert "".join(tokenize(" it's 3.5 ok ")) == " it's 3.5 ok"
+
+
+def test_local_agreement_commits_agreed_prefix():
+    agreement = LocalAgreement()
+    assert agreement.update("the quick brown") == ("", "the quick brown")
+    assert agreement.update("the quick brown fox") == ("the quick brown", "fox")
+    # Case and trailing punctuation don't break agreement
+    assert agreement.update("The quick brown fox, jumps") == ("the quick brown fox,", "jumps")
+
+
+def test_local_agreement_never_retracts_committed_text():
+    agreement = LocalAgreement()
+    agreement.update("we are testing")
+    agreement.update("we are testing it")
+    committed, provisional = agreement.update("we were testing it again")
+    assert committed == "we are testing it"
+    assert provisional == "again"
+
+
+def test_take_sentences_flushes_each_sentence_once():
+    agreement = LocalAgreement()
+    agreement.update("Hello there. How are")
+    agreement.update("Hello there. How are you")
+    assert agreement.take_sentences() == "Hello there."
+    assert agreement.take_sentences() == ""
+    assert agreement.unflushed() == "How are you"
+    assert agreement.finish("Hello there. How are you doing?") == "How are you doing?"
+    assert agreement.committed == [] and agreement.flushed == 0
+
+
+def test_clean_word_boundary_without_words_commits_everything():
+    segments = [SimpleNamespace(text=" hello", words=None), SimpleNamespace(text=" world", words=None)]
+    assert clean_word_boundary(segments, 5.0, 0.3) == ("hello world", None)
+
+
+def test_clean_word_boundary_carries_clipped_word():
+    seg = segment(word(" one", 0.0, 1.0), word(" two", 1.0, 2.0), word(" three", 2.0, 2.7),
+                  word(" fo", 2.8, 3.0))
+    assert clean_word_boundary([seg], 3.0, 0.2) == ("one two three", 2.7)
+
+
+def test_clean_word_boundary_prefers_sentence_ending():
+    seg = segment(word(" Stop.", 0.0, 1.5), word(" Then", 1.6, 2.0), word(" we", 2.0, 2.6),
+                  word(" g", 2.9, 3.0))
+    assert clean_word_boundary([seg], 3.0, 0.2) == ("Stop.", 1.5)
+
+
+def test_clean_word_boundary_commits_all_when_carry_would_be_too_long():
+    seg = segment(word(" a", 0.0, 0.5), word(" looooong", 0.6, 3.0))
+    assert clean_word_boundary([seg], 3.0, 0.2) == ("a looooong", None)
+
+
+def test_clean_word_boundary_commits_all_when_last_word_is_clean():
+    seg = segment(word(" done", 0.0, 1.0), word(" here", 1.0, 2.0))
+    assert clean_word_boundary([seg], 3.0, 0.2) == ("done here", None)
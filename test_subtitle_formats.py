@@ -0,0 +1,30 @@
+from subtitle_formats import VTT_HEADER, format_timestamp, srt_cue, vtt_cue, write_subtitles
+
+
+def test_format_timestamp_srt_and_vtt():
+    assert format_timestamp(0) == "00:00:00,000"
+    assert format_timestamp(3723.4567) == "01:02:03,457"
+    assert format_timestamp(59.9996, ".") == "00:01:00.000"  # Rounds into the next second
+    assert format_timestamp(-1.0) == "00:00:00,000"
+
+
+def test_srt_cue_has_index_timing_and_both_lines():
+    assert srt_cue(3, 1.5, 2.25, "你好", "hello") == "3\n00:00:01,500 --> 00:00:02,250\n你好\nhello\n\n"
+
+
+def test_cue_without_source_line():
+    assert vtt_cue(0.0, 1.0, "你好") == "00:00:00.000 --> 00:00:01.000\n你好\n\n"
+
+
+def test_write_subtitles(tmp_path):
+    cues = [(0.0, 1.0, "一", "one"), (1.5, 2.0, "二", "")]
+    srt = tmp_path / "out.srt"
+    write_subtitles(str(srt), cues, "srt")
+    assert srt.read_text(encoding="utf-8") == (
+        "1\n00:00:00,000 --> 00:00:01,000\n一\none\n\n"
+        "2\n00:00:01,500 --> 00:00:02,000\n二\n\n")
+    vtt = tmp_path / "out.vtt"
+    write_subtitles(str(vtt), cues, "vtt")
+    text = vtt.read_text(encoding="utf-8")
+    assert text.startswith(VTT_HEADER)
+    assert "00:00:01.500 --> 00:00:02.000\n二\n\n" in text
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import translation_backends
+from translation_backends import CTranslate2Backend, TranslationBackend, model_vocabulary
+
+CONFIG = {
+    "mt_model_path": "models/opus-mt-en-zh-ct2", "mt_compute_type": "int8", "mt_threads": 1,
+    "mt_beam_size": 1, "mt_batch_size": 8, "mt_max_decoding_length": 64,
+    "mt_source_lang": "", "mt_target_token": ">>cmn_Hans<<", "mt_fallback_backend": "fake",
+}
+
+
+class FakeTokenizer:
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+class FakeResult:
+    def __init__(self, tokens):
+        self.hypotheses = [tokens]
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.inputs = []
+
+    def translate_batch(self, batch, **kwargs):
+        self.inputs.append(batch)
+        return [FakeResult(["zh"] + tokens[-2:-1]) for tokens in batch]
+
+
+class FakeFallback(TranslationBackend):
+    name = "fake"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.items = []
+
+    async def translate_batch(self, items):
+        self.items.extend(items)
+        return [f"fallback:{text}" for text, _ in items]
+
+
+def loaded_backend(monkeypatch, **overrides) -> CTranslate2Backend:
+    monkeypatch.setitem(translation_backends.BACKENDS, "fake", FakeFallback)
+    backend = CTranslate2Backend({**CONFIG, **overrides})
+    backend.translator = FakeTranslator()  # Skips load()
+    backend.tokenizer = FakeTokenizer() # type: ignore
+    backend.pair_prefix = ">>cmn_Hans<<"
+    return backend
+
+
+def test_pair_source_comes_from_the_model_name_or_config():
+    assert CTranslate2Backend(CONFIG).pair_source == "en"
+    assert CTranslate2Backend({**CONFIG, "mt_model_path": "m/opus-mt-tc-big-de-zh"}).pair_source == "de"
+    assert CTranslate2Backend({**CONFIG, "mt_model_path": "m/opus-mt-mul-zh"}).pair_source == ""
+    assert CTranslate2Backend({**CONFIG, "mt_source_lang": "fr"}).pair_source == "fr"
+
+
+def test_fixed_pair_prepends_the_target_token(monkeypatch):
+    backend = loaded_backend(monkeypatch)
+    assert backend.source_tokens("hello world", "en") == [">>cmn_Hans<<", "hello", "world", "</s>"]
+
+
+def test_other_languages_go_to_the_fallback_in_order(monkeypatch):
+    backend = loaded_backend(monkeypatch)
+    items = [("one", "en"), ("deux", "fr"), ("three", "en")]
+    assert asyncio.run(backend.translate_batch(items)) == ["zh one", "fallback:deux", "zh three"]
+    assert backend.translator.inputs == [[[">>cmn_Hans<<", "one", "</s>"], [">>cmn_Hans<<", "three", "</s>"]]] # type: ignore
+    assert backend.fallback.items == [("deux", "fr")] # type: ignore
+    assert backend.stats["fallback"] == 1
+
+
+def test_without_a_fallback_other_languages_are_skipped(monkeypatch):
+    backend = loaded_backend(monkeypatch, mt_fallback_backend="")
+    assert asyncio.run(backend.translate_batch([("deux", "fr"), ("one", "en")])) == ["", "zh one"]
+    assert asyncio.run(backend.translate("deux", "fr", on_token=print)) == ""
+    assert backend.stats["skipped"] == 2
+
+
+def test_model_vocabulary_reads_json_or_txt(tmp_path):
+    assert model_vocabulary(str(tmp_path)) == set()
+    (tmp_path / "shared_vocabulary.txt").write_text(">>cmn_Hans<<\n▁hello\n", encoding="utf-8")
+    assert model_vocabulary(str(tmp_path)) == {">>cmn_Hans<<", "▁hello"}
+    (tmp_path / "shared_vocabulary.json").write_text(json.dumps(["a", "b"]), encoding="utf-8")
+    assert model_vocabulary(str(tmp_path)) == {"a", "b"}
@@ -0,0 +1,74 @@
+import itertools
+
+import pytest
+
+import translation_cache
+from translation_cache import TranslationCache, normalize_text, prompt_version
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Strictly increasing time.time() so last_used ordering is deterministic."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(translation_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_normalize_text_folds_trivial_differences():
+    assert normalize_text("  Hello,   WORLD!! ") == "hello, world"
+    assert normalize_text("ＡＢＣ。") == "abc"
+    assert prompt_version("a") == prompt_version("a") != prompt_version("b")
+
+
+def test_get_matches_normalized_text_and_full_key():
+    cache = TranslationCache(":memory:")
+    cache.put("Thank you!", "en", "qwen", "p1", "谢谢")
+    assert cache.get("thank you", "en", "qwen", "p1") == "谢谢"
+    assert cache.get("thank you", "en", "other-model", "p1") is None
+    assert cache.get("thank you", "en", "qwen", "p2") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+
+
+def test_empty_text_is_not_stored():
+    cache = TranslationCache(":memory:")
+    cache.put(" ... ", "en", "m", "p", "x")
+    assert cache.stats["stores"] == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TranslationCache(":memory:", max_entries=2)
+    cache.put("one", "en", "m", "p", "一")
+    cache.put("two", "en", "m", "p", "二")
+    assert cache.get("one", "en", "m", "p") == "一"  # "two" is now the oldest
+    cache.put("three", "en", "m", "p", "三")
+    assert cache.get("two", "en", "m", "p") is None
+    assert cache.get("one", "en", "m", "p") == "一"
+    assert cache.get("three", "en", "m", "p") == "三"
+    assert cache.stats["evictions"] == 1
+
+
+def test_entries_and_recency_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path, max_entries=3)
+    for text, zh in (("one", "一"), ("two", "二"), ("three", "三")):
+        cache.put(text, "en", "m", "p", zh)
+    cache.get("one", "en", "m", "p")  # Only bumped in memory until the next write / close
+    cache.close()
+
+    # Reloading fewer entries keeps the most recently used ones
+    reopened = TranslationCache(path, max_entries=2)
+    assert reopened.get("one", "en", "m", "p") == "一"
+    assert reopened.get("three", "en", "m", "p") == "三"
+    assert reopened.get("two", "en", "m", "p") is None
+    reopened.close()
+
+
+def test_evicted_entries_are_deleted_from_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TranslationCache(path, max_entries=1)
+    cache.put("one", "en", "m", "p", "一")
+    cache.put("two", "en", "m", "p", "二")
+    cache.close()
+    reopened = TranslationCache(path, max_entries=10)
+    assert reopened.get("one", "en", "m", "p") is None
+    assert reopened.get("two", "en", "m", "p") == "二"
+    reopened.close()
@@ -0,0 +1,426 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+
+from chat_context import ChatContext, PromptEvalStats
+from ollama_client import OllamaClient
+from translation_cache import prompt_version
+
+# ================= Translation Backends =================
+# TranslatorThread handles queueing, caching, speculation and filtering; a
+# backend only turns one source line into Chinese, passing the text so far
+# to on_token as it streams.
+#
+#   ollama       LLM over HTTP (chat prompt with history, keep-alive client)
+#   ctranslate2  dedicated MT model (NLLB / OPUS-MT converted to CTranslate2)
+#                run in-process, int8 on CPU -- the runtime faster-whisper
+#                already ships. Sentence-level, no server, and a short
+#                subtitle line takes tens of milliseconds instead of a
+#                7B LLM's seconds. An OPUS-MT pair only reads its own source
+#                language; other lines go to mt_fallback_backend.
+
+# Whisper language code -> NLLB-200 language token
+NLLB_LANGS = {
+    "en": "eng_Latn", "zh": "zho_Hans", "ja": "jpn_Jpan", "ko": "kor_Hang", "fr": "fra_Latn",
+    "de": "deu_Latn", "es": "spa_Latn", "it": "ita_Latn", "pt": "por_Latn", "ru": "rus_Cyrl",
+    "uk": "ukr_Cyrl", "pl": "pol_Latn", "nl": "nld_Latn", "tr": "tur_Latn", "ar": "arb_Arab",
+    "hi": "hin_Deva", "th": "tha_Thai", "vi": "vie_Latn", "id": "ind_Latn", "ms": "zsm_Latn",
+}
+
+# Source language of an OPUS-MT pair from its name (opus-mt-en-zh, opus-mt-tc-big-en-zh); "mul" is multi-source
+OPUS_MT_NAME = re.compile(r"opus-mt-(?:tc-big-)?([a-z]{2})-", re.IGNORECASE)
+
+
+def model_vocabulary(model_dir: str) -> set[str]:
+    """Source-side vocabulary of a converted CTranslate2 model (empty if not found)."""
+    for name in ("shared_vocabulary", "source_vocabulary"):
+        path = os.path.join(model_dir, name + ".json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return set(json.load(f))
+        path = os.path.join(model_dir, name + ".txt")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return {line.rstrip("\n") for line in f}
+    return set()
+
+
+class TranslationBackend:
+    """Base interface for TranslatorThread's translation engines."""
+
+    name = "base"
+    batching = False  # translate_batch() is cheaper per line than separate translate() calls
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    def cache_key(self) -> tuple[str, str]:
+        """(model, prompt version) part of the translation cache key."""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.name
+
+    async def warm_up(self):
+        """Load the model ahead of the first line; raises if the backend is unusable."""
+
+    async def translate(self, text: str, source_lang: str, on_token=None) -> str:
+        """Chinese translation of `text`; on_token(text so far) runs as it streams."""
+        raise NotImplementedError
+
+    async def translate_batch(self, items: list[tuple[str, str]]) -> list[str]:
+        """Translate (text, source_lang) pairs, in order."""
+        return [await self.translate(text, lang) for text, lang in items]
+
+    def remember(self, source_text: str, zh_text: str):
+        """A finished translation, for backends that use context."""
+
+    async def close(self):
+        pass
+
+    def format_stats(self) -> str:
+        return ""
+
+
+class OllamaBackend(TranslationBackend):
+    """Local LLM through Ollama's streaming API."""
+
+    name = "ollama"
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        # Bilingual context, append-only so the server can reuse the prompt prefix
+        self.history = ChatContext(int(config["context_max_pairs"]), int(config["context_keep_pairs"]))
+        self.prompt_stats = PromptEvalStats()
+        self.client: OllamaClient | None = None  # Created in the translator's event loop
+
+    def cache_key(self) -> tuple[str, str]:
+        return str(self.config["ollama_model"]), prompt_version(str(self.config["system_prompt"]))
+
+    def describe(self) -> str:
+        return f"Ollama {self.config['ollama_model']}"
+
+    def get_client(self) -> OllamaClient:
+        url = str(self.config["ollama_api_url"])
+        if self.client is None or self.client.url != url:
+            self.client = OllamaClient(url)
+        return self.client
+
+    def chat_path(self, client: OllamaClient) -> str:
+        # /api/chat next to the configured /api/generate
+        return client.path.rsplit("/", 1)[0] + "/chat"
+
+    def remember(self, source_text: str, zh_text: str):
+        self.history.remember(source_text, zh_text)
+
+    async def warm_up(self):
+        """Load the model and prefill the system prompt so the first subtitle hits a warm cache."""
+        client = self.get_client()
+        if self.config["ollama_chat"]:
+            payload = {
+                "model": str(self.config["ollama_model"]),
+                "messages": self.history.messages(str(self.config["system_prompt"]), "")[:1],
+                "stream": True,
+                "keep_alive": self.config["ollama_keep_alive"],
+                "options": {"num_predict": 1}
+            }
+            path = self.chat_path(client)
+        else:
+            # An empty prompt just loads the model
+            payload = {"model": str(self.config["ollama_model"]), "keep_alive": self.config["ollama_keep_alive"]}
+            path = None
+        async for _ in client.stream(payload, path):
+            pass
+
+    def build_payload(self, source_text: str) -> dict:
+        model = str(self.config["ollama_model"])
+        system_msg = str(self.config["system_prompt"])
+        options = {
+            "temperature": 0.0,
+            "top_p": 0.1
+        }
+        if self.config["ollama_chat"]:
+            # System prompt + history turns are a stable prefix; only the new turns get evaluated
+            return {
+                "model": model,
+                "messages": self.history.messages(system_msg, source_text),
+                "stream": True,  # Low-latency: streaming output
+                "keep_alive": self.config["ollama_keep_alive"],
+                "options": options
+            }
+
+        # /api/generate fallback: build BILINGUAL context of recent segments
+        context_lines = []
+        for en, zh in self.history.pairs[-3:]:  # type: ignore
+            context_lines.append(f"EN: {en}")
+            context_lines.append(f"ZH: {zh}")
+
+        if context_lines:
+            context_block = "\n".join(context_lines)
+            full_prompt = f"[Translation history for context:]\n{context_block}\n\n[Now translate this new segment:]\n{source_text}"
+        else:
+            full_prompt = source_text
+
+        return {
+            "model": model,
+            "prompt": full_prompt,
+            "system": system_msg,
+            "stream": True,  # Low-latency: streaming output
+            "keep_alive": self.config["ollama_keep_alive"],
+            "options": options
+        }
+
+    async def translate(self, text: str, source_lang: str, on_token=None) -> str:
+        """Stream tokens over a pooled connection."""
+        payload = self.build_payload(text)
+        client = self.get_client()
+        path = self.chat_path(client) if "messages" in payload else None
+        zh_text = ""
+        async for chunk in client.stream(payload, path):
+            if "message" in chunk:
+                token = str(chunk["message"].get("content", ""))
+            else:
+                token = str(chunk.get("response", ""))
+            if token:
+                zh_text += token
+                if on_token is not None:
+                    on_token(zh_text)
+            if chunk.get("done"):
+                timing = self.prompt_stats.record(chunk)
+                if timing is not None:
+                    print(f"[Ollama] Prompt eval: {timing[0]} tokens in {timing[1]*1000:.0f}ms")
+        return zh_text.strip()
+
+    async def close(self):
+        if self.client is not None:
+            print(f"[Ollama] Client: {self.client.format_stats()}")
+            await self.client.close()
+
+    def format_stats(self) -> str:
+        return f"prompt eval: {self.prompt_stats.format()} ({self.history.rebases} history rebases)"
+
+
+class SubwordTokenizer:
+    """tokenizer.json (HF tokenizers, e.g. NLLB) or source/target.spm (OPUS-MT) from a model directory."""
+
+    def __init__(self, model_dir: str):
+        tokenizer_json = os.path.join(model_dir, "tokenizer.json")
+        if os.path.exists(tokenizer_json):
+            from tokenizers import Tokenizer # type: ignore  (installed with faster-whisper)
+            self.hf = Tokenizer.from_file(tokenizer_json)
+            self.spm = None
+        elif os.path.exists(os.path.join(model_dir, "source.spm")):
+            import sentencepiece # type: ignore  (requirements.txt)
+            self.hf = None
+            self.spm = (sentencepiece.SentencePieceProcessor(model_file=os.path.join(model_dir, "source.spm")),
+                        sentencepiece.SentencePieceProcessor(model_file=os.path.join(model_dir, "target.spm")))
+        else:
+            raise FileNotFoundError(f"No tokenizer.json or source.spm in {model_dir}")
+
+    def encode(self, text: str) -> list[str]:
+        if self.hf is not None:
+            return self.hf.encode(text, add_special_tokens=False).tokens
+        return self.spm[0].encode(text, out_type=str) # type: ignore
+
+    def decode(self, tokens: list[str]) -> str:
+        if self.hf is not None:
+            ids = [self.hf.token_to_id(t) for t in tokens]
+            return self.hf.decode([i for i in ids if i is not None], skip_special_tokens=True)
+        return self.spm[1].decode([t for t in tokens if t not in ("</s>", "<pad>", "<unk>")]) # type: ignore
+
+    def has_token(self, token: str) -> bool:
+        if self.hf is not None:
+            return self.hf.token_to_id(token) is not None
+        return self.spm[0].piece_to_id(token) != self.spm[0].unk_id() # type: ignore
+
+
+class CTranslate2Backend(TranslationBackend):
+    """Dedicated MT model in-process: NLLB (multilingual) or an OPUS-MT pair, via CTranslate2."""
+
+    name = "ctranslate2"
+    batching = True
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.model_path = os.path.expanduser(str(config["mt_model_path"]))
+        self.translator = None  # ctranslate2.Translator, loaded on first use
+        self.tokenizer: SubwordTokenizer | None = None
+        self.target_token: str | None = None  # NLLB target language token; None for a fixed pair
+        self.pair_prefix: str | None = None  # OPUS-MT target token (>>cmn_Hans<<) for multi-target pairs
+        # A fixed pair reads one language: mt_source_lang, else from the name (opus-mt-en-zh -> "en")
+        match = OPUS_MT_NAME.search(os.path.basename(os.path.normpath(self.model_path)))
+        self.pair_source = str(config["mt_source_lang"]) or (match.group(1).lower() if match else "")
+        self.fallback: TranslationBackend | None = None  # mt_fallback_backend, created on first use
+        self._warned_langs: set[str] = set()
+        self._load_lock = threading.Lock()
+        self.stats = {"lines": 0, "calls": 0, "seconds": 0.0, "fallback": 0, "skipped": 0}
+
+    def cache_key(self) -> tuple[str, str]:
+        return f"ct2:{os.path.basename(os.path.normpath(self.model_path))}", "mt"
+
+    def describe(self) -> str:
+        return f"CTranslate2 {os.path.basename(os.path.normpath(self.model_path)) or '(no model)'}"
+
+    def load(self):
+        """Blocking; runs on an executor thread the first time the backend is used."""
+        with self._load_lock:
+            if self.translator is not None:
+                return
+            if not os.path.isdir(self.model_path):
+                raise FileNotFoundError(f"MT model directory not found: '{self.model_path}' (set mt_model_path)")
+            import ctranslate2 # type: ignore  (installed with faster-whisper)
+            start = time.perf_counter()
+            self.tokenizer = SubwordTokenizer(self.model_path)
+            vocabulary = model_vocabulary(self.model_path)
+            target = NLLB_LANGS["zh"]
+            self.target_token = target if target in vocabulary or self.tokenizer.has_token(target) else None
+            prefix = str(self.config["mt_target_token"])
+            if not self.target_token and prefix and (prefix in vocabulary or self.tokenizer.has_token(prefix)):
+                self.pair_prefix = prefix
+            self.translator = ctranslate2.Translator(
+                self.model_path, device="cpu", compute_type=str(self.config["mt_compute_type"]),
+                intra_threads=int(self.config["mt_threads"]))
+            print(f"[MT] Loaded {self.describe()} ({'NLLB' if self.target_token else 'fixed pair'}, "
+                  f"{time.perf_counter() - start:.2f}s)")
+
+    def supports(self, source_lang) -> bool:
+        """NLLB reads every language; a fixed pair only its source language (once loaded)."""
+        return bool(self.target_token) or not self.pair_source or str(source_lang) == self.pair_source
+
+    def get_fallback(self, source_lang) -> TranslationBackend | None:
+        """Backend for lines the pair cannot read; None (line skipped) if mt_fallback_backend is empty."""
+        name = str(self.config["mt_fallback_backend"])
+        if name and name != self.name and self.fallback is None:
+            self.fallback = create_backend(name, self.config)
+        if str(source_lang) not in self._warned_langs:
+            self._warned_langs.add(str(source_lang))
+            target = self.fallback.describe() if self.fallback is not None else "skipping them"
+            print(f"[MT] {self.describe()} only reads '{self.pair_source}': '{source_lang}' lines -> {target}")
+        self.stats["fallback" if self.fallback is not None else "skipped"] += 1
+        return self.fallback
+
+    def source_tokens(self, text: str, source_lang: str) -> list[str]:
+        tokens = self.tokenizer.encode(text) + ["</s>"] # type: ignore
+        if self.target_token:
+            tokens.insert(0, NLLB_LANGS.get(str(source_lang), NLLB_LANGS["en"]))
+        elif self.pair_prefix:
+            tokens.insert(0, self.pair_prefix)
+        return tokens
+
+    def target_prefix(self, n: int):
+        return [[self.target_token]] * n if self.target_token else None
+
+    def decode(self, tokens: list[str]) -> str:
+        if self.target_token:
+            tokens = [t for t in tokens if t != self.target_token]
+        return self.tokenizer.decode(tokens).strip() # type: ignore
+
+    async def warm_up(self):
+        await self.translate_batch([("Hello.", "en")])
+
+    async def translate(self, text: str, source_lang: str, on_token=None) -> str:
+        if on_token is None:
+            return (await self.translate_batch([(text, source_lang)]))[0]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.load)
+        if not self.supports(source_lang):
+            fallback = self.get_fallback(source_lang)
+            return await fallback.translate(text, source_lang, on_token) if fallback is not None else ""
+        steps: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def post(item):
+            try:
+                loop.call_soon_threadsafe(steps.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # Event loop already closed
+
+        def decode_steps():
+            # Greedy decoding one token at a time; stops early once the caller gives up
+            try:
+                for step in self.translator.generate_tokens( # type: ignore
+                        self.source_tokens(text, source_lang),
+                        target_prefix=[self.target_token] if self.target_token else None,
+                        max_decoding_length=int(self.config["mt_max_decoding_length"])):
+                    if stop.is_set():
+                        break
+                    post(step.token)
+            except Exception as e:
+                post(e)
+            finally:
+                post(None)
+
+        start = time.perf_counter()
+        worker = loop.run_in_executor(None, decode_steps)
+        tokens: list[str] = []
+        zh_text = ""
+        try:
+            while (item := await steps.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                tokens.append(item)
+                partial = self.decode(tokens)
+                if partial != zh_text:
+                    zh_text = partial
+                    on_token(zh_text)
+            await worker
+        finally:
+            stop.set()
+        self.stats["lines"] += 1
+        self.stats["calls"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        return zh_text
+
+    async def translate_batch(self, items: list[tuple[str, str]]) -> list[str]:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.load)
+        own = [i for i, (_, lang) in enumerate(items) if self.supports(lang)]
+        if len(own) == len(items):
+            return await loop.run_in_executor(None, self._translate_batch, items)
+        # Lines in other languages than the pair's go to the fallback backend (or stay empty)
+        results = [""] * len(items)
+        if own:
+            for i, zh_text in zip(own, await loop.run_in_executor(None, self._translate_batch, [items[i] for i in own])):
+                results[i] = zh_text
+        others = [i for i in range(len(items)) if i not in own]
+        fallbacks = [self.get_fallback(items[i][1]) for i in others]
+        if fallbacks[0] is not None:
+            for i, zh_text in zip(others, await fallbacks[0].translate_batch([items[i] for i in others])):
+                results[i] = zh_text
+        return results
+
+    def _translate_batch(self, items: list[tuple[str, str]]) -> list[str]:
+        start = time.perf_counter()
+        results = self.translator.translate_batch( # type: ignore
+            [self.source_tokens(text, lang) for text, lang in items],
+            target_prefix=self.target_prefix(len(items)),
+            beam_size=int(self.config["mt_beam_size"]),
+            max_batch_size=int(self.config["mt_batch_size"]),
+            max_decoding_length=int(self.config["mt_max_decoding_length"]))
+        self.stats["lines"] += len(items)
+        self.stats["calls"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        return [self.decode(result.hypotheses[0]) for result in results]
+
+    async def close(self):
+        if self.fallback is not None:
+            await self.fallback.close()
+
+    def format_stats(self) -> str:
+        s = self.stats
+        per_line = f"{s['seconds'] / s['lines'] * 1000:.0f}ms/line" if s["lines"] else "n/a"
+        other = f", {s['fallback']} to fallback, {s['skipped']} skipped (language)" if s["fallback"] or s["skipped"] else ""
+        return f"MT: {s['lines']} lines in {s['calls']} calls ({per_line}){other}"
+
+
+BACKENDS = {"ollama": OllamaBackend, "ctranslate2": CTranslate2Backend}
+
+
+def create_backend(name: str, config: dict) -> TranslationBackend:
+    try:
+        return BACKENDS[name](config)
+    except KeyError:
+        raise ValueError(f"Unknown translation backend: {name}") from None
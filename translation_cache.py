@@ -0,0 +1,126 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import collections
+import unicodedata
+
+# ================= Translation Cache =================
+# Intros, catchphrases and repeated narration come back again and again;
+# each used to cost a full Ollama round-trip. Finished translations are kept
+# in an in-memory LRU (what lookups hit, so a hit costs a dict access) backed
+# by SQLite so they survive restarts. Entries are keyed by normalized source
+# text, source language, Ollama model and a hash of the system prompt, so
+# changing the model or prompt never serves stale translations.
+
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " .,!?;:…-—\"'«»「」『』（）()。、，！？；："
+
+
+def normalize_text(text: str) -> str:
+    """Fold width/case/whitespace and edge punctuation so trivially different lines share an entry."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACE_RE.sub(" ", text).strip(_EDGE_PUNCT)
+
+
+def prompt_version(system_prompt: str) -> str:
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class TranslationCache:
+    """Size-bounded LRU of translations, persisted to SQLite (path ':memory:' = not persisted)."""
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict[tuple[str, str, str, str], str] = collections.OrderedDict()
+        self._touched: dict[tuple[str, str, str, str], float] = {}  # last_used updates not yet written
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db: sqlite3.Connection | None = None
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " source TEXT, lang TEXT, model TEXT, prompt TEXT, translation TEXT,"
+                " last_used REAL, PRIMARY KEY (source, lang, model, prompt))"
+            )
+            rows = self._db.execute(
+                "SELECT source, lang, model, prompt, translation FROM translations"
+                " ORDER BY last_used DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+            # Oldest first so the most recently used end up at the MRU end
+            for source, lang, model, prompt, translation in reversed(rows):
+                self._entries[(source, lang, model, prompt)] = translation
+            print(f"[Cache] Loaded {len(rows)} translations from {path}")
+        except sqlite3.Error as e:
+            print(f"[Cache] Persistent cache unavailable ({e}); using memory only")
+            self._db = None
+
+    @staticmethod
+    def key(text: str, lang: str, model: str, prompt: str) -> tuple[str, str, str, str]:
+        return normalize_text(text), lang, model, prompt
+
+    def get(self, text: str, lang: str, model: str, prompt: str) -> str | None:
+        key = self.key(text, lang, model, prompt)
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._touched[key] = time.time()
+            self.stats["hits"] += 1
+            return translation
+
+    def put(self, text: str, lang: str, model: str, prompt: str, translation: str):
+        key = self.key(text, lang, model, prompt)
+        if not key[0]:
+            return
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            self._touched.pop(key, None)
+            self.stats["stores"] += 1
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self.stats["evictions"] += len(evicted)
+            if self._db is None:
+                return
+            try:
+                self._db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                                 (*key, translation, time.time()))
+                self._db.executemany("DELETE FROM translations WHERE source=? AND lang=? AND model=? AND prompt=?",
+                                     evicted)
+                self._write_touched()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[Cache] Write failed: {e}")
+
+    def _write_touched(self):
+        # Hits only bump last_used in memory; persist them with the next write
+        if self._touched and self._db is not None:
+            self._db.executemany(
+                "UPDATE translations SET last_used=? WHERE source=? AND lang=? AND model=? AND prompt=?",
+                [(t, *key) for key, t in self._touched.items()])
+            self._touched.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                self._write_touched()
+                self._db.commit()
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+    def format_stats(self) -> str:
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = f"{s['hits'] / lookups:.0%}" if lookups else "n/a"
+        return f"{s['hits']}/{lookups} hits ({rate}), {len(self._entries)} entries, {s['evictions']} evicted"